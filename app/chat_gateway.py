@@ -0,0 +1,260 @@
+import os
+import time
+import logging
+from uuid import uuid4
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+from collections import OrderedDict
+
+import socketio
+from flask import Config as FlaskConfig
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.config import Config
+from app.encoding import dumps, loads, to_iso8601
+from app.log import init_logging, Sampler
+from app.tokens import InvalidToken, parse_token, check_signature, check_secret_key, uniquifier_cache
+from app.statements import POST_TITLE
+from app.models import User, Profile, ChatRoomUser, Message
+
+logger = logging.getLogger(__name__)
+sampled = Sampler(logger, 0.01)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+class SocketJSON:
+    """python-socketio's json interface on app.encoding."""
+
+    @staticmethod
+    def dumps(data, **kwargs):
+        return dumps(data).decode()
+
+    @staticmethod
+    def loads(raw, **kwargs):
+        return loads(raw)
+
+
+def async_database_url(url, prepared_statement_cache_size=None):
+    """
+    DATABASE_URL for asyncpg, which takes `ssl` where libpq takes `sslmode`, with SQLAlchemy's
+    per-connection prepared statement cache sized when given.
+    """
+    url = make_url(url).set(drivername='postgresql+asyncpg')
+    if 'sslmode' in url.query:
+        url = url.update_query_dict({'ssl': url.query['sslmode']}).difference_update_query(['sslmode'])
+    if prepared_statement_cache_size is not None:
+        url = url.update_query_dict({'prepared_statement_cache_size': str(prepared_statement_cache_size)})
+    return url
+
+
+def async_engine_options(config):
+    """
+    The DB_POOL_PROFILE of app.pool for the asyncpg engine. Without DB_PREPARED_STATEMENTS
+    (the pgbouncer default) asyncpg must not cache prepared statements, nor reuse their names,
+    since consecutive transactions can land on different server connections.
+    """
+    if config['DB_POOL_PROFILE'] == 'pgbouncer':
+        options = {'pool_pre_ping': False, 'pool_reset_on_return': 'rollback'}
+        if config['DB_POOL_SIZE'] <= 0:
+            options['poolclass'] = NullPool
+        else:
+            options.update(pool_size=config['DB_POOL_SIZE'], max_overflow=config['DB_POOL_MAX_OVERFLOW'],
+                           pool_timeout=20)
+    else:
+        options = dict(config['SQLALCHEMY_ENGINE_OPTIONS'])
+    options['query_cache_size'] = config['DB_QUERY_CACHE_SIZE']
+
+    if not config['DB_PREPARED_STATEMENTS']:
+        options['connect_args'] = dict(options.get('connect_args', {}), statement_cache_size=0,
+                                       prepared_statement_name_func=lambda: f'__asyncpg_{uuid4()}__')
+    return options
+
+
+class RoomMembers:
+    """
+    post_id -> [(user_id, nickname)] of a chat room, kept `ttl` seconds like get_room_members in
+    app.routes.chat. Nickname is None for members without a profile.
+    """
+
+    def __init__(self, maxsize=1000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    async def get(self, session, post_id):
+        entry = self.entries.get(post_id)
+        now = time.monotonic()
+        if entry is not None and now - entry[1] < self.ttl:
+            self.entries.move_to_end(post_id)
+            return entry[0]
+
+        rows = await session.execute(
+            select(ChatRoomUser.user_id, Profile.nickname)
+            .outerjoin(Profile, Profile.id == ChatRoomUser.user_id)
+            .where(ChatRoomUser.post_id == post_id)
+        )
+        members = [tuple(row) for row in rows]
+        self.entries[post_id] = (members, now)
+        self.entries.move_to_end(post_id)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return members
+
+
+class ChatGateway:
+    """
+    The Socket.IO chat protocol of app.routes.chat (connect with an access token, send_message,
+    new_message and error to the `user_<id>` rooms) on python-socketio's AsyncServer and an
+    asyncpg engine, so chat waits on the database without sharing the eventlet hub with the
+    REST API. Events emitted by the Flask process (notifications, REST side effects) still
+    reach only the clients connected there.
+    """
+
+    def __init__(self, config_class=Config):
+        self.config = FlaskConfig(ROOT)
+        self.config.from_object(config_class)
+        # Only reads .config, like it does on the Flask app
+        init_logging(self)
+        check_secret_key(self.config)
+        uniquifier_cache.maxsize = self.config['AUTH_TOKEN_CACHE_SIZE']
+        uniquifier_cache.ttl = self.config['AUTH_TOKEN_CACHE_TTL']
+
+        cache_size = (self.config['DB_PREPARED_STATEMENT_CACHE_SIZE'] if self.config['DB_PREPARED_STATEMENTS']
+                      else 0)
+        self.engine = create_async_engine(async_database_url(self.config['SQLALCHEMY_DATABASE_URI'], cache_size),
+                                          **async_engine_options(self.config))
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.room_members = RoomMembers()
+        self.connected_users = {}  # user_id -> sid
+        self.socket_users = {}  # sid -> user_id
+
+        self.sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*', json=SocketJSON,
+                                        logger=self.config['SOCKETIO_LOGGER'],
+                                        engineio_logger=self.config['SOCKETIO_LOGGER'])
+        self.sio.on('connect', self.connect)
+        self.sio.on('disconnect', self.disconnect)
+        self.sio.on('send_message', self.send_message)
+        self.app = socketio.ASGIApp(self.sio, on_shutdown=self.engine.dispose)
+
+    async def verify_token(self, token):
+        user_id, expires, signature = parse_token(token)
+        uniquifier = uniquifier_cache.get(user_id)
+        if uniquifier is None:
+            async with self.sessions() as session:
+                uniquifier = await session.scalar(
+                    select(User.fs_uniquifier).where(User.id == user_id, User.active.is_(True))
+                )
+            if uniquifier is not None:
+                uniquifier_cache.put(user_id, uniquifier)
+        check_signature(user_id, expires, signature, uniquifier, self.config['SECRET_KEY'])
+        return user_id
+
+    async def connect(self, sid, environ, auth=None):
+        try:
+            args = parse_qs(environ.get('QUERY_STRING', ''))
+            user_id = args.get('user_id', [None])[0]
+
+            # Access token from the Socket.IO auth payload, or the query string for older clients
+            token = auth.get('token') if isinstance(auth, dict) else None
+            token = token or args.get('token', [None])[0]
+            if token:
+                try:
+                    auth_user_id = await self.verify_token(token)
+                except InvalidToken as e:
+                    logger.warning(f'Connection rejected: {e}')
+                    return False
+                if user_id and user_id != str(auth_user_id):
+                    logger.warning(f'Connection rejected: token does not belong to user {user_id}')
+                    return False
+                user_id = str(auth_user_id)
+                await self.sio.save_session(sid, {'user_id': user_id})
+            elif self.config['AUTH_TOKENS_REQUIRED']:
+                logger.warning('Connection attempt without access token')
+                return False
+
+            if not user_id:
+                logger.warning('Connection attempt without user_id')
+                return False
+
+            await self.sio.enter_room(sid, f'user_{user_id}')
+            self.connected_users[user_id] = sid
+            self.socket_users[sid] = user_id
+            logger.info(f'User {user_id} connected with sid {sid}')
+            return True
+
+        except Exception as e:
+            logger.error(f'Error in connect: {str(e)}')
+            return False
+
+    async def disconnect(self, sid):
+        user_id = self.socket_users.pop(sid, None)
+        if user_id is not None and self.connected_users.get(user_id) == sid:
+            del self.connected_users[user_id]
+            logger.info(f'User {user_id} disconnected')
+
+    async def error(self, sid, message):
+        await self.sio.emit('error', {'message': message}, to=sid)
+
+    async def send_message(self, sid, data):
+        try:
+            post_id = data.get('post_id')
+            sender_id = data.get('sender_id')
+            content = data.get('content')
+
+            if not all([post_id, sender_id, content]):
+                return await self.error(sid, 'Missing required fields')
+
+            socket_session = await self.sio.get_session(sid)
+            if 'user_id' in socket_session and str(sender_id) != socket_session['user_id']:
+                return await self.error(sid, 'Not authorized to send messages as another user')
+
+            async with self.sessions() as session:
+                room_members = await self.room_members.get(session, post_id)
+                nicknames = dict(room_members)
+                if sender_id not in nicknames:
+                    return await self.error(sid, 'Not authorized to send messages in this chat room')
+                if nicknames[sender_id] is None:
+                    return await self.error(sid, 'Sender profile not found')
+
+                post_title = await session.scalar(POST_TITLE, {'post_id': post_id})
+                if post_title is None:
+                    return await self.error(sid, 'Post not found')
+
+                # asyncpg refuses aware datetimes for the naive UTC created_at column the model default fills
+                message = Message(post_id=post_id, sender_id=sender_id, content=content, read_users=[sender_id],
+                                  created_at=datetime.now(timezone.utc).replace(tzinfo=None))
+                session.add(message)
+                try:
+                    await session.commit()
+                except SQLAlchemyError as e:
+                    await session.rollback()
+                    logger.error(f'Database error in send_message: {str(e)}')
+                    return await self.error(sid, 'Failed to save message')
+
+            message_data = {
+                'id': message.id,
+                'post_id': post_id,
+                'post_title': post_title,
+                'sender_id': sender_id,
+                'sender_name': nicknames[sender_id],
+                'content': content,
+                'created_at': to_iso8601(message.created_at),
+            }
+            for user_id, _ in room_members:
+                await self.sio.emit('new_message', message_data, room=f'user_{user_id}')
+
+            sampled.debug('Message %s sent to %d recipients', message.id, len(room_members))
+
+        except Exception as e:
+            logger.error(f'Error in send_message: {str(e)}')
+            await self.error(sid, 'Failed to process message')
+
+
+def create_gateway(config_class=Config):
+    """The chat gateway's ASGI application, see run_async.py."""
+    return ChatGateway(config_class).app
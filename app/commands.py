@@ -0,0 +1,86 @@
+import time
+from datetime import datetime, timezone
+
+import click
+from flask.cli import AppGroup, with_appcontext
+
+from app.extensions import db
+from app.stats import reconcile_user_stats, recompute_ratings
+from app.jobs import open_references
+from app.greendb import disable_green_db
+from app.replicas import replica_router
+from app.seed import SyntheticDataset, SEED_PASSWORD, seed_users, seed_posts, seed_messages, finish_seed
+
+stats_cli = AppGroup('stats', help='User statistics maintenance.')
+references_cli = AppGroup('references', help='Reference maintenance.')
+replicas_cli = AppGroup('replicas', help='Read replica routing.')
+
+
+@stats_cli.command('reconcile')
+def reconcile_stats():
+    """Rebuild user_stats from chat_room_users, posts and references."""
+    count = reconcile_user_stats()
+    db.session.commit()
+    click.echo(f"Reconciled stats for {count} users")
+
+
+@stats_cli.command('ratings')
+def recompute_user_ratings():
+    """Recompute rating totals and users.rating from the references table."""
+    count = recompute_ratings()
+    db.session.commit()
+    click.echo(f"Recomputed ratings for {count} users")
+
+
+@references_cli.command('open')
+@click.option('--batch-size', default=200, show_default=True, help='Posts per transaction')
+def open_pending_references(batch_size):
+    """Generate pending references for events that have ended."""
+    post_ids = open_references(batch_size=batch_size)
+    click.echo(f"Opened references for {len(post_ids)} ended posts")
+
+
+@replicas_cli.command('status')
+def replica_status():
+    """Measure every replica's lag and show whether reads would be routed to it."""
+    if not replica_router.replicas:
+        click.echo("No replicas configured (DATABASE_REPLICA_URLS), every query uses the primary")
+        return
+    for replica in replica_router.replicas:
+        lag = replica_router.check(replica, db.engines)
+        if lag is None:
+            click.echo(f"{replica.key}: unavailable")
+        else:
+            state = 'routed' if lag <= replica_router.max_lag else 'skipped, over max lag'
+            click.echo(f"{replica.key}: lag {lag:.2f}s ({state}, max {replica_router.max_lag:.1f}s)")
+
+
+@click.command('seed')
+@click.option('--users', default=10000, show_default=True)
+@click.option('--posts', default=5000, show_default=True, help='Posts, each with its chat room, applicants and references')
+@click.option('--messages', default=100000, show_default=True)
+@click.option('--seed', 'seed_value', default=0, show_default=True, help='The same seed and sizes give the same rows')
+@click.option('--anchor-date', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Day the event timeline is built around, default today (UTC). Pass the same date to resume '
+                   'or reproduce a run on another day')
+@click.option('--id-offset', default=0, show_default=True, help='Seeded ids are offset + 1 onwards, per table')
+@click.option('--chunk-size', default=10000, show_default=True, help='Rows generated and committed per COPY batch')
+@with_appcontext
+def seed_command(users, posts, messages, seed_value, anchor_date, id_offset, chunk_size):
+    """
+    Bulk-load synthetic users, profiles, posts, applicants, chat rooms, messages and references
+    with COPY. Re-running with the same options resumes after the last committed chunk.
+    """
+    anchor = anchor_date or datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    dataset = SyntheticDataset(seed_value, users, posts, messages, anchor, id_offset)
+    disable_green_db(db.engine)
+    started = time.perf_counter()
+
+    def progress(stage, done, total):
+        click.echo(f"{stage}: {done}/{total} ({time.perf_counter() - started:.1f}s)")
+
+    seed_users(dataset, chunk_size, progress)
+    seed_posts(dataset, chunk_size, progress)
+    seed_messages(dataset, chunk_size, progress)
+    finish_seed()
+    click.echo(f"Seeded in {time.perf_counter() - started:.1f}s, every user's password is {SEED_PASSWORD}")
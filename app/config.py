@@ -1,11 +1,19 @@
 import os
 
+# Public in this repository: fine for development, refused in production (see app.tokens)
+DEFAULT_SECRET_KEY = 'SparkUp_secret_key'
+
 
 class Config:
-    SECRET_KEY = 'SparkUp_secret_key'
+    APP_ENV = os.environ.get('APP_ENV', 'production')
+    # Signs the access tokens, see app.tokens
+    SECRET_KEY = os.environ.get('SECRET_KEY', DEFAULT_SECRET_KEY)
     SECURITY_JOIN_USER_ROLES = True
     SECURITY_PASSWORD_HASH = 'bcrypt'
     SECURITY_PASSWORD_SALT = 'SparkUp_SECURITY_PASSWORD_SALT'
+    # Every stored hash is bcrypt; loading passlib's other schemes only slows startup
+    SECURITY_PASSWORD_SCHEMES = ['bcrypt']
+    SECURITY_DEPRECATED_PASSWORD_SCHEMES = []
     FLASK_CORS_ORIGINS = os.environ.get('FLASK_CORS_ORIGINS', "*")
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL').replace('postgres://', 'postgresql://')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -16,5 +24,75 @@ class Config:
         'pool_size': 30,
         'max_overflow': 20,
         'pool_reset_on_return': 'rollback'
-        #'prepared_statement_cache_size': 100
-    }
\ No newline at end of file
+    }
+    # Connection pool, see app.pool. default: the options above; pgbouncer: no pre-ping and a pool of
+    # DB_POOL_SIZE connections to a local PgBouncer in transaction mode, 0 for no pool
+    DB_POOL_PROFILE = os.environ.get('DB_POOL_PROFILE', 'default')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10))
+
+    # Statement caching, see app.statements. DB_QUERY_CACHE_SIZE compiled statements per engine;
+    # server-side prepared statements only apply to asyncpg (the chat gateway), psycopg2 has none.
+    # Off by default behind PgBouncer, turn on for PgBouncer 1.21+ with max_prepared_statements set
+    DB_QUERY_CACHE_SIZE = int(os.environ.get('DB_QUERY_CACHE_SIZE', 500))
+    DB_PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS',
+                                            str(DB_POOL_PROFILE != 'pgbouncer')).lower() == 'true'
+    DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_PREPARED_STATEMENT_CACHE_SIZE', 100))
+
+    # Read replicas, see app.replicas. Comma separated URLs, empty keeps every query on the primary
+    DATABASE_REPLICA_URLS = [url.strip().replace('postgres://', 'postgresql://')
+                             for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5.0))
+    REPLICA_LAG_CHECK_SECONDS = float(os.environ.get('REPLICA_LAG_CHECK_SECONDS', 2.0))
+    REPLICA_CONNECT_TIMEOUT = int(os.environ.get('REPLICA_CONNECT_TIMEOUT', 2))
+
+    # Startup: alembic is only loaded for the flask CLI (`flask db`), which imports run.py as well
+    # but starts no background tasks. Development builds every Swagger spec at boot so a broken
+    # model fails fast, production builds them on first use
+    RUN_FROM_CLI = os.environ.get('FLASK_RUN_FROM_CLI', 'false').lower() == 'true'
+    MIGRATIONS_ENABLED = RUN_FROM_CLI
+    API_DOCS_EAGER = os.environ.get('API_DOCS_EAGER', str(APP_ENV == 'development')).lower() == 'true'
+
+    # Logging, see app.log
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG' if APP_ENV == 'development' else 'INFO')
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', 'sqlalchemy=WARNING,engineio=WARNING,socketio=WARNING')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text' if APP_ENV == 'development' else 'json')
+    LOG_RATE_LIMIT_BURST = int(os.environ.get('LOG_RATE_LIMIT_BURST', 20))
+    LOG_RATE_LIMIT_INTERVAL = float(os.environ.get('LOG_RATE_LIMIT_INTERVAL', 1.0))
+    SOCKETIO_LOGGER = os.environ.get('SOCKETIO_LOGGER', 'false').lower() == 'true'
+
+    # Response encoder: auto (orjson when installed), orjson or stdlib, see app.encoding
+    JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+
+    # Signed access tokens, see app.tokens
+    AUTH_TOKENS_REQUIRED = os.environ.get('AUTH_TOKENS_REQUIRED', 'true').lower() == 'true'
+    AUTH_TOKEN_TTL = int(os.environ.get('AUTH_TOKEN_TTL', 3600))
+    AUTH_TOKEN_CACHE_SIZE = 4096
+    AUTH_TOKEN_CACHE_TTL = 60
+
+    # Per-request SQL accounting and /metrics, see app.metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    # Bearer token the scraper sends to /metrics; unset, /metrics is only served in debug
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10))
+    SQL_QUERY_HEADER = os.environ.get('SQL_QUERY_HEADER', 'false').lower() == 'true'
+
+    # Cooperative psycopg2 under eventlet, see app.greendb
+    GREEN_DB_ENABLED = os.environ.get('GREEN_DB_ENABLED', 'true').lower() == 'true'
+
+    # Event lifecycle scheduler, see app.scheduler
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_REFRESH_SECONDS = int(os.environ.get('SCHEDULER_REFRESH_SECONDS', 60))
+    SCHEDULER_HORIZON_SECONDS = int(os.environ.get('SCHEDULER_HORIZON_SECONDS', 600))
+    SCHEDULER_BATCH_SIZE = int(os.environ.get('SCHEDULER_BATCH_SIZE', 200))
+
+    # Notification outbox dispatcher, see app.notifications
+    NOTIFICATION_DISPATCHER_ENABLED = os.environ.get('NOTIFICATION_DISPATCHER_ENABLED', 'true').lower() == 'true'
+    NOTIFICATION_DISPATCH_INTERVAL = float(os.environ.get('NOTIFICATION_DISPATCH_INTERVAL', 1.0))
+    NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 100))
+    NOTIFICATION_MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_MAX_ATTEMPTS', 5))
+
+    # bcrypt offloading to native threads, see app.passwords
+    PASSWORD_POOL_ENABLED = os.environ.get('PASSWORD_POOL_ENABLED', 'true').lower() == 'true'
+    PASSWORD_POOL_SIZE = int(os.environ.get('PASSWORD_POOL_SIZE', 2))
+    PASSWORD_POOL_QUEUE_LIMIT = int(os.environ.get('PASSWORD_POOL_QUEUE_LIMIT', 32))
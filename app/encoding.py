@@ -0,0 +1,132 @@
+import json
+import logging
+from enum import Enum
+from datetime import datetime, date
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional, pip install orjson
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Items encoded per chunk when streaming an array
+STREAM_CHUNK_SIZE = 500
+
+
+def to_iso8601(value: datetime):
+    # Columns are naive UTC; isoformat is several times faster than strftime
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None)
+    return value.isoformat(timespec='milliseconds') + 'Z'
+
+
+def encode_default(value):
+    """Encode the types our payloads carry besides plain JSON values."""
+    if isinstance(value, datetime):
+        return to_iso8601(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class StdlibBackend:
+    name = 'stdlib'
+
+    def __init__(self):
+        self.encoder = json.JSONEncoder(ensure_ascii=False, separators=(', ', ': '),
+                                        default=encode_default)
+
+    def dumps(self, data, default=encode_default) -> bytes:
+        if default is encode_default:
+            return self.encoder.encode(data).encode()
+        return json.dumps(data, ensure_ascii=False, default=default).encode()
+
+    def loads(self, raw):
+        return json.loads(raw)
+
+
+class OrjsonBackend:
+    name = 'orjson'
+    # Datetimes go through encode_default() so they keep our millisecond Z format
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def dumps(self, data, default=encode_default) -> bytes:
+        return orjson.dumps(data, default=default, option=self.options)
+
+    def loads(self, raw):
+        return orjson.loads(raw)
+
+
+def make_backend(name='auto'):
+    if name == 'orjson' or (name == 'auto' and orjson is not None):
+        if orjson is None:
+            raise RuntimeError('JSON_BACKEND is orjson but orjson is not installed')
+        return OrjsonBackend()
+    return StdlibBackend()
+
+
+backend = make_backend()
+
+
+def dumps(data) -> bytes:
+    return backend.dumps(data)
+
+
+def loads(raw):
+    return backend.loads(raw)
+
+
+def iter_json_array(envelope, key, items, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield the JSON encoding of `dict(envelope, **{key: list(items)})` piece by piece, so a large
+    array is never held encoded in memory at once. Items are encoded in chunks of `chunk_size`.
+    """
+    head = dumps(envelope)
+    yield head[:-1] + (b', ' if len(envelope) else b'') + dumps(key) + b': ['
+
+    # One encoder call per chunk, its list brackets stripped
+    first = True
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield (b'' if first else b', ') + dumps(chunk)[1:-1]
+            first = False
+            chunk = []
+    if chunk:
+        yield (b'' if first else b', ') + dumps(chunk)[1:-1]
+    yield b']}'
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Flask JSON provider on the configured backend, used by jsonify and error handlers.
+    Extensions may subclass it and chain `default`, as Flask-Security does for lazy strings.
+    """
+    default = staticmethod(encode_default)
+
+    def dumps(self, obj, **kwargs):
+        return backend.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(backend.dumps(obj, default=self.default), mimetype='application/json')
+
+
+def init_json(app):
+    """Select the backend and install the provider, before extensions wrap app.json_provider_class."""
+    global backend
+    backend = make_backend(app.config['JSON_BACKEND'])
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+    logger.info(f"JSON backend: {backend.name}")
@@ -1,15 +1,22 @@
-from flask_migrate import Migrate
 from flask_socketio import SocketIO
 from flask_security import Security
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import sessionmaker
 
-db = SQLAlchemy()
-migrate = Migrate()
+from app.replicas import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 security = Security()
 db_session = sessionmaker()
-socketio = SocketIO(
-    logger=True,
-    engineio_logger=True,
-    async_mode='eventlet'
-)
\ No newline at end of file
+socketio = SocketIO(async_mode='eventlet')
+
+
+def init_migrate(app):
+    """
+    Flask-Migrate for the `flask db` commands. It pulls in alembic, a tenth of the server's
+    import time, so it is only imported when MIGRATIONS_ENABLED (set under the flask CLI).
+    """
+    if not app.config['MIGRATIONS_ENABLED']:
+        return None
+    from flask_migrate import Migrate
+    return Migrate(app, db)
@@ -0,0 +1,56 @@
+import logging
+
+import psycopg2
+from psycopg2 import extensions
+from eventlet import patcher
+from eventlet.hubs import trampoline
+
+logger = logging.getLogger(__name__)
+
+
+def eventlet_wait_callback(conn, timeout=-1):
+    """
+    psycopg2 wait callback that parks the calling greenlet on the eventlet hub while
+    libpq waits for the server, instead of blocking the whole process (as psycogreen does).
+    """
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            trampoline(conn.fileno(), read=True)
+        elif state == extensions.POLL_WRITE:
+            trampoline(conn.fileno(), write=True)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def is_green():
+    return extensions.get_wait_callback() is eventlet_wait_callback
+
+
+def init_green_db(app):
+    """
+    Put psycopg2 in cooperative mode when GREEN_DB_ENABLED is set and the process runs under
+    eventlet (run.py), so queries from concurrent requests and socket handlers overlap on
+    their DB waits and the connection pool is used in parallel rather than serially.
+
+    CLI commands needing the blocking driver (COPY is refused with a wait callback) call
+    disable_green_db first.
+    """
+    if not app.config.get('GREEN_DB_ENABLED') or not patcher.is_monkey_patched('socket'):
+        return False
+    if not patcher.is_monkey_patched('thread'):
+        # The SQLAlchemy pool waits on threading primitives, a real lock would stall the hub
+        logger.warning('Green DB mode needs eventlet thread patching, keeping the blocking driver')
+        return False
+    extensions.set_wait_callback(eventlet_wait_callback)
+    logger.info('psycopg2 running in green mode')
+    return True
+
+
+def disable_green_db(engine):
+    """Back to the blocking driver for this process, reconnecting pooled connections opened green."""
+    if is_green():
+        extensions.set_wait_callback(None)
+        engine.dispose()
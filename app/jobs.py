@@ -0,0 +1,120 @@
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update, and_
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.extensions import db
+from app.models import Post, PostApplicant, ChatRoomUser, Reference, PendingReference
+from app.stats import adjust_pending_references
+
+
+def open_references(now=None, batch_size=200, on_batch=None):
+    """
+    Fill pending_references for posts whose event has ended and mark them ended.
+    Every member of an ended event owes a reference to every other member, minus the
+    references already written. Commits per batch and returns the ids of the posts ended.
+    on_batch(post_ids) runs inside each batch's transaction, before it commits.
+    """
+    now = now or datetime.now(timezone.utc)
+    processed = []
+
+    while True:
+        post_ids = db.session.scalars(
+            select(Post.id)
+            .where(Post.ended.is_(False), Post.event_end_date <= now)
+            .order_by(Post.event_end_date)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not post_ids:
+            break
+
+        giver = aliased(ChatRoomUser)
+        receiver = aliased(ChatRoomUser)
+        source = select(
+            giver.user_id,
+            receiver.user_id,
+            giver.post_id,
+            Post.event_end_date
+        ).join(
+            receiver,
+            and_(
+                receiver.post_id == giver.post_id,
+                receiver.user_id != giver.user_id
+            )
+        ).join(
+            Post, Post.id == giver.post_id
+        ).outerjoin(
+            Reference,
+            and_(
+                Reference.from_user_id == giver.user_id,
+                Reference.to_user_id == receiver.user_id,
+                Reference.post_id == giver.post_id
+            )
+        ).where(
+            giver.post_id.in_(post_ids),
+            Reference.from_user_id.is_(None)
+        )
+
+        givers = db.session.scalars(
+            pg_insert(PendingReference)
+            .from_select(['from_user_id', 'to_user_id', 'post_id', 'event_end_date'], source)
+            .on_conflict_do_nothing()
+            .returning(PendingReference.from_user_id)
+        ).all()
+        adjust_pending_references(Counter(givers))
+
+        # Keep post_last_updated_date, ending is not an edit
+        db.session.execute(
+            update(Post)
+            .where(Post.id.in_(post_ids))
+            .values(ended=True, post_last_updated_date=Post.post_last_updated_date)
+        )
+        if on_batch is not None:
+            on_batch(post_ids)
+        db.session.commit()
+        processed.extend(post_ids)
+
+    return processed
+
+
+def close_applications(now=None, batch_size=200, on_batch=None):
+    """
+    Reject applications still under review for posts whose event has started and mark them started.
+    Commits per batch and returns the rejected (user_id, post_id) pairs.
+    on_batch(rejected) runs inside each batch's transaction, before it commits.
+    """
+    now = now or datetime.now(timezone.utc)
+    rejected = []
+
+    while True:
+        post_ids = db.session.scalars(
+            select(Post.id)
+            .where(Post.started.is_(False), Post.event_start_date <= now)
+            .order_by(Post.event_start_date)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not post_ids:
+            break
+
+        batch = [tuple(row) for row in db.session.execute(
+            update(PostApplicant)
+            .where(PostApplicant.post_id.in_(post_ids), PostApplicant.review_status == 0)
+            .values(review_status=1)
+            .returning(PostApplicant.user_id, PostApplicant.post_id)
+        ).all()]
+        rejected.extend(batch)
+
+        db.session.execute(
+            update(Post)
+            .where(Post.id.in_(post_ids))
+            .values(started=True, post_last_updated_date=Post.post_last_updated_date)
+        )
+        if on_batch is not None and batch:
+            on_batch(batch)
+        db.session.commit()
+
+    return rejected
@@ -0,0 +1,160 @@
+import sys
+import time
+import random
+import atexit
+import logging
+import traceback
+from datetime import datetime, timezone
+
+from eventlet import patcher
+
+from app.encoding import dumps
+
+# The listener must be a native thread draining a native queue even when eventlet patched
+# threading: its blocking writes to stdout would otherwise stall the hub
+_threading = patcher.original('threading')
+_queue = patcher.original('queue')
+
+# Fields every LogRecord has, anything else was passed through `extra=`
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, extra fields and exception."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = ''.join(traceback.format_exception(*record.exc_info))
+        return dumps(entry).decode()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `burst` records per call site (logger and line) through every `interval`
+    seconds; the next record after a quiet period reports how many were dropped.
+    """
+
+    def __init__(self, burst=20, interval=1.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.windows = {}
+
+    def filter(self, record):
+        key = (record.name, record.lineno)
+        now = time.monotonic()
+        window = self.windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            dropped = window[2] if window else 0
+            self.windows[key] = [now, 1, 0]
+            if dropped:
+                record.dropped = dropped
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+
+class Sampler:
+    """
+    Debug logging for hot paths: only a `rate` fraction of calls are logged, and the level
+    check and sampling happen before the message is formatted.
+
+        sampled = Sampler(logger, 0.01)
+        sampled.debug('Message %s sent to %d recipients', message_id, count)
+    """
+
+    def __init__(self, logger, rate):
+        self.logger = logger
+        self.rate = rate
+
+    def debug(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.DEBUG) and random.random() < self.rate:
+            self.logger.debug(msg, *args, stacklevel=2, **kwargs)
+
+
+class LocalQueueHandler(logging.Handler):
+    """Hands records to the listener unformatted, so formatting also leaves the request greenlet."""
+
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+
+class LogListener:
+    def __init__(self, queue, handler):
+        self.queue = queue
+        self.handler = handler
+        self.thread = None
+
+    def start(self):
+        self.thread = _threading.Thread(target=self.run, name='log-listener', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            self.handler.handle(record)
+
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+
+_listener = None
+
+
+def init_logging(app):
+    """
+    Route all logging through a queue to a native listener thread that formats and writes
+    to stdout. Levels come from LOG_LEVEL (per APP_ENV by default) with LOG_LEVELS overrides
+    per logger, e.g. 'engineio=WARNING,app.routes.chat=DEBUG'.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    if app.config['LOG_FORMAT'] == 'json':
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    queue = _queue.SimpleQueue()
+    handler = LocalQueueHandler(queue)
+    handler.addFilter(RateLimitFilter(app.config['LOG_RATE_LIMIT_BURST'], app.config['LOG_RATE_LIMIT_INTERVAL']))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(app.config['LOG_LEVEL'])
+
+    for entry in filter(None, app.config['LOG_LEVELS'].split(',')):
+        name, _, level = entry.partition('=')
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    _listener = LogListener(queue, stream)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -1,31 +1,46 @@
 import logging
-from sqlalchemy import text
 from flask import Flask, jsonify
 from werkzeug.exceptions import HTTPException
 
-from app.extensions import db, socketio, security, migrate
+from app.extensions import db, socketio, security, init_migrate
 from app.models import user_datastore
 from app.config import Config
+from app.commands import stats_cli, references_cli, replicas_cli, seed_command
+from app.passwords import password_pool
+from app.greendb import init_green_db
+from app.replicas import init_replicas
+from app.pool import init_pool
+from app.tokens import init_auth
+from app.encoding import init_json
+from app.log import init_logging
+from app.metrics import init_metrics
 from app.routes import *
+from app.routes import build_api_docs
 
 
 def create_app(config_class=Config):
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
     # Logger setup
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    )
+    init_logging(app)
     logger = logging.getLogger(__name__)
     logger.info('Logger is set up')
 
-    app = Flask(__name__)
-    app.config.from_object(config_class)
+    init_json(app)
 
     # Initialize extensions with app
+    init_green_db(app)
+    init_replicas(app)
+    init_pool(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_migrate(app)
     security.init_app(app, user_datastore)
-    socketio.init_app(app, cors_allowed_origins='*', async_mode='eventlet')
+    socketio.init_app(app, cors_allowed_origins='*', async_mode='eventlet',
+                      logger=app.config['SOCKETIO_LOGGER'], engineio_logger=app.config['SOCKETIO_LOGGER'])
+    password_pool.init_app(app)
+    init_metrics(app)
+    init_auth(app)
 
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -37,6 +52,16 @@ def create_app(config_class=Config):
     app.register_blueprint(reference_bp, url_prefix='/reference')
     app.register_blueprint(chat_bp, url_prefix='/chat')
 
+    # Swagger specs are otherwise built on the first /docs or swagger.json hit
+    if app.config['API_DOCS_EAGER']:
+        build_api_docs(app)
+
+    # Register CLI commands
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(references_cli)
+    app.cli.add_command(replicas_cli)
+    app.cli.add_command(seed_command)
+
     @app.errorhandler(HTTPException)
     def http_exception_handler(error):
         response = error.get_response()
@@ -54,12 +79,4 @@ def create_app(config_class=Config):
             'message': str(error)
         }), 404
 
-    @app.route('/test_db')
-    def test_db():
-        try:
-            result = db.session.execute(text('SELECT 1'))
-            return "Database connection successful!", 200
-        except Exception as e:
-            return str(e), 500
-
     return app, socketio
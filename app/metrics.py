@@ -0,0 +1,242 @@
+import re
+import hmac
+import time
+import logging
+from collections import Counter
+
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS, CACHING_DISABLED, NO_CACHE_KEY
+
+from app.passwords import password_pool
+from app.tokens import uniquifier_cache, bearer_token
+from app.utils import jsonify_response
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+INF = 'le="+Inf"'
+
+# Expanded IN lists render one placeholder per value, fold them so the fingerprint is stable
+_IN_LIST = re.compile(r'IN \((?:%\(\w+\)s|\?)(?:, (?:%\(\w+\)s|\?))*\)')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class CounterMetric:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = Counter()
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] += amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        for labels, value in sorted(self.values.items()):
+            yield f'{self.name}{_labels(self.labels, labels)} {value}'
+
+
+class GaugeMetric:
+    """Value read from a callback at scrape time; with labels the callback returns {labels: value}."""
+
+    def __init__(self, name, documentation, read, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.labels = labels
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} gauge'
+        if not self.labels:
+            yield f'{self.name} {self.read()}'
+            return
+        for labels, value in sorted(self.read().items()):
+            yield f'{self.name}{_labels(self.labels, labels)} {value}'
+
+
+class HistogramMetric:
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # labels -> [count per bucket..., sum, count]
+        self.values = {}
+
+    def observe(self, labels, value):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, series in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                yield f'{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}'
+            yield f'{self.name}_bucket{_labels(self.labels, labels, INF)} {series[-1]}'
+            yield f'{self.name}_sum{_labels(self.labels, labels)} {series[-2]}'
+            yield f'{self.name}_count{_labels(self.labels, labels)} {series[-1]}'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+ROUTE_LABELS = ('blueprint', 'route', 'method')
+request_duration = registry.add(HistogramMetric(
+    'http_request_duration_seconds', 'HTTP request latency', ROUTE_LABELS + ('status',)))
+request_queries = registry.add(HistogramMetric(
+    'http_request_db_queries', 'SQL statements executed per HTTP request', ROUTE_LABELS, QUERY_COUNT_BUCKETS))
+request_db_time = registry.add(HistogramMetric(
+    'http_request_db_seconds', 'Time spent in SQL per HTTP request', ROUTE_LABELS))
+queries_total = registry.add(CounterMetric(
+    'db_queries_total', 'SQL statements executed, by context', ('context',)))
+compiled_cache_total = registry.add(CounterMetric(
+    'db_compiled_cache_total', 'SQL statements executed, by compiled statement cache outcome', ('result',)))
+n_plus_one_total = registry.add(CounterMetric(
+    'db_n_plus_one_total', 'Requests that repeated one statement at least SQL_N_PLUS_ONE_THRESHOLD times', ROUTE_LABELS))
+registry.add(GaugeMetric(
+    'password_pool_in_flight', 'Password hashes running on the native thread pool', lambda: password_pool.in_flight))
+registry.add(GaugeMetric(
+    'password_pool_queued', 'Password hashes waiting for a pool thread', lambda: password_pool.queued))
+registry.add(GaugeMetric(
+    'auth_token_cache_entries', 'Cached fs_uniquifier entries', lambda: len(uniquifier_cache.entries)))
+
+
+class QueryStats:
+    """SQL statements of the current request, kept on flask.g."""
+    __slots__ = ('count', 'seconds', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+
+CACHE_RESULTS = {
+    CACHE_HIT: ('hit',),
+    CACHE_MISS: ('miss',),
+    CACHING_DISABLED: ('disabled',),
+    NO_CACHE_KEY: ('no_key',),
+}
+
+
+def fingerprint(statement):
+    return _IN_LIST.sub('IN (...)', statement) if 'IN (' in statement else statement
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    # no_key: statements that cannot be cached, raw driver SQL (exec_driver_sql) included
+    result = CACHE_RESULTS.get(getattr(context, 'cache_hit', None))
+    if result is not None:
+        compiled_cache_total.inc(result)
+    if has_request_context():
+        stats = g.get('_query_stats')
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+            stats.statements[fingerprint(statement)] += 1
+            queries_total.inc(('request',))
+            return
+    queries_total.inc(('other',))
+
+
+def route_labels():
+    rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    return request.blueprint or '', rule, request.method
+
+
+def init_metrics(app):
+    """
+    Per-request SQL accounting, N+1 warnings and a Prometheus text endpoint at /metrics.
+    With SQL_QUERY_HEADER (on in debug) responses carry X-Query-Count and X-Query-Time-Ms.
+    /metrics is outside every blueprint, so authenticate_request skips it: it takes the
+    METRICS_TOKEN bearer token instead, and without one is only registered in debug.
+    """
+    threshold = app.config['SQL_N_PLUS_ONE_THRESHOLD']
+    query_header = app.config['SQL_QUERY_HEADER'] or app.debug
+
+    @app.before_request
+    def start_request_metrics():
+        g._request_start = time.perf_counter()
+        g._query_stats = QueryStats()
+
+    @app.after_request
+    def record_request_metrics(response):
+        stats = g.get('_query_stats')
+        start = g.get('_request_start')
+        if stats is None or start is None:
+            return response
+
+        labels = route_labels()
+        request_duration.observe(labels + (str(response.status_code),), time.perf_counter() - start)
+        request_queries.observe(labels, stats.count)
+        request_db_time.observe(labels, stats.seconds)
+
+        if stats.statements:
+            statement, repeats = stats.statements.most_common(1)[0]
+            if repeats >= threshold:
+                n_plus_one_total.inc(labels)
+                logger.warning('Possible N+1 on %s %s: statement ran %d times (%d queries total): %s',
+                               labels[2], labels[1], repeats, stats.count, statement[:300])
+
+        if query_header:
+            response.headers['X-Query-Count'] = str(stats.count)
+            response.headers['X-Query-Time-Ms'] = f'{stats.seconds * 1000:.2f}'
+        return response
+
+    metrics_token = app.config['METRICS_TOKEN']
+    if app.config['METRICS_ENABLED'] and not (metrics_token or app.debug):
+        logger.warning('/metrics is disabled: set METRICS_TOKEN to expose it')
+    elif app.config['METRICS_ENABLED']:
+        @app.route('/metrics')
+        def metrics():
+            if metrics_token and not hmac.compare_digest((bearer_token() or '').encode(), metrics_token.encode()):
+                return jsonify_response({'message': 'Authentication required'}, 401)
+            return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -1,16 +1,16 @@
 import uuid
 from enum import Enum as PyEnum
-from collections import OrderedDict
 from datetime import datetime, timezone
 
 from flask_security import SQLAlchemyUserDatastore, UserMixin, RoleMixin, AsaList
 from flask_restx import fields
 
-from sqlalchemy import select, exists, PickleType, Enum as SQLEnum
+from sqlalchemy import select, exists, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.mutable import MutableList, MutableDict
 
 from app.extensions import db
-from app.utils import to_iso8601
+from app.serializers import serialize_profile, serialize_comment
 
 
 # General
@@ -111,6 +111,10 @@ class User(UserMixin, db.Model):
                                     lazy='dynamic',
                                     cascade="all, delete-orphan")
 
+    stats = db.relationship('UserStats',
+                            uselist=False,
+                            cascade='all, delete-orphan')
+
     def __init__(self, **kwargs):
         super(User, self).__init__(**kwargs)
         if not self.fs_uniquifier:
@@ -120,6 +124,18 @@ class User(UserMixin, db.Model):
 user_datastore = SQLAlchemyUserDatastore(db, User, None)
 
 
+class UserStats(db.Model):
+    """Materialized per-user counters, maintained by app.stats and reconciled by `flask stats reconcile`."""
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    participated = db.Column(db.Integer, default=0, nullable=False)  # chat rooms joined, hosted ones included
+    hosted = db.Column(db.Integer, default=0, nullable=False)
+    level = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+    rating_count = db.Column(db.Integer, default=0, nullable=False)
+    pending_references = db.Column(db.Integer, default=0, nullable=False)
+
+
 # Profile Models
 class EducationLevelEnum(PyEnum):
     NO_FORMAL_EDUCATION = 'No Formal Education'
@@ -236,6 +252,12 @@ class DietEnum(PyEnum):
 
 class Profile(db.Model):
     __tablename__ = 'profiles'
+    __table_args__ = (
+        # Containment / any-of filters on JSONB arrays
+        db.Index('idx_profiles_skills', 'skills', postgresql_using='gin'),
+        db.Index('idx_profiles_personalities', 'personalities', postgresql_using='gin'),
+        db.Index('idx_profiles_languages', 'languages', postgresql_using='gin'),
+    )
     id = db.Column(db.Integer,
                    db.ForeignKey('users.id', ondelete='CASCADE'),
                    primary_key=True)
@@ -260,47 +282,30 @@ class Profile(db.Model):
     drinking = db.Column(db.Integer)
     marijuana = db.Column(db.Integer)
     drugs = db.Column(db.Integer)
-    skills = db.Column(MutableList.as_mutable(PickleType), default=lambda: [])
-    personalities = db.Column(MutableList.as_mutable(PickleType), default=lambda: [])
-    languages = db.Column(MutableList.as_mutable(PickleType), default=lambda: [])
-    interest_types = db.Column(MutableList.as_mutable(PickleType), default=lambda: [])
+    skills = db.Column(MutableList.as_mutable(JSONB), default=lambda: [])
+    personalities = db.Column(MutableList.as_mutable(JSONB), default=lambda: [])
+    languages = db.Column(MutableList.as_mutable(JSONB), default=lambda: [])
+    interest_types = db.Column(MutableList.as_mutable(JSONB), default=lambda: [])
 
     user = db.relationship("User", back_populates="profile")
 
     def serialize(self):
-        return OrderedDict([
-            ('id', self.id),
-            ('phone', self.phone),
-            ('nickname', self.nickname),
-            ('dob', to_iso8601(self.dob) if self.dob else None),  # Convert date to ISO format
-            ('gender', self.gender),
-            ('bio', self.bio),
-            ('current_location', self.current_location),
-            ('hometown', self.hometown),
-            ('college', self.college),
-            ('job_title', self.job_title),
-            ('education_level', self.education_level.value if self.education_level else None),
-            ('mbti', self.mbti.value if self.mbti else None),
-            ('constellation', self.constellation.value if self.constellation else None),
-            ('blood_type', self.blood_type.value if self.blood_type else None),
-            ('religion', self.religion.value if self.religion else None),
-            ('sexuality', self.sexuality.value if self.sexuality else None),
-            ('ethnicity', self.ethnicity.value if self.ethnicity else None),
-            ('diet', self.diet.value if self.diet else None),
-            ('smoke', self.smoke),
-            ('drinking', self.drinking),
-            ('marijuana', self.marijuana),
-            ('drugs', self.drugs),
-            ('skills', self.skills),
-            ('personalities', self.personalities),
-            ('languages', self.languages),
-            ('interest_types', self.interest_types)
-        ])
+        return serialize_profile(self)
 
 
 # Post Models
 class Post(db.Model):
     __tablename__ = 'posts'
+    __table_args__ = (
+        # Unprocessed lifecycle instants, see app.scheduler
+        db.Index('idx_posts_lifecycle_start', 'event_start_date', postgresql_where=db.text('NOT started')),
+        db.Index('idx_posts_lifecycle_end', 'event_end_date', postgresql_where=db.text('NOT ended')),
+        # Containment / any-of filters on JSONB arrays and attributes
+        db.Index('idx_posts_skills', 'skills', postgresql_using='gin'),
+        db.Index('idx_posts_personalities', 'personalities', postgresql_using='gin'),
+        db.Index('idx_posts_languages', 'languages', postgresql_using='gin'),
+        db.Index('idx_posts_attributes', 'attributes', postgresql_using='gin'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     type = db.Column(db.String(50))
     user_id = db.Column(db.Integer,
@@ -320,10 +325,12 @@ class Post(db.Model):
     event_end_date = db.Column(db.DateTime, nullable=False)
     number_of_people_required = db.Column(db.Integer, nullable=False)
     location = db.Column(db.Text, nullable=False)
-    skills = db.Column(MutableList.as_mutable(PickleType), default=lambda: [])
-    personalities = db.Column(MutableList.as_mutable(PickleType), default=lambda: [])
-    languages = db.Column(MutableList.as_mutable(PickleType), default=lambda: [])
-    attributes = db.Column(MutableDict.as_mutable(PickleType), default=lambda: {})
+    started = db.Column(db.Boolean, default=False, nullable=False)  # Start of event processed by app.jobs
+    ended = db.Column(db.Boolean, default=False, nullable=False)  # End of event processed by app.jobs
+    skills = db.Column(MutableList.as_mutable(JSONB), default=lambda: [])
+    personalities = db.Column(MutableList.as_mutable(JSONB), default=lambda: [])
+    languages = db.Column(MutableList.as_mutable(JSONB), default=lambda: [])
+    attributes = db.Column(MutableDict.as_mutable(JSONB), default=lambda: {})
     likes = db.relationship('PostLike',
                             back_populates='post',
                             lazy=True,
@@ -354,6 +361,12 @@ class Post(db.Model):
     def manual_update(self):
         self.post_last_updated_date = datetime.now(timezone.utc)
 
+    def match_score(self, skills, personalities, languages):
+        """Number of the post's wanted skills, personalities and languages an applicant profile has."""
+        return len(set(self.skills or []) & set(skills or [])) \
+            + len(set(self.personalities or []) & set(personalities or [])) \
+            + len(set(self.languages or []) & set(languages or []))
+
 
 class PostLike(db.Model):
     __tablename__ = 'post_likes'
@@ -386,7 +399,7 @@ class PostApplicant(db.Model):
     __tablename__ = 'post_applicants'
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
-    attributes = db.Column(MutableDict.as_mutable(PickleType), default=lambda: {}, nullable=True)
+    attributes = db.Column(MutableDict.as_mutable(JSONB), default=lambda: {}, nullable=True)
 
     applied_time = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     review_status = db.Column(db.Integer, default=0, nullable=False)  # 0: still reviewing, 1: rejected, 2: matched
@@ -424,29 +437,9 @@ class PostComment(db.Model):
     post = db.relationship('Post', back_populates='comments')
     user = db.relationship('User', back_populates='comments')
 
-    def serialize(self, user_id):
-        comment_dict = OrderedDict([
-            ('id', self.id),
-            ('post_id', self.post_id),
-            ('user_id', self.user_id),
-            ('content', self.content),
-            ('deleted', self.deleted),
-            ('comment_created_date', to_iso8601(self.comment_created_date)),
-            ('comment_last_updated_date', to_iso8601(self.comment_last_updated_date)),
-            ('floor', self.floor),
-            ('likes', len(self.likes)),
-        ])
+    def serialize(self, user_id, level=0):
+        comment_dict = serialize_comment(self, likes=len(self.likes))
         if self.user:
-            participated = self.user.chat_rooms.count() - self.user.posts.count()
-            level = 0
-            if 11 <= participated <= 20:
-                level = 1
-            elif 21 <= participated <= 30:
-                level = 2
-            elif 31 <= participated <= 40:
-                level = 3
-            elif participated >= 41:
-                level = 4
             comment_dict['level'] = level
             comment_dict['nickname'] = Profile.query.get(self.user_id).nickname
             comment_dict['liked'] = db.session.execute(
@@ -511,17 +504,48 @@ class Message(db.Model):
                           nullable=False)
     content = db.Column(db.UnicodeText, nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
-    read_users = db.Column(MutableList.as_mutable(PickleType), default=lambda: [])
+    read_users = db.Column(MutableList.as_mutable(JSONB), default=lambda: [])
 
     room = db.relationship('ChatRoom', back_populates='messages')
 
 
 class Reference(db.Model):
     __tablename__ = 'references'
+    __table_args__ = (
+        db.Index('idx_references_to_user_id_post_id', 'to_user_id', 'post_id'),  # Reference timeline of a user
+    )
     from_user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
     to_user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
     rating = db.Column(db.Integer, nullable=False)
     content = db.Column(db.UnicodeText, nullable=False)
 
-    post = db.relationship('Post', back_populates='references')
\ No newline at end of file
+    post = db.relationship('Post', back_populates='references')
+
+
+class PendingReference(db.Model):
+    """A reference from_user still owes to_user for an ended event, filled by app.jobs.open_references."""
+    __tablename__ = 'pending_references'
+    __table_args__ = (
+        db.Index('idx_pending_references_from_user_id', 'from_user_id', 'event_end_date', 'post_id', 'to_user_id'),
+    )
+    from_user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    to_user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    event_end_date = db.Column(db.DateTime, nullable=False)  # Copied from the post for keyset ordering
+
+
+class Notification(db.Model):
+    """Socket notification outbox, written in the sender's transaction and emitted by app.notifications."""
+    __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('idx_notifications_user_id_id', 'user_id', 'id'),
+        db.Index('idx_notifications_undispatched', 'id', postgresql_where=db.text('dispatched_at IS NULL')),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    event = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    dispatched_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
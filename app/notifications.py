@@ -0,0 +1,124 @@
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update, insert
+
+from app.extensions import db, socketio
+from app.models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def notify(user_id, event, payload):
+    """Queue a socket notification in the current transaction, it is emitted once committed."""
+    notify_many([(user_id, event, payload)])
+
+
+def notify_many(notifications):
+    """Queue (user_id, event, payload) notifications with a single insert."""
+    notifications = list(notifications)
+    if not notifications:
+        return
+    db.session.execute(insert(Notification), [
+        {'user_id': user_id, 'event': event, 'payload': payload}
+        for user_id, event, payload in notifications
+    ])
+
+
+class NotificationDispatcher:
+    """
+    Drains the notifications outbox in batches as a background task of the server process and
+    emits each row to its user_<id> room. Without a Socket.IO message queue an emit only
+    reaches clients connected to this process, hence the single gunicorn worker; SKIP LOCKED
+    keeps an overlapping process (a deploy) from emitting a row twice. A failed emit is
+    retried on later passes up to max_attempts.
+    """
+
+    def __init__(self, app, interval=1.0, batch_size=100, max_attempts=5):
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        socketio.start_background_task(self.run)
+        logger.info('Notification dispatcher started')
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        while self.running:
+            dispatched = 0
+            try:
+                with self.app.app_context():
+                    dispatched = self.dispatch_batch()
+            except Exception as e:
+                logger.error(f"Notification dispatch failed: {e}")
+            finally:
+                with self.app.app_context():
+                    db.session.remove()
+
+            # Keep draining while there is a backlog
+            if dispatched < self.batch_size:
+                socketio.sleep(self.interval)
+            else:
+                socketio.sleep(0)
+
+    def dispatch_batch(self):
+        """Emit one batch of pending notifications. Returns the number of rows handled."""
+        rows = db.session.execute(
+            select(Notification.id, Notification.user_id, Notification.event, Notification.payload)
+            .where(Notification.dispatched_at.is_(None), Notification.attempts < self.max_attempts)
+            .order_by(Notification.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            db.session.rollback()
+            return 0
+
+        sent, failed = [], []
+        for notification_id, user_id, event, payload in rows:
+            try:
+                socketio.emit(event, dict(payload, notification_id=notification_id), to=f"user_{user_id}")
+                sent.append(notification_id)
+            except Exception as e:
+                logger.error(f"Failed to emit notification {notification_id}: {e}")
+                failed.append(notification_id)
+
+        if sent:
+            db.session.execute(
+                update(Notification)
+                .where(Notification.id.in_(sent))
+                .values(dispatched_at=datetime.now(timezone.utc), attempts=Notification.attempts + 1)
+            )
+        if failed:
+            db.session.execute(
+                update(Notification)
+                .where(Notification.id.in_(failed))
+                .values(attempts=Notification.attempts + 1)
+            )
+        db.session.commit()
+        return len(rows)
+
+
+def init_dispatcher(app):
+    """
+    Start the outbox dispatcher for this process when NOTIFICATION_DISPATCHER_ENABLED is set.
+    Never under the flask CLI, which has no connected sockets: rows it dispatched would be lost.
+    """
+    if not app.config.get('NOTIFICATION_DISPATCHER_ENABLED') or app.config.get('RUN_FROM_CLI'):
+        return None
+    dispatcher = NotificationDispatcher(
+        app,
+        interval=app.config['NOTIFICATION_DISPATCH_INTERVAL'],
+        batch_size=app.config['NOTIFICATION_BATCH_SIZE'],
+        max_attempts=app.config['NOTIFICATION_MAX_ATTEMPTS'],
+    )
+    dispatcher.start()
+    return dispatcher
@@ -0,0 +1,114 @@
+import time
+import logging
+import contextvars
+
+from eventlet import patcher, tpool
+from eventlet.semaphore import Semaphore
+from flask_security import hash_password as _hash_password, verify_password as _verify_password
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when more password operations are waiting than the queue limit allows."""
+
+
+class PasswordPool:
+    """
+    Runs bcrypt hashing and verification on eventlet's native thread pool.
+
+    bcrypt holds the CPU for ~100ms+ per call; run in the request greenlet it freezes the hub,
+    so every socket and HTTP request in the process stalls during a login burst. Calls here are
+    handed to tpool workers instead (bcrypt releases the GIL), at most `size` at a time, with
+    up to `queue_limit` more waiting before callers are turned away with PasswordPoolBusy.
+
+    Without socket monkey patching (flask CLI, plain threads) there is no hub to protect and
+    calls run inline.
+    """
+
+    def __init__(self, size=2, queue_limit=32):
+        self.size = size
+        self.queue_limit = queue_limit
+        self.enabled = False
+        self.semaphore = Semaphore(size)
+        self.reset_stats()
+
+    def init_app(self, app):
+        self.size = app.config['PASSWORD_POOL_SIZE']
+        self.queue_limit = app.config['PASSWORD_POOL_QUEUE_LIMIT']
+        self.semaphore = Semaphore(self.size)
+        self.enabled = app.config['PASSWORD_POOL_ENABLED'] and patcher.is_monkey_patched('socket')
+        if self.enabled:
+            tpool.set_num_threads(self.size)
+            logger.info(f"Password pool enabled with {self.size} threads")
+
+    def reset_stats(self):
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.queued = 0
+        self.in_flight = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'size': self.size,
+            'queue_limit': self.queue_limit,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'failed': self.failed,
+            'queued': self.queued,
+            'in_flight': self.in_flight,
+            'wait_seconds': self.wait_seconds,
+            'run_seconds': self.run_seconds,
+        }
+
+    def run(self, func, *args):
+        if not self.enabled:
+            return func(*args)
+
+        # Counters are only touched from greenlets of the hub thread, no locking needed
+        if self.queued >= self.queue_limit:
+            self.rejected += 1
+            raise PasswordPoolBusy()
+
+        self.submitted += 1
+        enqueued = time.perf_counter()
+        self.queued += 1
+        try:
+            self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        started = time.perf_counter()
+        self.wait_seconds += started - enqueued
+        self.in_flight += 1
+        try:
+            # Flask-Security reads its hash settings from current_app, carry the app context over
+            context = contextvars.copy_context()
+            result = tpool.execute(context.run, func, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+            return result
+        finally:
+            self.in_flight -= 1
+            self.run_seconds += time.perf_counter() - started
+            self.semaphore.release()
+
+
+password_pool = PasswordPool()
+
+
+def hash_password(password):
+    return password_pool.run(_hash_password, password)
+
+
+def verify_password(password, password_hash):
+    return password_pool.run(_verify_password, password, password_hash)
@@ -0,0 +1,221 @@
+import time
+import logging
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool, NullPool
+
+from app.utils import jsonify_response
+from app.extensions import db
+from app.metrics import registry, CounterMetric, GaugeMetric, HistogramMetric
+from app.replicas import replica_router
+
+logger = logging.getLogger(__name__)
+
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0, 20.0)
+
+
+class PoolTelemetry:
+    """Counters of one bind's pool, kept across engine.dispose() so they stay monotonic."""
+    __slots__ = ('label', 'pool', 'in_use', 'checkouts', 'wait_seconds', 'max_wait', 'timeouts', 'connects',
+                 'invalidations', 'soft_invalidations')
+
+    def __init__(self, label):
+        self.label = label
+        self.pool = None
+        self.in_use = 0
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+
+    def checked_out(self, seconds):
+        self.checkouts += 1
+        self.wait_seconds += seconds
+        self.max_wait = max(self.max_wait, seconds)
+        pool_checkout.observe((self.label,), seconds)
+
+    def timed_out(self):
+        self.timeouts += 1
+        pool_timeouts.inc((self.label,))
+
+    def connected(self, dbapi_connection, connection_record):
+        self.connects += 1
+        pool_connects.inc((self.label,))
+
+    def invalidated(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+        pool_invalidations.inc((self.label, 'false'))
+
+    def soft_invalidated(self, dbapi_connection, connection_record, exception):
+        self.soft_invalidations += 1
+        pool_invalidations.inc((self.label, 'true'))
+
+    def status(self):
+        pool = self.pool
+        return OrderedDict([
+            ('pool', pool.kind),
+            ('size', pool.size() if pool.kind == 'queue' else 0),
+            ('in_use', self.in_use),
+            ('idle', idle_connections(pool)),
+            ('overflow', max(pool.overflow(), 0) if pool.kind == 'queue' else 0),
+            ('checkouts', self.checkouts),
+            ('avg_checkout_ms', round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0),
+            ('max_checkout_ms', round(self.max_wait * 1000, 3)),
+            ('timeouts', self.timeouts),
+            ('connects', self.connects),
+            ('invalidations', self.invalidations),
+            ('soft_invalidations', self.soft_invalidations),
+        ])
+
+
+pool_telemetry = {}
+
+
+def idle_connections(pool):
+    return pool.checkedin() if pool.kind == 'queue' else 0
+
+
+class TelemetryPool:
+    """
+    Pool mixin timing every checkout (queue wait, new connections and pre-ping included) and
+    counting connections in use, under the pool's logging_name (the bind, see init_pool).
+    """
+    kind = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        label = self.logging_name or 'primary'
+        stats = self.telemetry = pool_telemetry.setdefault(label, PoolTelemetry(label))
+        stats.pool = self
+        # recreate() hands over the dispatcher, listeners included
+        if '_dispatch' not in kwargs:
+            event.listen(self, 'connect', stats.connected)
+            event.listen(self, 'invalidate', stats.invalidated)
+            event.listen(self, 'soft_invalidate', stats.soft_invalidated)
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeout:
+            self.telemetry.timed_out()
+            raise
+        self.telemetry.checked_out(time.perf_counter() - start)
+        return connection
+
+    def _do_get(self):
+        record = super()._do_get()
+        self.telemetry.in_use += 1
+        return record
+
+    def _do_return_conn(self, record):
+        self.telemetry.in_use -= 1
+        super()._do_return_conn(record)
+
+
+class TelemetryQueuePool(TelemetryPool, QueuePool):
+    kind = 'queue'
+
+
+class TelemetryNullPool(TelemetryPool, NullPool):
+    kind = 'null'
+
+
+def _by_bind(read):
+    return lambda: {(label,): read(stats) for label, stats in pool_telemetry.items() if stats.pool is not None}
+
+
+pool_checkout = registry.add(HistogramMetric(
+    'db_pool_checkout_seconds', 'Time to get a pooled connection, including queue wait, connect and pre-ping',
+    ('bind',), CHECKOUT_BUCKETS))
+pool_timeouts = registry.add(CounterMetric(
+    'db_pool_timeouts_total', 'Checkouts that gave up after pool_timeout', ('bind',)))
+pool_connects = registry.add(CounterMetric(
+    'db_pool_connects_total', 'New DBAPI connections opened', ('bind',)))
+pool_invalidations = registry.add(CounterMetric(
+    'db_pool_invalidations_total', 'Connections invalidated, soft ones are replaced on their next checkout',
+    ('bind', 'soft')))
+registry.add(GaugeMetric(
+    'db_pool_in_use', 'Connections checked out', _by_bind(lambda stats: stats.in_use), ('bind',)))
+registry.add(GaugeMetric(
+    'db_pool_idle', 'Connections idle in the pool', _by_bind(lambda stats: idle_connections(stats.pool)), ('bind',)))
+registry.add(GaugeMetric(
+    'db_pool_overflow', 'Connections open beyond pool_size',
+    _by_bind(lambda stats: max(stats.pool.overflow(), 0) if stats.pool.kind == 'queue' else 0), ('bind',)))
+
+
+def pgbouncer_engine_options(pool_size, max_overflow):
+    """
+    Behind PgBouncer in transaction mode, which owns the server connections: no pre-ping round
+    trip (PgBouncer answers for dead servers), no recycling, and either no pool at all
+    (pool_size 0) or a small one. Connections keep no session state between transactions,
+    the rollback on checkin makes sure none is left open.
+    """
+    if pool_size <= 0:
+        return {'poolclass': TelemetryNullPool, 'pool_pre_ping': False, 'pool_reset_on_return': 'rollback'}
+    return {
+        'poolclass': TelemetryQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': 20,
+        'pool_pre_ping': False,
+        'pool_reset_on_return': 'rollback',
+    }
+
+
+def init_pool(app):
+    """
+    Engine options for the DB_POOL_PROFILE (before db.init_app, after init_replicas so replica
+    binds get the same pool), pool telemetry exported through /metrics, and /health.
+
+    default: SQLALCHEMY_ENGINE_OPTIONS as configured.
+    pgbouncer: see pgbouncer_engine_options, sized by DB_POOL_SIZE and DB_POOL_MAX_OVERFLOW.
+    Either way the compiled statement cache holds DB_QUERY_CACHE_SIZE entries.
+    """
+    profile = app.config['DB_POOL_PROFILE']
+    if profile == 'pgbouncer':
+        options = pgbouncer_engine_options(app.config['DB_POOL_SIZE'], app.config['DB_POOL_MAX_OVERFLOW'])
+    elif profile == 'default':
+        options = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+        options.setdefault('poolclass', TelemetryQueuePool)
+    else:
+        raise ValueError(f"Unknown DB_POOL_PROFILE: {profile}")
+    options.setdefault('query_cache_size', app.config['DB_QUERY_CACHE_SIZE'])
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(options, pool_logging_name='primary')
+    binds = {}
+    for key, bind in app.config['SQLALCHEMY_BINDS'].items():
+        bind = dict(options, **bind) if isinstance(bind, dict) else dict(options, url=bind)
+        if profile == 'pgbouncer' and 'connect_args' in bind:
+            # PgBouncer refuses the `options` startup parameter; a hot standby is read-only regardless
+            bind['connect_args'] = {name: value for name, value in bind['connect_args'].items() if name != 'options'}
+        binds[key] = dict(bind, pool_logging_name=key)
+    app.config['SQLALCHEMY_BINDS'] = binds
+    logger.info('Connection pool profile: %s', profile)
+
+    @app.route('/health')
+    def health():
+        """Database round trip, per-bind pool telemetry and replica lag. 503 when the primary is down."""
+        start = time.perf_counter()
+        try:
+            db.session.execute(text('SELECT 1'))
+            database = OrderedDict([('ok', True), ('latency_ms', round((time.perf_counter() - start) * 1000, 3))])
+        except SQLAlchemyError as e:
+            # The driver message names hosts and ports, keep it out of this unauthenticated response
+            current_app.logger.error(f"Health check failed: {e}")
+            db.session.rollback()
+            database = OrderedDict([('ok', False), ('error', 'database unavailable')])
+
+        return jsonify_response(OrderedDict([
+            ('status', 'ok' if database['ok'] else 'unavailable'),
+            ('pool_profile', profile),
+            ('database', database),
+            ('pools', {label: stats.status() for label, stats in pool_telemetry.items() if stats.pool is not None}),
+            ('replicas', {replica.key: replica.lag for replica in replica_router.replicas}),
+        ]), 200 if database['ok'] else 503)
@@ -0,0 +1,219 @@
+import time
+import logging
+import itertools
+from functools import wraps
+from collections import OrderedDict
+
+from flask import g, current_app, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind: 0 when it has replayed everything it received, NULL on a primary
+LAG_QUERY = text(
+    'SELECT COALESCE(CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END, 0)'
+)
+
+# Replica connections refuse writes, so a write routed to one fails instead of diverging
+READ_ONLY_CONNECT_ARGS = {'options': '-c default_transaction_read_only=on'}
+
+# A lag older than this many check intervals (the probe task is stuck or gone) is not trusted
+STALE_CHECKS = 2
+
+
+class Replica:
+    __slots__ = ('key', 'lag', 'checked_at')
+
+    def __init__(self, key):
+        self.key = key
+        self.lag = None
+        self.checked_at = float('-inf')
+
+
+class ReplicaRouter:
+    """
+    Picks a replica bind for a read-only request, round robin over the replicas whose last
+    measured lag is within max_lag. Lags are measured every check_interval seconds by a
+    background task, started by the first choose(), so a request never waits on a replica
+    connection; a replica that cannot be reached is skipped until a later check succeeds.
+    """
+
+    def __init__(self):
+        self.replicas = []
+        self.max_lag = 5.0
+        self.check_interval = 2.0
+        self.monitoring = False
+        self._turn = itertools.count()
+
+    def configure(self, keys, max_lag, check_interval):
+        self.replicas = [Replica(key) for key in keys]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+
+    def check(self, replica, engines):
+        try:
+            with engines[replica.key].connect() as conn:
+                replica.lag = float(conn.execute(LAG_QUERY).scalar())
+        except SQLAlchemyError as e:
+            replica.lag = None
+            logger.warning('Replica %s unavailable: %s', replica.key, e)
+        replica.checked_at = time.monotonic()
+        return replica.lag
+
+    def start(self, app):
+        if self.monitoring or not self.replicas:
+            return
+        # app.extensions imports this module
+        from app.extensions import socketio
+        self.monitoring = True
+        socketio.start_background_task(self.monitor, app)
+        logger.info('Replica lag probe started')
+
+    def stop(self):
+        self.monitoring = False
+
+    def monitor(self, app):
+        from app.extensions import db, socketio
+        while self.monitoring:
+            try:
+                with app.app_context():
+                    for replica in self.replicas:
+                        self.check(replica, db.engines)
+            except Exception as e:
+                logger.error(f"Replica lag probe failed: {e}")
+            socketio.sleep(self.check_interval)
+
+    def usable(self, replica):
+        fresh = time.monotonic() - replica.checked_at < self.check_interval * STALE_CHECKS
+        return fresh and replica.lag is not None and replica.lag <= self.max_lag
+
+    def choose(self, app):
+        """Return the bind key of a usable replica, or None to read from the primary."""
+        if not self.replicas:
+            return None
+        self.start(app)
+        start = next(self._turn)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if self.usable(replica):
+                return replica.key
+        return None
+
+
+class RecentWriters:
+    """
+    LRU of user_id -> time of the user's last write in this process. Their reads stay on the
+    primary for `window` seconds so they see their own writes on a lagging replica.
+    """
+
+    def __init__(self, maxsize=10000, window=7.0):
+        self.maxsize = maxsize
+        self.window = window
+        self.entries = OrderedDict()
+
+    def touch(self, user_id):
+        self.entries[user_id] = time.monotonic()
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def wrote_recently(self, user_id):
+        written_at = self.entries.get(user_id)
+        if written_at is None:
+            return False
+        if time.monotonic() - written_at < self.window:
+            return True
+        del self.entries[user_id]
+        return False
+
+
+replica_router = ReplicaRouter()
+recent_writers = RecentWriters()
+
+
+class RoutingSession(Session):
+    """
+    db.session sending the reads of @replica_reads requests to the replica picked for the
+    request. Flushes, INSERT/UPDATE/DELETE statements and everything else use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) and has_request_context():
+            key = g.get('_replica_bind')
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def record_write():
+    """Pin the rest of the request and the caller's next reads to the primary."""
+    if has_request_context():
+        g._replica_bind = None
+        user_id = g.get('auth_user_id')
+        if user_id is not None:
+            recent_writers.touch(user_id)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def after_flush(session, flush_context):
+    record_write()
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        record_write()
+
+
+def replica_reads(func):
+    """
+    Mark a read-only view: its queries go to a replica unless none is within the lag
+    tolerance or the authenticated user wrote something in the read-your-writes window.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        user_id = g.get('auth_user_id')
+        if user_id is not None and recent_writers.wrote_recently(user_id):
+            g._db_route = 'primary_recent_write'
+        else:
+            key = replica_router.choose(current_app._get_current_object())
+            g._replica_bind = key
+            g._db_route = key or 'primary'
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def init_replicas(app):
+    """
+    Add a read-only bind per DATABASE_REPLICA_URLS entry (before db.init_app) and configure
+    routing. Replica connects give up after REPLICA_CONNECT_TIMEOUT seconds so an unreachable
+    replica does not hold up the lag probe. The read-your-writes window covers the lag
+    tolerance plus the age a lag measurement may reach, the longest a replica accepted for
+    reads can be behind. With SQL_QUERY_HEADER (on in debug) responses carry X-DB-Route.
+    """
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    keys = []
+    for index, url in enumerate(app.config['DATABASE_REPLICA_URLS']):
+        key = f'replica_{index}'
+        binds[key] = {'url': url, 'connect_args': dict(READ_ONLY_CONNECT_ARGS,
+                                                       connect_timeout=app.config['REPLICA_CONNECT_TIMEOUT'])}
+        keys.append(key)
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+    max_lag = app.config['REPLICA_MAX_LAG_SECONDS']
+    check_interval = app.config['REPLICA_LAG_CHECK_SECONDS']
+    replica_router.configure(keys, max_lag, check_interval)
+    recent_writers.window = max_lag + check_interval * STALE_CHECKS
+    if keys:
+        logger.info('Routing read-only endpoints to %d replica(s), max lag %.1fs', len(keys), max_lag)
+
+    if app.config['SQL_QUERY_HEADER'] or app.debug:
+        @app.after_request
+        def db_route_header(response):
+            if '_db_route' in g:
+                response.headers['X-DB-Route'] = g._db_route
+            return response
@@ -1,11 +1,13 @@
-from .auth import auth_bp
-from .profile import profile_bp
-from .post import post_bp
-from .comment import comment_bp
-from .applicant import applicant_bp
-from .user import user_bp
-from .reference import reference_bp
-from .chat import chat_bp
+from flask_restx.swagger import Swagger
+
+from .auth import auth_bp, auth_api
+from .profile import profile_bp, profile_api
+from .post import post_bp, post_api
+from .comment import comment_bp, comment_api
+from .applicant import applicant_bp, applicant_api
+from .user import user_bp, user_api
+from .reference import reference_bp, reference_api
+from .chat import chat_bp, chat_api
 
 __all__ = [
     'auth_bp',
@@ -16,4 +18,17 @@ __all__ = [
     'user_bp',
     'reference_bp',
     'chat_bp'
-]
\ No newline at end of file
+]
+
+APIS = [auth_api, profile_api, post_api, comment_api, applicant_api, user_api, reference_api, chat_api]
+
+
+def build_api_docs(app):
+    """
+    Build and cache the Swagger spec of every blueprint's Api now rather than on its first request.
+    Api.__schema__ would log a failure and serve {"error": ...} for the life of the process, so
+    the spec is built directly and a broken model raises here.
+    """
+    with app.test_request_context():
+        for api in APIS:
+            api._schema = Swagger(api).as_dict()
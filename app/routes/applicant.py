@@ -1,11 +1,18 @@
-from flask import Blueprint, current_app, request
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import Blueprint, current_app, request, g
 from flask_restx import Api, Resource, fields
-from sqlalchemy import exists, select
-from sqlalchemy.orm import joinedload
+from sqlalchemy import select, func, and_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from app.utils import jsonify_response, to_iso8601
-from app.extensions import db, socketio
-from app.models import Post, User, DictItem, PostApplicant, Profile, ChatRoomUser
+from app.utils import jsonify_response, to_iso8601, page_param
+from app.tokens import token_owner, is_token_owner
+from app.extensions import db
+from app.notifications import notify, notify_many
+from app.stats import get_user_stats, adjust_user_stats
+from app.statements import user_exists, has_applied, post_host, application_status
+from app.models import Post, DictItem, PostApplicant, Profile, ChatRoomUser
 
 applicant_bp = Blueprint('applicant_bp', __name__)
 applicant_api = Api(
@@ -17,78 +24,214 @@ applicant_api = Api(
 )
 applicant_ns = applicant_api.namespace('', description='Operations related to applicants')
 
+MAX_PER_PAGE = 100
+
 
 @applicant_ns.route('/list/<int:user_id>')
 class ListApplicants(Resource):
+    @applicant_ns.param('summary', 'Only return pending applicant counts per post (for the inbox badge)', type=bool, default=False)
+    @applicant_ns.param('post_id', 'Only list applicants of this post', type=int)
+    @applicant_ns.param('page', 'Page of posts, defaults to 1', type=int, default=1)
+    @applicant_ns.param('per_page', 'Posts per page (1-100), defaults to 10', type=int, default=10)
+    @applicant_ns.param('applicants_page', 'Page of applicants within each post, defaults to 1', type=int, default=1)
+    @applicant_ns.param('applicants_per_page', 'Applicants per post (1-100), defaults to 20', type=int, default=20)
+    @applicant_ns.param('sort', 'time: newest application first, match: best profile match first', default='time')
     @applicant_ns.response(200, 'Success')
     @applicant_ns.response(400, 'Bad Request')
     @applicant_ns.response(404, 'User not found')
+    @token_owner('user_id')
     def get(self, user_id):
+        summary = request.args.get('summary', 'false').lower() in ('1', 'true')
+        post_id = request.args.get('post_id', type=int)
+        page = page_param(request.args, 'page', 1)
+        per_page = page_param(request.args, 'per_page', 10, MAX_PER_PAGE)
+        applicants_page = page_param(request.args, 'applicants_page', 1)
+        applicants_per_page = page_param(request.args, 'applicants_per_page', 20, MAX_PER_PAGE)
+        if page is None or applicants_page is None:
+            return jsonify_response({'error': 'page and applicants_page must be positive integers'}, 400)
+        if per_page is None or applicants_per_page is None:
+            return jsonify_response(
+                {'error': f'per_page and applicants_per_page must be integers from 1 to {MAX_PER_PAGE}'}, 400)
+        sort = request.args.get('sort', 'time')
+        if sort not in ('time', 'match'):
+            return jsonify_response({'error': f"Invalid sort: {sort}"}, 400)
+
         # Verify user exists
-        if not db.session.scalar(select(exists().where(User.id == user_id))):
+        if not user_exists(user_id):
             return jsonify_response({'error': 'User not found'}, 404)
 
         try:
-            results = db.session.query(
-                PostApplicant, Post, Profile, User
-            ).options(
-                joinedload(PostApplicant.post),
-                joinedload(PostApplicant.user)
-            ).join(
-                Post, PostApplicant.post_id == Post.id
+            # Host's posts with pending applicants, with their pending count
+            posts_query = db.session.query(
+                Post.id,
+                Post.title,
+                Post.type,
+                Post.number_of_people_required,
+                func.count(PostApplicant.user_id).label('pending_count')
             ).join(
-                Profile, PostApplicant.user_id == Profile.id
-            ).join(
-                User, PostApplicant.user_id == User.id
+                PostApplicant,
+                and_(
+                    PostApplicant.post_id == Post.id,
+                    PostApplicant.review_status == 0
+                )
             ).filter(
-                Post.user_id == user_id,
-                PostApplicant.review_status == 0
+                Post.user_id == user_id
+            ).group_by(
+                Post.id
             ).order_by(
                 Post.event_start_date.desc(),
-                PostApplicant.applied_time.desc()
-            ).all()
-
-            # Calculate participation count and level for each user
-            grouped_applicants = {}
-            for applicant, post, profile, user in results:
-                if post.id not in grouped_applicants:
-                    grouped_applicants[post.id] = {
-                        'post_id': post.id,
-                        'post_title': post.title,
-                        'post_type': post.type,
-                        'number_of_people_required': post.number_of_people_required,
-                        'applicants': []
+                Post.id.desc()
+            )
+            if post_id is not None:
+                posts_query = posts_query.filter(Post.id == post_id)
+
+            if summary:
+                posts = posts_query.all()
+                return jsonify_response({
+                    'posts': [
+                        OrderedDict([
+                            ('post_id', post.id),
+                            ('post_title', post.title),
+                            ('post_type', post.type),
+                            ('number_of_people_required', post.number_of_people_required),
+                            ('pending_count', post.pending_count)
+                        ])
+                        for post in posts
+                    ],
+                    'total_pending': sum(post.pending_count for post in posts)
+                }, 200)
+
+            pagination = posts_query.paginate(page=page, per_page=per_page, error_out=False)
+            post_ids = [post.id for post in pagination.items]
+
+            offset = (applicants_page - 1) * applicants_per_page
+            if sort == 'match':
+                applicants_by_post = self.ranked_by_match(post_ids, offset, applicants_per_page)
+            else:
+                applicants_by_post = self.ranked_by_time(post_ids, offset, applicants_per_page)
+
+            # Participation count and level for every listed applicant in one lookup
+            stats = get_user_stats(
+                applicant.user_id
+                for applicants in applicants_by_post.values()
+                for applicant, _ in applicants
+            )
+
+            posts_with_applicants = []
+            for post in pagination.items:
+                applicants = []
+                for applicant, score in applicants_by_post.get(post.id, []):
+                    applicant_dict = {
+                        'user_id': applicant.user_id,
+                        'nickname': applicant.nickname if applicant.nickname is not None else 'Anonymous',
+                        'bio': applicant.bio if applicant.bio is not None else '',
+                        'applied_time': to_iso8601(applicant.applied_time),
+                        'attributes': applicant.attributes,
+                        'level': stats[applicant.user_id].level,
+                        'participated': stats[applicant.user_id].participated
                     }
-
-                # Calculate participation count and level
-                participated = user.chat_rooms.count()
-                level = 0
-                if 11 <= participated <= 20:
-                    level = 1
-                elif 21 <= participated <= 30:
-                    level = 2
-                elif 31 <= participated <= 40:
-                    level = 3
-                elif participated >= 41:
-                    level = 4
-
-                grouped_applicants[post.id]['applicants'].append({
-                    'user_id': applicant.user_id,
-                    'nickname': profile.nickname if profile is not None else 'Anonymous',
-                    'bio': profile.bio if profile is not None and profile.bio is not None else '',
-                    'applied_time': to_iso8601(applicant.applied_time),
-                    'attributes': applicant.attributes,
-                    'level': level,
-                    'participated': participated
+                    if score is not None:
+                        applicant_dict['match_score'] = score
+                    applicants.append(applicant_dict)
+
+                posts_with_applicants.append({
+                    'post_id': post.id,
+                    'post_title': post.title,
+                    'post_type': post.type,
+                    'number_of_people_required': post.number_of_people_required,
+                    'pending_count': post.pending_count,
+                    'applicants': applicants
                 })
 
-            posts_with_applicants = list(grouped_applicants.values())
-            return jsonify_response({'posts': posts_with_applicants}, 200)
+            return jsonify_response({
+                'posts': posts_with_applicants,
+                'page': pagination.page,
+                'pages': pagination.pages,
+                'per_page': pagination.per_page
+            }, 200)
 
         except Exception as e:
             current_app.logger.error(f"Error listing applicants: {str(e)}")
             return jsonify_response({'error': str(e)}, 500)
 
+    @staticmethod
+    def ranked_by_time(post_ids, offset, limit):
+        """One page of pending applicants per post, newest first, in a single windowed query."""
+        if not post_ids:
+            return {}
+        ranked = select(
+            PostApplicant.post_id,
+            PostApplicant.user_id,
+            PostApplicant.applied_time,
+            PostApplicant.attributes,
+            func.row_number().over(
+                partition_by=PostApplicant.post_id,
+                order_by=PostApplicant.applied_time.desc()
+            ).label('rn')
+        ).where(
+            PostApplicant.post_id.in_(post_ids),
+            PostApplicant.review_status == 0
+        ).subquery()
+
+        rows = db.session.execute(
+            select(
+                ranked.c.post_id,
+                ranked.c.user_id,
+                ranked.c.applied_time,
+                ranked.c.attributes,
+                Profile.nickname,
+                Profile.bio
+            ).outerjoin(
+                Profile, Profile.id == ranked.c.user_id
+            ).where(
+                ranked.c.rn > offset,
+                ranked.c.rn <= offset + limit
+            ).order_by(
+                ranked.c.post_id,
+                ranked.c.rn
+            )
+        ).all()
+
+        applicants_by_post = {}
+        for row in rows:
+            applicants_by_post.setdefault(row.post_id, []).append((row, None))
+        return applicants_by_post
+
+    @staticmethod
+    def ranked_by_match(post_ids, offset, limit):
+        """One page of pending applicants per post, best profile match first."""
+        if not post_ids:
+            return {}
+        posts = {post.id: post for post in Post.query.filter(Post.id.in_(post_ids))}
+        rows = db.session.execute(
+            select(
+                PostApplicant.post_id,
+                PostApplicant.user_id,
+                PostApplicant.applied_time,
+                PostApplicant.attributes,
+                Profile.nickname,
+                Profile.bio,
+                Profile.skills,
+                Profile.personalities,
+                Profile.languages
+            ).outerjoin(
+                Profile, Profile.id == PostApplicant.user_id
+            ).where(
+                PostApplicant.post_id.in_(post_ids),
+                PostApplicant.review_status == 0
+            )
+        ).all()
+
+        scored_by_post = {}
+        for row in rows:
+            score = posts[row.post_id].match_score(row.skills, row.personalities, row.languages)
+            scored_by_post.setdefault(row.post_id, []).append((row, score))
+
+        return {
+            post_id: sorted(scored, key=lambda item: (-item[1], -item[0].applied_time.timestamp()))[offset:offset + limit]
+            for post_id, scored in scored_by_post.items()
+        }
+
 
 create_applicant_model = applicant_api.model(
     'CreateApplicantModel',
@@ -106,6 +249,7 @@ class CreateApplicant(Resource):
     @applicant_ns.response(200, 'Success')
     @applicant_ns.response(400, 'Bad Request')
     @applicant_ns.response(404, 'Post or User not found')
+    @token_owner('user_id')
     def post(self):
         data = request.get_json()
 
@@ -119,8 +263,7 @@ class CreateApplicant(Resource):
         post_id = data['post_id']
 
         # Check if already apply:
-        if db.session.scalar(select(exists().where(PostApplicant.user_id == user_id,
-                                             PostApplicant.post_id == post_id))):
+        if has_applied(user_id, post_id):
             return jsonify_response({'error': 'Already apply this post', }, 400)
 
         # Check User
@@ -143,15 +286,13 @@ class CreateApplicant(Resource):
         try:
             post.manual_update()
             db.session.add(applicant)
-            db.session.commit()
-
-            host_room = f"user_{post.user_id}"
-            socketio.emit('new_application', {
+            notify(post.user_id, 'new_application', {
                 'post_id': data['post_id'],
                 'post_title': post.title,
                 'user_nickname': user_profile.nickname,
                 'message': f"New application for '{post.title}' from {user_profile.nickname}!"
-            }, to=host_room)
+            })
+            db.session.commit()
 
             return jsonify_response({'message': "Application create successfully"}, 200)
 
@@ -176,6 +317,7 @@ class RetrieveApplicant(Resource):
     @applicant_ns.response(200, 'Success')
     @applicant_ns.response(400, 'Bad Request')
     @applicant_ns.response(404, 'Applicant not found')
+    @token_owner('user_id')
     def delete(self):
         data = request.get_json()
 
@@ -188,7 +330,7 @@ class RetrieveApplicant(Resource):
         user_id = data['user_id']
         post_id = data['post_id']
 
-        applicant = PostApplicant.query.get((user_id, post_id))
+        applicant = db.session.get(PostApplicant, (user_id, post_id))
 
         if not applicant:
             return jsonify_response({'error': 'Applicant not found',}, 404)
@@ -204,6 +346,42 @@ class RetrieveApplicant(Resource):
             return jsonify_response({'error': str(e)}, 500)
 
 
+def notify_reviews(post_id, approved=(), rejected=(), no_seats=()):
+    """Queue review outcomes of one post for the applicants in the current transaction."""
+    post_title, host_nickname = db.session.execute(
+        select(Post.title, Profile.nickname)
+        .outerjoin(Profile, Profile.id == Post.user_id)
+        .where(Post.id == post_id)
+    ).one()
+
+    notifications = []
+    for user_id in approved:
+        notifications.append((user_id, 'application_approved', {
+            'post_id': post_id,
+            'post_title': post_title,
+            'host_nickname': host_nickname,
+            'message': f"Your application for '{post_title}' has been approved by {host_nickname}! You can now join the chat room."
+        }))
+
+    for user_id in rejected:
+        notifications.append((user_id, 'application_rejected', {
+            'post_id': post_id,
+            'post_title': post_title,
+            'host_nickname': host_nickname,
+            'message': f"Your application for '{post_title}' has been rejected by {host_nickname}."
+        }))
+
+    for user_id in no_seats:
+        notifications.append((user_id, 'application_rejected', {
+            'post_id': post_id,
+            'post_title': post_title,
+            'host_nickname': host_nickname,
+            'message': f"Your application for '{post_title}' has been rejected."
+        }))
+
+    notify_many(notifications)
+
+
 approve_model = applicant_ns.model(
     'ApproveModel',
     {
@@ -219,7 +397,9 @@ class ReviewApplicant(Resource):
     @applicant_ns.expect(approve_model)
     @applicant_ns.response(200, 'Success')
     @applicant_ns.response(400, 'Bad Request')
+    @applicant_ns.response(403, 'Only the host can review applicants')
     @applicant_ns.response(404, 'Applicant not found')
+    @applicant_ns.response(409, 'No people required')
     def post(self):
         data = request.get_json()
         required_fields = ['user_id', 'post_id', 'approve']
@@ -228,66 +408,221 @@ class ReviewApplicant(Resource):
                 current_app.logger.error(f"Missing required field: {field}")
                 return jsonify_response({'error': f"Missing required field: {field}"}, 400)
 
-        applicant = PostApplicant.query \
-            .options(joinedload(PostApplicant.post)) \
-            .options(joinedload(PostApplicant.post).joinedload(Post.user).joinedload(User.profile)) \
-            .filter_by(user_id=data['user_id'], post_id=data['post_id']) \
-            .first()
-
-        if not applicant:
-            current_app.logger.error(f"Applicant not found: {data['post_id']}")
-            return jsonify_response({'error': 'Applicant not found'}, 404)
-
-        if applicant.review_status != 0:
-            current_app.logger.error(f"Applicant already reviewed: {applicant.review_status}")
-            return jsonify_response({'error': f'Applicant already reviewed: {applicant.review_status}'}, 400)
+        user_id = data['user_id']
+        post_id = data['post_id']
 
         try:
+            # Only the host reviews, checked when the request carries an access token
+            if g.get('auth_user_id') is not None:
+                host_id = post_host(post_id)
+                if host_id is not None and not is_token_owner(host_id):
+                    return jsonify_response({'error': 'Only the host can review applicants'}, 403)
+
+            if data['approve']:
+                # Lock the post row before the applicant row, in the order BulkReviewApplicants takes them
+                db.session.execute(select(Post.id).where(Post.id == post_id).with_for_update())
+
+            # Claim the review: only one request can move an applicant out of "still reviewing"
+            claimed = db.session.execute(
+                update(PostApplicant)
+                .where(
+                    PostApplicant.user_id == user_id,
+                    PostApplicant.post_id == post_id,
+                    PostApplicant.review_status == 0
+                )
+                .values(review_status=2 if data['approve'] else 1)
+                .returning(PostApplicant.user_id)
+            ).first()
+
+            if claimed is None:
+                db.session.rollback()
+                review_status = application_status(user_id, post_id)
+                if review_status is None:
+                    current_app.logger.error(f"Applicant not found: {post_id}")
+                    return jsonify_response({'error': 'Applicant not found'}, 404)
+                current_app.logger.error(f"Applicant already reviewed: {review_status}")
+                return jsonify_response({'error': f'Applicant already reviewed: {review_status}'}, 400)
+
+            approved = False
             if data['approve']:
-                if applicant.post.number_of_people_required == 0:
-                    applicant.review_status = 1
+                # Take a seat only if one is left, the post row lock serializes concurrent approvals
+                seat = db.session.execute(
+                    update(Post)
+                    .where(Post.id == post_id, Post.number_of_people_required > 0)
+                    .values(
+                        number_of_people_required=Post.number_of_people_required - 1,
+                        post_last_updated_date=datetime.now(timezone.utc)
+                    )
+                    .returning(Post.id)
+                ).first()
+
+                if seat is None:
                     current_app.logger.error('No people required')
-
-                    user_room = f"user_{data['user_id']}"
-                    socketio.emit('application_rejected', {
-                        'post_id': data['post_id'],
-                        'post_title': applicant.post.title,
-                        'host_nickname': applicant.post.user.profile.nickname,
-                        'message': f"Your application for '{applicant.post.title}' has been rejected."
-                    }, to=user_room)
-
-                    return jsonify_response({'error': 'No people required'}, 409)
-
-                applicant.post.number_of_people_required -= 1
-                applicant.post.manual_update()
-                applicant.review_status = 2
-
-                # Create chat room user
-                chat_room_user = ChatRoomUser(post_id=data['post_id'], user_id=data['user_id'])
-                db.session.add(chat_room_user)
-
-                # Emit socket event to the approved user
-                user_room = f"user_{data['user_id']}"
-                socketio.emit('application_approved', {
-                    'post_id': data['post_id'],
-                    'post_title': applicant.post.title,
-                    'host_nickname': applicant.post.user.profile.nickname,
-                    'message': f"Your application for '{applicant.post.title}' has been approved by {applicant.post.user.profile.nickname}! You can now join the chat room."
-                }, to=user_room)
+                    db.session.execute(
+                        update(PostApplicant)
+                        .where(PostApplicant.user_id == user_id, PostApplicant.post_id == post_id)
+                        .values(review_status=1)
+                    )
+                else:
+                    joined = db.session.execute(
+                        pg_insert(ChatRoomUser)
+                        .values(post_id=post_id, user_id=user_id)
+                        .on_conflict_do_nothing()
+                        .returning(ChatRoomUser.user_id)
+                    ).first()
+                    if joined is not None:
+                        adjust_user_stats([user_id], participated=1)
+                    approved = True
+
+            if approved:
+                notify_reviews(post_id, approved=[user_id])
+            elif data['approve']:
+                notify_reviews(post_id, no_seats=[user_id])
             else:
-                applicant.review_status = 1
+                notify_reviews(post_id, rejected=[user_id])
+            db.session.commit()
 
-                # Emit socket event for rejection
-                user_room = f"user_{data['user_id']}"
-                socketio.emit('application_rejected', {
-                    'post_id': data['post_id'],
-                    'post_title': applicant.post.title,
-                    'host_nickname': applicant.post.user.profile.nickname,
-                    'message': f"Your application for '{applicant.post.title}' has been rejected by {applicant.post.user.profile.nickname}."
-                }, to=user_room)
+            if data['approve'] and not approved:
+                return jsonify_response({'error': 'No people required'}, 409)
+            return jsonify_response({'message': "Applicant review successfully"}, 200)
 
+        except Exception as e:
+            current_app.logger.error(e)
+            db.session.rollback()
+            return jsonify_response({'error': str(e)}, 500)
+
+
+review_item_model = applicant_ns.model(
+    'ReviewItemModel',
+    {
+        'user_id': fields.Integer(required=True, description='Applicant user ID'),
+        'approve': fields.Boolean(required=True, description='True: Approve, False: Reject')
+    }
+)
+
+bulk_review_model = applicant_ns.model(
+    'BulkReviewModel',
+    {
+        'post_id': fields.Integer(required=True, description='Post ID'),
+        'reviews': fields.List(fields.Nested(review_item_model), required=True,
+                               description='Approvals take the remaining seats in list order'),
+    }
+)
+
+
+@applicant_ns.route('/review_bulk')
+class BulkReviewApplicants(Resource):
+    @applicant_ns.expect(bulk_review_model)
+    @applicant_ns.response(200, 'Success, see per-item outcomes')
+    @applicant_ns.response(400, 'Bad Request')
+    @applicant_ns.response(403, 'Only the host can review applicants')
+    @applicant_ns.response(404, 'Post not found')
+    def post(self):
+        data = request.get_json()
+        required_fields = ['post_id', 'reviews']
+        for field in required_fields:
+            if field not in data or data[field] is None:
+                current_app.logger.error(f"Missing required field: {field}")
+                return jsonify_response({'error': f"Missing required field: {field}"}, 400)
+
+        post_id = data['post_id']
+
+        # First decision per applicant wins, request order is kept. Ids are matched against the
+        # claimed rows as ints, a "12" left as is would be claimed (rejected) but never approved
+        decisions = OrderedDict()
+        for item in data['reviews']:
+            if not isinstance(item, dict) or item.get('user_id') is None or item.get('approve') is None:
+                return jsonify_response({'error': 'Each review needs user_id and approve'}, 400)
+            try:
+                user_id = int(item['user_id'])
+            except (TypeError, ValueError):
+                return jsonify_response({'error': f"Invalid user_id: {item['user_id']}"}, 400)
+            decisions.setdefault(user_id, bool(item['approve']))
+        if not decisions:
+            return jsonify_response({'error': 'No reviews given'}, 400)
+
+        try:
+            # Lock the post row first, every approval below draws from its seats
+            post = db.session.execute(
+                select(Post.number_of_people_required, Post.user_id)
+                .where(Post.id == post_id)
+                .with_for_update()
+            ).first()
+            if post is None:
+                db.session.rollback()
+                return jsonify_response({'error': 'Post not found'}, 404)
+            if not is_token_owner(post.user_id):
+                db.session.rollback()
+                return jsonify_response({'error': 'Only the host can review applicants'}, 403)
+            seats_left = post.number_of_people_required
+
+            # Claim every applicant still under review, as rejected until a seat is assigned
+            claimed = set(db.session.scalars(
+                update(PostApplicant)
+                .where(
+                    PostApplicant.post_id == post_id,
+                    PostApplicant.user_id.in_(decisions.keys()),
+                    PostApplicant.review_status == 0
+                )
+                .values(review_status=1)
+                .returning(PostApplicant.user_id)
+            ).all())
+
+            candidates = [user_id for user_id, approve in decisions.items() if approve and user_id in claimed]
+            approved = candidates[:max(seats_left, 0)]
+            no_seats = candidates[len(approved):]
+            rejected = [user_id for user_id, approve in decisions.items() if not approve and user_id in claimed]
+
+            if approved:
+                db.session.execute(
+                    update(Post)
+                    .where(Post.id == post_id)
+                    .values(
+                        number_of_people_required=Post.number_of_people_required - len(approved),
+                        post_last_updated_date=datetime.now(timezone.utc)
+                    )
+                )
+                db.session.execute(
+                    update(PostApplicant)
+                    .where(PostApplicant.post_id == post_id, PostApplicant.user_id.in_(approved))
+                    .values(review_status=2)
+                )
+                joined = db.session.scalars(
+                    pg_insert(ChatRoomUser)
+                    .values([{'post_id': post_id, 'user_id': user_id} for user_id in approved])
+                    .on_conflict_do_nothing()
+                    .returning(ChatRoomUser.user_id)
+                ).all()
+                adjust_user_stats(joined, participated=1)
+
+            # Why the unclaimed ones were skipped
+            unclaimed = [user_id for user_id in decisions if user_id not in claimed]
+            existing = dict(db.session.execute(
+                select(PostApplicant.user_id, PostApplicant.review_status)
+                .where(PostApplicant.post_id == post_id, PostApplicant.user_id.in_(unclaimed))
+            ).all()) if unclaimed else {}
+
+            notify_reviews(post_id, approved=approved, rejected=rejected, no_seats=no_seats)
             db.session.commit()
-            return jsonify_response({'message': "Applicant review successfully"}, 200)
+
+            outcomes = {user_id: 'approved' for user_id in approved}
+            outcomes.update({user_id: 'rejected' for user_id in rejected})
+            outcomes.update({user_id: 'no_seats' for user_id in no_seats})
+            results = []
+            for user_id in decisions:
+                if user_id in outcomes:
+                    results.append({'user_id': user_id, 'outcome': outcomes[user_id]})
+                elif user_id in existing:
+                    results.append({'user_id': user_id, 'outcome': 'already_reviewed', 'review_status': existing[user_id]})
+                else:
+                    results.append({'user_id': user_id, 'outcome': 'not_found'})
+
+            return jsonify_response({
+                'results': results,
+                'approved': len(approved),
+                'rejected': len(rejected) + len(no_seats),
+                'number_of_people_required': max(seats_left, 0) - len(approved)
+            }, 200)
 
         except Exception as e:
             current_app.logger.error(e)
@@ -2,12 +2,14 @@ import re
 
 from flask import Blueprint, request, current_app
 from flask_restx import Api, Resource, fields
-from flask_security import hash_password, verify_password, login_user
-from sqlalchemy import select, exists
+from flask_security import login_user
 
 from app.utils import jsonify_response
-from app.models import user_datastore, Profile, User
+from app.statements import has_profile
+from app.models import user_datastore, User
 from app.extensions import db
+from app.passwords import hash_password, verify_password, PasswordPoolBusy
+from app.tokens import issue_token, verify_token, revoke_tokens, bearer_token, InvalidToken
 
 auth_bp = Blueprint('auth_bp', __name__)
 auth_api = Api(
@@ -33,6 +35,7 @@ class Register(Resource):
     @auth_api.response(201, 'User registered successfully')
     @auth_api.response(400, 'Validation error')
     @auth_api.response(409, 'User already exists')
+    @auth_api.response(503, 'Too many password operations in progress')
     def post(self):
         data = request.get_json()
         required_fields = ['email', 'password']
@@ -58,10 +61,16 @@ class Register(Resource):
             _ = db.session.merge(existing_user)
             return jsonify_response({'message': 'User already exists'}, 409)
 
+        try:
+            password = hash_password(data['password'])
+        except PasswordPoolBusy:
+            current_app.logger.warning('Registration rejected: password pool is saturated')
+            return jsonify_response({'message': 'Server is busy, please try again'}, 503)
+
         try:
             new_user = user_datastore.create_user(
                 email=data['email'],
-                password=hash_password(data['password']),
+                password=password,
             )
             login_user(new_user)
 
@@ -69,10 +78,13 @@ class Register(Resource):
 
             db.session.add(new_user)
             db.session.commit()
+            access_token, expires_in = issue_token(new_user)
 
             return jsonify_response({
                 'message': 'User created successfully',
                 'user_id': new_user.id,
+                'access_token': access_token,
+                'expires_in': expires_in,
             }, 201)
 
         except Exception as e:
@@ -93,6 +105,7 @@ class Login(Resource):
     @auth_api.response(200, 'User logged successfully')
     @auth_api.response(400, 'Validation error')
     @auth_api.response(401, 'Invalid login credentials')
+    @auth_api.response(503, 'Too many password operations in progress')
     def post(self):
         data = request.get_json()
         required_fields = ['email', 'password']
@@ -105,7 +118,13 @@ class Login(Resource):
 
         # Check user
         user = user_datastore.find_user(email=data['email'])
-        if not user or not verify_password(data['password'], user.password):
+        try:
+            verified = user is not None and verify_password(data['password'], user.password)
+        except PasswordPoolBusy:
+            current_app.logger.warning('Login rejected: password pool is saturated')
+            return jsonify_response({'message': 'Server is busy, please try again'}, 503)
+
+        if not verified:
             if not user:
                 current_app.logger.error(f"Login attempt failed for unregistered email: {data['email']}")
             else:
@@ -117,14 +136,18 @@ class Login(Resource):
             login_user(user)
 
             # Check profile
-            profile_exists = db.session.execute(select(exists().where(Profile.id == user.id))).scalar()
+            profile_exists = has_profile(user.id)
+
+            access_token, expires_in = issue_token(user)
 
             current_app.logger.info(f"User login successfully: {user.id}, email: {user.email}")
 
             return jsonify_response({
                 'message': 'User login successfully',
                 'profile_exists': profile_exists,
-                'user_id': user.id
+                'user_id': user.id,
+                'access_token': access_token,
+                'expires_in': expires_in,
             }, 200)
 
         except Exception as e:
@@ -134,4 +157,35 @@ class Login(Resource):
                 'error': str(e),
                 'message': 'An error occurred during login'},
                 500
-            )
\ No newline at end of file
+            )
+
+@auth_ns.route('/revoke', methods=['POST'])
+class RevokeTokens(Resource):
+    @auth_api.response(200, 'All access tokens of the user revoked')
+    @auth_api.response(401, 'Invalid access token')
+    def post(self):
+        """Sign out everywhere: rotate the uniquifier so every outstanding token stops verifying"""
+        token = bearer_token()
+        try:
+            if token is None:
+                raise InvalidToken('Authentication required')
+            user_id = verify_token(token)
+        except InvalidToken as e:
+            return jsonify_response({'message': str(e)}, 401)
+
+        try:
+            user = db.session.get(User, user_id)
+            revoke_tokens(user)
+            db.session.commit()
+
+            current_app.logger.info(f"Access tokens revoked for user: {user_id}")
+            return jsonify_response({'message': 'Access tokens revoked'}, 200)
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Failed to revoke tokens: {e}")
+            return jsonify_response({
+                'error': str(e),
+                'message': 'An error occurred while revoking tokens'},
+                500
+            )
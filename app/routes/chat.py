@@ -1,16 +1,24 @@
-from flask import Blueprint, request, current_app
+import logging
+from flask import Blueprint, request, current_app, session
 from flask_socketio import emit, join_room, leave_room
 from flask_restx import Api, Resource, fields
-from sqlalchemy import exists, select, and_, func
+from sqlalchemy import select, and_, func, update
 from sqlalchemy.orm import joinedload
 from functools import lru_cache
 from datetime import datetime, timedelta
 
-from app.utils import jsonify_response, to_iso8601
+from app.utils import jsonify_response, stream_response, to_iso8601
+from app.tokens import token_owner, verify_token, InvalidToken
+from app.replicas import replica_reads
 from app.extensions import db, socketio
+from app.log import Sampler
+from app.stats import get_user_stats
+from app.serializers import serialize_room, serialize_message
+from app.statements import user_exists, is_room_member
 from app.models import ChatRoom, ChatRoomUser, Message, User, Profile, Post
 
 chat_bp = Blueprint('chat_bp', __name__)
+sampled = Sampler(logging.getLogger(__name__), 0.01)
 chat_api = Api(
     chat_bp,
     version='1.0',
@@ -35,6 +43,8 @@ class ChatRooms(Resource):
     @chat_ns.expect(dynamic_load_model)
     @chat_ns.response(200, 'Success')
     @chat_ns.response(404, 'User not found')
+    @token_owner('user_id')
+    @replica_reads
     def post(self, user_id):
         """Get all chat rooms for a user"""
         data = request.get_json()
@@ -44,7 +54,7 @@ class ChatRooms(Resource):
 
         try:
             # Verify user exists
-            if not db.session.scalar(select(exists().where(User.id == user_id))):
+            if not user_exists(user_id):
                 return jsonify_response({'error': 'User not found'}, 404)
 
             # Subquery to get latest message per room
@@ -82,18 +92,19 @@ class ChatRooms(Resource):
                 latest_messages.c.created_at.desc().nullslast()
             ).paginate(page=page, per_page=per_page)
 
+            # Unread counts for the whole page in one query, read_users is a JSONB array of user ids
+            unread_counts = dict(db.session.execute(
+                select(Message.post_id, func.count())
+                .where(
+                    Message.post_id.in_([room.post_id for room, *_ in chat_rooms.items]),
+                    ~Message.read_users.contains([user_id])
+                )
+                .group_by(Message.post_id)
+            ).all())
+
             rooms_data = []
             for room, message_id, sender_id, content, created_at in chat_rooms.items:
-                # Get unread count for the room
-                messages = Message.query.filter(Message.post_id == room.post_id).all()
-
-                unread_count = sum(1 for msg in messages if user_id not in msg.read_users)
-
-                room_data = {
-                    'post_id': room.post_id,
-                    'name': room.name,
-                    'unread_count': unread_count
-                }
+                room_data = serialize_room(room, unread_count=unread_counts.get(room.post_id, 0))
 
                 # Add latest message info if exists
                 if message_id:
@@ -138,6 +149,7 @@ class ChatMessages(Resource):
     @chat_ns.response(400, 'Bad Request')
     @chat_ns.response(403, 'Not authorized')
     @chat_ns.response(404, 'Room not found')
+    @token_owner('user_id')
     def post(self):
         """Get message history for a chat room"""
         data = request.get_json()
@@ -153,17 +165,22 @@ class ChatMessages(Resource):
 
         try:
             # Verify user is a member of the chat room
-            chat_room_user = ChatRoomUser.query.filter_by(
-                post_id=post_id,
-                user_id=user_id
-            ).first()
-
-            if not chat_room_user:
+            if not is_room_member(post_id, user_id):
                 return jsonify_response(
                     {'error': 'Not authorized to access this chat room'},
                     403
                 )
 
+            # Mark the room as read if this is the initial load (no before_id), appending in SQL
+            # so concurrent readers do not overwrite each other's read_users
+            if before_id is None:
+                db.session.execute(
+                    update(Message)
+                    .where(Message.post_id == post_id, ~Message.read_users.contains([user_id]))
+                    .values(read_users=Message.read_users.op('||')(func.jsonb_build_array(user_id)))
+                    .execution_options(synchronize_session=False)
+                )
+
             # Build base query
             query = Message.query.filter(Message.post_id == post_id)
 
@@ -171,19 +188,8 @@ class ChatMessages(Resource):
             if before_id:
                 query = query.filter(Message.id < before_id)
 
-            # Get messages ordered by newest first with limit
-            messages = query.order_by(Message.id.desc()).all()
-
-            # Mark messages as read if this is the initial load (no before_id)
-            if before_id is None:
-                unread_messages = [
-                    msg for msg in messages
-                    if user_id not in msg.read_users
-                ]
-
-                for msg in unread_messages:
-                    if user_id not in msg.read_users:
-                        msg.read_users.append(user_id)
+            # Get messages ordered by newest first, one extra to tell whether there are more
+            messages = query.order_by(Message.id.desc()).limit(limit + 1).all()
 
             # Check if there are more messages
             has_more = len(messages) > limit
@@ -201,23 +207,16 @@ class ChatMessages(Resource):
                 # Get sender's profile
                 sender = Profile.query.get(message.sender_id)
 
-                # Format message data
-                message_data = {
-                    'id': message.id,
-                    'sender_id': message.sender_id,
-                    'sender_name': sender.nickname if sender else 'Unknown',
-                    'content': message.content,
-                    'created_at': to_iso8601(message.created_at),
-                    'read_users': message.read_users
-                }
-                formatted_messages.append(message_data)
+                formatted_messages.append(
+                    serialize_message(message, sender_name=sender.nickname if sender else 'Unknown')
+                )
 
             db.session.commit()
-            return jsonify_response({
-                'messages': formatted_messages,
+            # Encoded in chunks as the body is sent rather than as one buffer
+            return stream_response({
                 'has_more': has_more,
                 'oldest_id': oldest_id
-            }, 200)
+            }, 'messages', formatted_messages)
 
         except Exception as e:
             current_app.logger.error(f"Error getting message history: {str(e)}")
@@ -251,29 +250,20 @@ class ChatRoomUsers(Resource):
                 Profile.nickname
             ).all()
 
+            # Participation count and level for every member in one lookup
+            stats = get_user_stats(user.id for _, user, _ in room_users)
+
             # Format user data
             users = []
             for room_user, user, profile in room_users:
-                # Calculate participation count and level
-                participated = user.chat_rooms.count()
-                level = 0
-                if 11 <= participated <= 20:
-                    level = 1
-                elif 21 <= participated <= 30:
-                    level = 2
-                elif 31 <= participated <= 40:
-                    level = 3
-                elif participated >= 41:
-                    level = 4
-
                 user_data = {
                     'user_id': user.id,
                     'nickname': profile.nickname,
                     'rating': user.rating or 0.0,
                     'joined_at': to_iso8601(room_user.joined_at),
                     'is_host': user.id == chat_room.post.user_id,
-                    'level': level,
-                    'participated': participated
+                    'level': stats[user.id].level,
+                    'participated': stats[user.id].participated
                 }
                 users.append(user_data)
                 if user_data['is_host']:
@@ -314,18 +304,28 @@ connected_users = {}
 
 
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
     try:
-        current_app.logger.info("\n=== Connection Info ===")
-        current_app.logger.info(f"Socket ID: {request.sid}")
-        current_app.logger.info(f"Transport: {request.namespace}")
-        current_app.logger.info(f"Environment: {request.environ}")
-        current_app.logger.info(f"Headers: {dict(request.headers)}")
-        current_app.logger.info(f"Remote Address: {request.remote_addr}")
-        current_app.logger.info(f"Arguments: {request.args}")
-        current_app.logger.info(f"Cookie: {request.cookies}")
-
         user_id = request.args.get('user_id')
+
+        # Access token from the Socket.IO auth payload, or the query string for older clients
+        token = auth.get('token') if isinstance(auth, dict) else None
+        token = token or request.args.get('token')
+        if token:
+            try:
+                auth_user_id = verify_token(token)
+            except InvalidToken as e:
+                current_app.logger.warning(f'Connection rejected: {e}')
+                return False
+            if user_id and user_id != str(auth_user_id):
+                current_app.logger.warning(f'Connection rejected: token does not belong to user {user_id}')
+                return False
+            user_id = str(auth_user_id)
+            session['user_id'] = user_id
+        elif current_app.config['AUTH_TOKENS_REQUIRED']:
+            current_app.logger.warning('Connection attempt without access token')
+            return False
+
         if not user_id:
             current_app.logger.warning('Connection attempt without user_id')
             return False
@@ -353,7 +353,7 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     try:
-        user_id = request.args.get('user_id')
+        user_id = session.get('user_id') or request.args.get('user_id')
         if user_id and user_id in connected_users:
             leave_room(f'user_{user_id}')
             del connected_users[user_id]
@@ -374,6 +374,10 @@ def handle_message(data):
             emit('error', {'message': 'Missing required fields'})
             return
 
+        if 'user_id' in session and str(sender_id) != session['user_id']:
+            emit('error', {'message': 'Not authorized to send messages as another user'})
+            return
+
         # Get current timestamp bucket for cache
         current_bucket = get_current_timestamp_bucket()
 
@@ -427,7 +431,7 @@ def handle_message(data):
                 user_room = f'user_{user_id}'
                 emit('new_message', message_data, to=user_room)
 
-            current_app.logger.info(f'Message {message.id} sent successfully to {len(recipient_user_ids)} recipients')
+            sampled.debug('Message %s sent to %d recipients', message.id, len(recipient_user_ids))
 
         except Exception as e:
             db.session.rollback()
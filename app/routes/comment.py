@@ -1,11 +1,17 @@
 from flask import Blueprint, current_app, request
 from flask_restx import Api, Resource, fields
-from sqlalchemy import exists, select
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 
-from app.utils import jsonify_response
+from app.utils import jsonify_response, foreign_key_violation
+from app.tokens import token_owner
+from app.replicas import replica_reads
 from app.extensions import db
-from app.models import User, Post, PostComment, PostCommentLike
+from app.stats import get_user_stats
+from app.statements import user_exists, post_exists
+from app.models import Post, PostComment, PostCommentLike
 
 comment_bp = Blueprint('comment_bp', __name__)
 comment_api = Api(
@@ -34,6 +40,7 @@ class ListComment(Resource):
     @comment_ns.response(200, 'Success')
     @comment_ns.response(400, 'Bad Request')
     @comment_ns.response(404, 'Post not found')
+    @replica_reads
     def post(self):
         data = request.get_json()
 
@@ -48,7 +55,7 @@ class ListComment(Resource):
         per_page = data['per_page'] if 'per_page' in data else 20
 
         try:
-            if not db.session.scalar(select(exists().where(Post.id == post_id))):
+            if not post_exists(post_id):
                 return jsonify_response({'error': 'Post not found'}, 404)
 
             comments = PostComment.query \
@@ -56,8 +63,12 @@ class ListComment(Resource):
                 .filter_by(post_id=post_id) \
                 .order_by(PostComment.floor.desc()) \
                 .paginate(page=page, per_page=per_page, error_out=False)
+            stats = get_user_stats(comment.user_id for comment in comments.items if comment.user_id is not None)
             return jsonify_response({
-                'comments': [comment.serialize(user_id=user_id) for comment in comments.items],
+                'comments': [
+                    comment.serialize(user_id=user_id, level=stats[comment.user_id].level if comment.user_id in stats else 0)
+                    for comment in comments.items
+                ],
                 'page': comments.page,
                 'pages': comments.pages,
                 'per_page': comments.per_page
@@ -83,6 +94,7 @@ class CreateComment(Resource):
     @comment_ns.response(200, 'Comment successfully created.')
     @comment_ns.response(400, 'Bad request.')
     @comment_ns.response(404, 'User or Post does not exist.')
+    @token_owner('user_id')
     def post(self):
         data = request.get_json()
 
@@ -97,7 +109,7 @@ class CreateComment(Resource):
         content = data['content']
 
         try:
-            if not db.session.scalar(select(exists().where(User.id == user_id))):
+            if not user_exists(user_id):
                 return jsonify_response({'error': 'User does not exist'}, 404)
 
             post = Post.query.options(db.joinedload(Post.comments)).get(post_id)
@@ -111,7 +123,7 @@ class CreateComment(Resource):
             db.session.commit()
             return jsonify_response({
                 'message': 'Comment created successful',
-                'comment': comment.serialize(user_id=user_id)
+                'comment': comment.serialize(user_id=user_id, level=get_user_stats([user_id])[user_id].level)
             }, 200)
         except Exception as e:
             current_app.logger.error(e)
@@ -134,6 +146,7 @@ class DeleteComment(Resource):
     @comment_ns.response(200, 'Comment successfully deleted.')
     @comment_ns.response(400, 'Bad request.')
     @comment_ns.response(404, 'Comment does not exist.')
+    @token_owner('user_id')
     def post(self):
         data = request.get_json()
 
@@ -181,6 +194,7 @@ class LikeComment(Resource):
     @comment_ns.response(200, 'Successfully liked comment.')
     @comment_ns.response(400, 'Bad request.')
     @comment_ns.response(404, 'Comment does not exist.')
+    @token_owner('user_id')
     def post(self):
         data = request.get_json()
 
@@ -196,18 +210,36 @@ class LikeComment(Resource):
 
         try:
             if retrieve:
-                like = PostCommentLike.query.get((user_id, comment_id))
-                if not like:
+                removed = db.session.execute(
+                    delete(PostCommentLike)
+                    .where(PostCommentLike.user_id == user_id, PostCommentLike.comment_id == comment_id)
+                    .returning(PostCommentLike.comment_id)
+                ).first()
+                if removed is None:
                     return jsonify_response({'error': 'Comment does not exist'}, 404)
-                db.session.delete(like)
             else:
-                like = PostCommentLike(user_id=user_id, comment_id=comment_id)
-                db.session.add(like)
+                inserted = db.session.execute(
+                    pg_insert(PostCommentLike)
+                    .values(user_id=user_id, comment_id=comment_id)
+                    .on_conflict_do_nothing()
+                    .returning(PostCommentLike.comment_id)
+                ).first()
+                if inserted is None:
+                    db.session.rollback()
+                    return jsonify_response({'error': 'Comment already liked'}, 400)
 
             db.session.commit()
             return jsonify_response({'message': 'Comment liked successfully'}, 200)
 
+        except IntegrityError as e:
+            db.session.rollback()
+            constraint = foreign_key_violation(e)
+            if constraint is None:
+                current_app.logger.error(e)
+                return jsonify_response({'error': str(e)}, 500)
+            return jsonify_response({'error': 'User does not exist' if constraint.endswith('user_id_fkey') else 'Comment does not exist'}, 404)
+
         except Exception as e:
             current_app.logger.error(e)
             db.session.rollback()
-            return jsonify_response({'error': str(e)}, 500)
\ No newline at end of file
+            return jsonify_response({'error': str(e)}, 500)
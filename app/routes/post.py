@@ -1,16 +1,25 @@
-from collections import OrderedDict
+import logging
+from collections import OrderedDict, Counter
 
 from flask import Blueprint, current_app, request
 from flask_restx import Api, Resource, fields
-from pkg_resources import require
-from sqlalchemy import case, exists, select, func, text
+from sqlalchemy import case, exists, select, func, text, delete, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert, array
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 
-from app.utils import jsonify_response, to_datetime, to_iso8601
+from app.utils import jsonify_response, to_datetime, to_naive_utc, to_iso8601, foreign_key_violation
+from app.tokens import token_owner
+from app.replicas import replica_reads
 from app.extensions import db
-from app.models import Post, PostLike, PostApplicant, User, Profile, DictItem, PostBookmark, ChatRoom, ChatRoomUser
+from app.log import Sampler
+from app.stats import adjust_user_stats, adjust_pending_references
+from app.serializers import serialize_post_card, post_card_counts
+from app.statements import application_status
+from app.models import Post, PostLike, User, Profile, DictItem, PostBookmark, ChatRoom, ChatRoomUser, PendingReference
 
 post_bp = Blueprint('post_bp', __name__)
+sampled = Sampler(logging.getLogger(__name__), 0.01)
 post_api = Api(
     post_bp,
     version='1.0',
@@ -46,6 +55,7 @@ class CreatePost(Resource):
     @post_ns.response(400, 'Bad Request')
     @post_ns.response(403, 'User profile must be completed first')
     @post_ns.response(404, 'User not found')
+    @token_owner('user_id')
     def post(self):
         data = request.get_json()
         current_app.logger.info(f"Creating post {data}")
@@ -98,6 +108,7 @@ class CreatePost(Resource):
 
         chat_room_user = ChatRoomUser(post_id=post.id, user_id=data['user_id'])
         db.session.add(chat_room_user)
+        adjust_user_stats([data['user_id']], participated=1, hosted=1)
 
         db.session.commit()
 
@@ -115,12 +126,14 @@ class UpdatePost(Resource):
     @post_ns.response(400, 'Bad Request')
     @post_ns.response(403, 'Unauthorized - Not the post owner')
     @post_ns.response(404, 'Post or User not found')
+    @token_owner('user_id')
     def post(self, post_id):
         data = request.get_json()
         current_app.logger.info(f"Updating post {post_id} with data {data}")
+        dates_changed = 'event_start_date' in data or 'event_end_date' in data
 
-        # Find the post
-        post = Post.query.get(post_id)
+        # Find the post, locked against the lifecycle jobs when its dates change
+        post = db.session.get(Post, post_id, with_for_update=dates_changed)
         if not post:
             current_app.logger.error(f"Post {post_id} not found")
             return jsonify_response({'error': 'Post not found'}, 404)
@@ -139,22 +152,25 @@ class UpdatePost(Resource):
             return jsonify_response({'error': 'Not authorized to update this post'}, 403)
 
         # Validate and update dates if provided
-        if 'event_start_date' in data or 'event_end_date' in data:
+        if dates_changed:
             try:
-                event_start_date = to_datetime(data.get('event_start_date', post.event_start_date))
-                event_end_date = to_datetime(data.get('event_end_date', post.event_end_date))
-
-                if event_start_date > event_end_date:
-                    current_app.logger.error('Event start date must be before event end date')
-                    return jsonify_response({'error': 'Event start date must be before event end date'}, 400)
-
-                post.event_start_date = event_start_date
-                post.event_end_date = event_end_date
-            except ValueError as e:
+                event_start_date = post.event_start_date
+                event_end_date = post.event_end_date
+                if 'event_start_date' in data:
+                    event_start_date = to_naive_utc(to_datetime(data['event_start_date']))
+                if 'event_end_date' in data:
+                    event_end_date = to_naive_utc(to_datetime(data['event_end_date']))
+            except (TypeError, AttributeError, ValueError) as e:
                 current_app.logger.error(e)
                 return jsonify_response({'error': f"Invalid date format: {e}, use yyyy-MM-ddTHH:mm:ss.mmmZ format"},
                                         400)
 
+            if event_start_date > event_end_date:
+                current_app.logger.error('Event start date must be before event end date')
+                return jsonify_response({'error': 'Event start date must be before event end date'}, 400)
+
+            self.reschedule(post, event_start_date, event_end_date)
+
         # Update other fields if provided
         if 'type' in data:
             post.type = data['type']
@@ -193,6 +209,34 @@ class UpdatePost(Resource):
             db.session.rollback()
             return jsonify_response({'error': 'Failed to update post'}, 400)
 
+    @staticmethod
+    def reschedule(post, event_start_date, event_end_date):
+        """
+        Move the post's event and undo the lifecycle hooks its new dates have not reached yet,
+        so the scheduler fires them again. Applications closed at the start stay rejected. An
+        ended event moved into the future withdraws its pending references, one still in the
+        past carries the new end date into them for the keyset order of ListReferenceable.
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if post.started and event_start_date > now:
+            post.started = False
+        if post.ended and event_end_date > now:
+            post.ended = False
+            givers = db.session.scalars(
+                delete(PendingReference)
+                .where(PendingReference.post_id == post.id)
+                .returning(PendingReference.from_user_id)
+            ).all()
+            adjust_pending_references({giver: -count for giver, count in Counter(givers).items()})
+        elif post.ended and event_end_date != post.event_end_date:
+            db.session.execute(
+                update(PendingReference)
+                .where(PendingReference.post_id == post.id)
+                .values(event_end_date=event_end_date)
+            )
+        post.event_start_date = event_start_date
+        post.event_end_date = event_end_date
+
 
 post_list_query_model = post_api.model(
     'PostListQuery',
@@ -201,6 +245,9 @@ post_list_query_model = post_api.model(
         'sort': fields.Integer(description='Sort, 0: For You, 1: All. Default = 1: All', default=1),
         'type': fields.List(fields.String(), description='Filter types of the post'),
         'keyword': fields.String(description='Keyword for search'),
+        'skills': fields.List(fields.String(), description='Posts requiring any of these skills'),
+        'personalities': fields.List(fields.String(), description='Posts looking for any of these personalities'),
+        'languages': fields.List(fields.String(), description='Posts speaking any of these languages'),
         'page': fields.Integer(description='Page number of the results, defaults to 1', default=1),
         'per_page': fields.Integer(description='Number of posts per page, defaults to 20', default=20),
     }
@@ -212,11 +259,12 @@ class ListPost(Resource):
     @post_ns.expect(post_list_query_model)
     @post_ns.response(201, 'Post successfully listed')
     @post_ns.response(400, 'Bad Request')
+    @replica_reads
     def post(self, user_id):
         data = request.get_json()
         post_query = Post.query
 
-        current_app.logger.info(f"Getting posts by user: {user_id} with request: {data}")
+        sampled.debug('Getting posts by user: %s with request: %s', user_id, data)
 
         # Filter and Sort
         if 'user_id' in data and data['user_id'] is not None:
@@ -227,13 +275,16 @@ class ListPost(Resource):
             post_query = post_query.filter(Post.type.in_(data['type']))
         if 'keyword' in data and data['keyword'] is not None and data['keyword'] != "":
             post_query = post_query.filter(Post.title.ilike(f'%{data["keyword"]}%'))
+        # JSONB ?| on the GIN indexed arrays
+        for field, column in (('skills', Post.skills), ('personalities', Post.personalities), ('languages', Post.languages)):
+            if data.get(field):
+                post_query = post_query.filter(column.has_any(array(data[field])))
         if data.get('sort', 1) == 0:
             # Recommendation System
             if 'type' not in data or data['type'] is None or not data['type']:
                 profile = Profile.query.get(user_id)
                 if profile and profile.interest_types != []:
                     interest_types = tuple(profile.interest_types)
-                    print(interest_types)
                     post_query = post_query.order_by(
                         case(
                             (Post.type.in_(interest_types), 1),
@@ -244,8 +295,6 @@ class ListPost(Resource):
         else:
             post_query = post_query.order_by(Post.post_created_date.desc())
 
-        current_app.logger.info(f"Getting posts with SQL query: {str(post_query)}")
-
         # Paginate
         if 'page' not in data or data['page'] is None:
             data['page'] = 1
@@ -253,18 +302,7 @@ class ListPost(Resource):
             data['per_page'] = 20
         pagination = post_query.paginate(page=data['page'], per_page=data['per_page'], error_out=False)
         posts = [
-            OrderedDict([('id', post.id),
-                         ('type', post.type),
-                         ('title', post.title),
-                         ('event_start_date', to_iso8601(post.event_start_date)),
-                         ('event_end_date', to_iso8601(post.event_end_date)),
-                         ('number_of_people_required', post.number_of_people_required),
-                         ('likes', len(post.likes)),
-                         ('liked', any(like.user_id == user_id for like in post.likes)),
-                         ('bookmarks', len(post.bookmarks)),
-                         ('bookmarked', any(bookmark.user_id == user_id for bookmark in post.bookmarks)),
-                         ('comments', len(post.comments)),
-                         ('applicants', len(post.applicants))])
+            serialize_post_card(post, **post_card_counts(post, user_id))
             for post in pagination.items
         ]
 
@@ -291,6 +329,7 @@ class ViewPost(Resource):
     @post_ns.response(200, 'Success')
     @post_ns.response(400, 'Bad Request')
     @post_ns.response(404, 'Post not found')
+    @replica_reads
     def post(self):
         data = request.get_json()
 
@@ -325,9 +364,9 @@ class ViewPost(Resource):
                                  ('bookmarked', any(bookmark.user_id == user_id for bookmark in post.bookmarks)),
                                  ('comments', len(post.comments)),
                                  ('applicants', len(post.applicants))])
-        application = PostApplicant.query.get((user_id, post.id))
-        if application:
-            post_dict['application_status'] = application.review_status
+        review_status = application_status(user_id, post.id)
+        if review_status is not None:
+            post_dict['application_status'] = review_status
 
         return jsonify_response(post_dict, 200)
 
@@ -338,6 +377,7 @@ class DeletePost(Resource):
     @post_ns.response(200, 'Post successfully deleted')
     @post_ns.response(403, 'Unauthorized - Not the post owner')
     @post_ns.response(404, 'Post or User not found')
+    @token_owner('user_id')
     def post(self):
         data = request.get_json()
 
@@ -368,8 +408,20 @@ class DeletePost(Resource):
             return jsonify_response({'error': 'Not authorized to delete this post'}, 403)
 
         try:
-            ChatRoomUser.query.filter_by(post_id=post_id).delete()
+            members = db.session.scalars(
+                delete(ChatRoomUser)
+                .where(ChatRoomUser.post_id == post_id)
+                .returning(ChatRoomUser.user_id)
+            ).all()
+            givers = db.session.scalars(
+                delete(PendingReference)
+                .where(PendingReference.post_id == post_id)
+                .returning(PendingReference.from_user_id)
+            ).all()
             ChatRoom.query.filter_by(post_id=post_id).delete()
+            adjust_user_stats(members, participated=-1)
+            adjust_user_stats([post.user_id], hosted=-1)
+            adjust_pending_references({giver: -count for giver, count in Counter(givers).items()})
 
             db.session.delete(post)
             db.session.commit()
@@ -384,6 +436,15 @@ class DeletePost(Resource):
             return jsonify_response({'error': 'Failed to delete post'}, 400)
 
 
+def touch_post(post_id):
+    """Bump post_last_updated_date without loading the post, same as Post.manual_update()."""
+    db.session.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(post_last_updated_date=datetime.now(timezone.utc))
+    )
+
+
 post_and_user_and_retrieve_model = post_api.model(
     'PostAndUserAndRetrieve',
     {
@@ -400,6 +461,7 @@ class LikePost(Resource):
     @post_ns.response(200, 'Success')
     @post_ns.response(400, 'Bad Request')
     @post_ns.response(404, 'Post or User or Like not found')
+    @token_owner('user_id')
     def post(self):
         data = request.get_json()
 
@@ -415,31 +477,39 @@ class LikePost(Resource):
 
         try:
             if retrieve:
-                like = PostLike.query.get((user_id, post_id))
-                if not like:
+                removed = db.session.execute(
+                    delete(PostLike)
+                    .where(PostLike.user_id == user_id, PostLike.post_id == post_id)
+                    .returning(PostLike.post_id)
+                ).first()
+                if removed is None:
                     return jsonify_response({'error': 'Like not found'}, 404)
-                db.session.delete(like)
 
             else:
-                # Check User
-                if not db.session.scalar(select(exists().where(User.id == user_id))):
-                    return jsonify_response({'error': 'User not found', }, 404)
-
-                # Check if Post exists
-                post = Post.query.get(post_id)
-                if not post:
-                    return jsonify_response({'error': 'Post not found'}, 404)
-
-                # Check is Like exists
-                if db.session.scalar(select(exists().where(PostLike.user_id == user_id, PostLike.post_id == post_id))):
+                # Insert and existence checks in one statement, missing user/post surface as FK violations
+                inserted = db.session.execute(
+                    pg_insert(PostLike)
+                    .values(user_id=user_id, post_id=post_id)
+                    .on_conflict_do_nothing()
+                    .returning(PostLike.post_id)
+                ).first()
+                if inserted is None:
+                    db.session.rollback()
                     return jsonify_response({'error': 'Post already liked', }, 400)
 
-                post.manual_update()
-                db.session.add(PostLike(user_id=user_id, post_id=post_id))
+                touch_post(post_id)
 
             db.session.commit()
             return jsonify_response({'retrieved': retrieve}, 200)
 
+        except IntegrityError as e:
+            db.session.rollback()
+            constraint = foreign_key_violation(e)
+            if constraint is None:
+                current_app.logger.error(e)
+                return jsonify_response({'error': str(e)}, 500)
+            return jsonify_response({'error': 'User not found' if constraint.endswith('user_id_fkey') else 'Post not found'}, 404)
+
         except Exception as e:
             current_app.logger.error(e)
             db.session.rollback()
@@ -452,6 +522,7 @@ class BookmarkPost(Resource):
     @post_ns.response(200, 'Success')
     @post_ns.response(400, 'Bad Request')
     @post_ns.response(404, 'Post or User or Bookmark not found')
+    @token_owner('user_id')
     def post(self):
         data = request.get_json()
 
@@ -467,27 +538,38 @@ class BookmarkPost(Resource):
 
         try:
             if retrieve:
-                bookmark = PostBookmark.query.get((user_id, post_id))
-                if not bookmark:
+                removed = db.session.execute(
+                    delete(PostBookmark)
+                    .where(PostBookmark.user_id == user_id, PostBookmark.post_id == post_id)
+                    .returning(PostBookmark.post_id)
+                ).first()
+                if removed is None:
                     return jsonify_response({'error': 'Bookmark not found'}, 404)
-                db.session.delete(bookmark)
-            elif db.session.scalar(select(exists().where(PostBookmark.user_id == user_id, PostBookmark.post_id == post_id))):
-                return jsonify_response({'error': 'Already bookmarked'}, 400)
 
             else:
-                if not db.session.scalar(select(exists().where(User.id == user_id))):
-                    return jsonify_response({'error': 'User not found', }, 404)
-
-                post = Post.query.get(post_id)
-                if not post:
-                    return jsonify_response({'error': 'Post not found', }, 404)
-
-                post.manual_update()
-                db.session.add(PostBookmark(user_id=user_id, post_id=post_id))
+                inserted = db.session.execute(
+                    pg_insert(PostBookmark)
+                    .values(user_id=user_id, post_id=post_id)
+                    .on_conflict_do_nothing()
+                    .returning(PostBookmark.post_id)
+                ).first()
+                if inserted is None:
+                    db.session.rollback()
+                    return jsonify_response({'error': 'Already bookmarked'}, 400)
+
+                touch_post(post_id)
 
             db.session.commit()
             return jsonify_response({'retrieved': retrieve}, 200)
 
+        except IntegrityError as e:
+            db.session.rollback()
+            constraint = foreign_key_violation(e)
+            if constraint is None:
+                current_app.logger.error(e)
+                return jsonify_response({'error': str(e)}, 500)
+            return jsonify_response({'error': 'User not found' if constraint.endswith('user_id_fkey') else 'Post not found'}, 404)
+
         except Exception as e:
             current_app.logger.error(e)
             db.session.rollback()
@@ -2,6 +2,7 @@ from flask import Blueprint, request, current_app
 from flask_restx import Api, Resource, fields
 
 from app.utils import jsonify_response, to_datetime
+from app.tokens import token_owner
 from app.extensions import db
 from app.models import (EducationLevelEnum, MBTIEnum, ConstellationEnum, BloodTypeEnum,
                         ReligionEnum, SexualityEnum, EthnicityEnum, DietEnum, User, Profile)
@@ -107,6 +108,7 @@ class ProfileUpdate(Resource):
     @profile_ns.response(201, 'Profile create/update successfully.')
     @profile_ns.response(400, 'Validation Error')
     @profile_ns.response(404, 'User not found')
+    @token_owner('user_id')
     def post(self, user_id):
         data = request.get_json()
 
@@ -198,8 +200,6 @@ class ProfileUpdate(Resource):
         profile.languages = data.get('languages', [])
         profile.interest_types = data.get('interest_types', [])
 
-        current_app.logger.info(f"Serialized profile: {profile.serialize()}")
-
         try:
             if create_profile:
                 db.session.add(profile)
@@ -218,5 +218,4 @@ class ProfileView(Resource):
     @profile_ns.response(404, 'Profile not found')
     def get(self, user_id):
         profile = Profile.query.get_or_404(user_id)
-        current_app.logger.info(f"Profile retrieved: {profile.serialize()}")
         return jsonify_response(profile.serialize(), 200)
\ No newline at end of file
@@ -3,12 +3,16 @@ from collections import OrderedDict
 
 from flask import Blueprint, request, current_app
 from flask_restx import Api, Resource, fields
-from sqlalchemy import exists, select, and_, or_, func, distinct
+from sqlalchemy import select, and_, or_, func, distinct, tuple_, delete
 from sqlalchemy.orm import joinedload, contains_eager, aliased
 
-from app.utils import jsonify_response, to_iso8601
+from app.utils import jsonify_response, to_iso8601, to_datetime, page_param
+from app.tokens import token_owner
+from app.replicas import replica_reads
 from app.extensions import db
-from app.models import Post, PostApplicant, Reference, User, Profile, ChatRoomUser
+from app.stats import get_user_stats, adjust_user_stats, add_rating, average_rating
+from app.statements import user_exists, referenceable
+from app.models import Post, PostApplicant, Reference, Profile, ChatRoomUser, PendingReference
 
 reference_bp = Blueprint('reference_bp', __name__)
 reference_api = Api(
@@ -20,11 +24,22 @@ reference_api = Api(
 )
 reference_ns = reference_api.namespace('', description='Reference namespace')
 
+MAX_PER_PAGE = 100
+
+referenceable_cursor_model = reference_api.model(
+    'ReferenceableCursor',
+    {
+        'event_end_date': fields.String(required=True, description='Event end date of the last item on the previous page'),
+        'post_id': fields.Integer(required=True, description='Post ID of the last item on the previous page'),
+        'user_id': fields.Integer(required=True, description='User ID of the last item on the previous page'),
+    }
+)
+
 list_referenceable_model = reference_api.model(
     'ListReferenceableModel',
     {
-        'page': fields.Integer(description='Page number of the results, defaults to 1', default=1),
-        'per_page': fields.Integer(description='Number of items per page, defaults to 20', default=20),
+        'cursor': fields.Nested(referenceable_cursor_model, description='next_cursor from the previous response, omit for the first page'),
+        'per_page': fields.Integer(description='Number of items per page (1-100), defaults to 20', default=20),
     }
 )
 
@@ -35,88 +50,62 @@ class ListReferenceable(Resource):
     @reference_ns.response(200, 'Success')
     @reference_ns.response(400, 'Bad Request')
     @reference_ns.response(404, 'User not found')
+    @token_owner('user_id')
     def post(self, user_id):
         data = request.get_json()
-        page = data.get('page', 1)
-        per_page = data.get('per_page', 20)
+        cursor = data.get('cursor')
+        per_page = page_param(data, 'per_page', 20, MAX_PER_PAGE)
+        if per_page is None:
+            return jsonify_response({'error': f'per_page must be an integer from 1 to {MAX_PER_PAGE}'}, 400)
 
         # Verify user exists
-        if not db.session.scalar(select(exists().where(User.id == user_id))):
+        if not user_exists(user_id):
             current_app.logger.error(f'User not found: {user_id}')
             return jsonify_response({'error': 'User not found'}, 404)
 
         try:
-            # Create aliases for self-joins
-            UserChatRoom = aliased(ChatRoomUser)
-            OtherChatRoom = aliased(ChatRoomUser)
-
-            # Build the main query
-            query = db.session.query(
-                Post,
-                User,
-                Profile,
-                OtherChatRoom
-            ).join(
-                UserChatRoom,
-                and_(
-                    UserChatRoom.post_id == Post.id,
-                    UserChatRoom.user_id == user_id
-                )
-            ).join(
-                OtherChatRoom,
-                and_(
-                    OtherChatRoom.post_id == Post.id,
-                    OtherChatRoom.user_id != user_id
-                )
-            ).join(
-                User,
-                User.id == OtherChatRoom.user_id
-            ).join(
-                Profile,
-                Profile.id == User.id
-            ).outerjoin(
-                Reference,
-                and_(
-                    Reference.from_user_id == user_id,
-                    Reference.to_user_id == OtherChatRoom.user_id,
-                    Reference.post_id == Post.id
-                )
-            ).filter(
-                Post.event_end_date < datetime.now(timezone.utc),
-                Reference.from_user_id == None
-            ).order_by(
-                Post.event_end_date.desc(),
-                Profile.nickname
-            )
-
-            # Get total count for pagination
-            total_items = query.count()
-            total_pages = (total_items + per_page - 1) // per_page
-
-            # Apply pagination
-            results = query.offset((page - 1) * per_page).limit(per_page).all()
+            # Keyset scan over the user's pending references, filled by app.jobs.open_references
+            cursor_key = None
+            if cursor:
+                try:
+                    cursor_key = (to_datetime(cursor['event_end_date']), int(cursor['post_id']), int(cursor['user_id']))
+                except (KeyError, TypeError, ValueError):
+                    return jsonify_response({'error': 'Invalid cursor'}, 400)
+
+            results = referenceable(user_id, per_page + 1, cursor_key)
+            has_more = len(results) > per_page
+            results = results[:per_page]
 
             referenceable_users = [
                 OrderedDict([
-                    ('post_id', post.id),
-                    ('post_title', post.title),
-                    ('post_type', post.type),
-                    ('event_start_date', to_iso8601(post.event_start_date)),
-                    ('event_end_date', to_iso8601(post.event_end_date)),
-                    ('location', post.location),
-                    ('user_id', user.id),
-                    ('nickname', profile.nickname),
-                    ('role', 'Host' if user.id == post.user_id else 'Participant')
+                    ('post_id', row.post_id),
+                    ('post_title', row.title),
+                    ('post_type', row.type),
+                    ('event_start_date', to_iso8601(row.event_start_date)),
+                    ('event_end_date', to_iso8601(row.event_end_date)),
+                    ('location', row.location),
+                    ('user_id', row.to_user_id),
+                    ('nickname', row.nickname),
+                    ('role', 'Host' if row.to_user_id == row.host_id else 'Participant')
                 ])
-                for post, user, profile, chat_room_user in results
+                for row in results
             ]
 
+            next_cursor = None
+            if has_more:
+                # Full precision, to_iso8601 truncates to milliseconds and would repeat the boundary item
+                next_cursor = {
+                    'event_end_date': results[-1].event_end_date.isoformat(),
+                    'post_id': results[-1].post_id,
+                    'user_id': results[-1].to_user_id
+                }
+
             return jsonify_response({
                 'referenceable_users': referenceable_users,
-                'page': page,
-                'pages': total_pages,
+                'has_more': has_more,
+                'next_cursor': next_cursor,
                 'per_page': per_page,
-                'total_items': total_items
+                'total_items': get_user_stats([user_id])[user_id].pending_references
             }, 200)
 
         except Exception as e:
@@ -124,6 +113,17 @@ class ListReferenceable(Resource):
             return jsonify_response({'error': str(e)}, 500)
 
 
+@reference_ns.route('/pending_count/<int:user_id>')
+class PendingReferenceCount(Resource):
+    @reference_ns.response(200, 'Success')
+    @token_owner('user_id')
+    def get(self, user_id):
+        """Number of references the user still owes, for the references tab badge"""
+        return jsonify_response({
+            'pending_references': get_user_stats([user_id])[user_id].pending_references
+        }, 200)
+
+
 create_reference_model = reference_api.model(
     'CreateReference',
     {
@@ -136,176 +136,144 @@ create_reference_model = reference_api.model(
 )
 
 
+reference_cursor_model = reference_api.model(
+    'ReferenceCursor',
+    {
+        'event_end_date': fields.String(required=True, description='Event end date of the last event on the previous page'),
+        'post_id': fields.Integer(required=True, description='Post ID of the last event on the previous page'),
+    }
+)
+
+list_references_model = reference_api.model(
+    'ListReferencesModel',
+    {
+        'cursor': fields.Nested(reference_cursor_model, description='next_cursor from the previous response, omit for the first page'),
+        'per_page': fields.Integer(description='Number of events per page (1-100), defaults to 20', default=20),
+    }
+)
+
+
 @reference_ns.route('/list/<int:user_id>')
 class ListReferences(Resource):
-    @reference_ns.expect(list_referenceable_model)
+    @reference_ns.expect(list_references_model)
     @reference_ns.response(200, 'Success')
     @reference_ns.response(400, 'Bad Request')
     @reference_ns.response(404, 'User not found')
+    @replica_reads
     def post(self, user_id):
         data = request.get_json()
-        page = data.get('page', 1)
-        per_page = data.get('per_page', 20)
+        cursor = data.get('cursor')
+        per_page = page_param(data, 'per_page', 20, MAX_PER_PAGE)
+        if per_page is None:
+            return jsonify_response({'error': f'per_page must be an integer from 1 to {MAX_PER_PAGE}'}, 400)
 
         # Verify user exists
-        if not db.session.scalar(select(exists().where(User.id == user_id))):
+        if not user_exists(user_id):
             current_app.logger.error(f'User not found: {user_id}')
             return jsonify_response({'error': 'User not found'}, 404)
 
         try:
-            # First get the reference counts per post
-            reference_counts = db.session.query(
-                Reference.post_id,
-                func.count().label('ref_count')
-            ).filter(
-                Reference.to_user_id == user_id
-            ).group_by(
-                Reference.post_id
-            ).subquery()
-
-            # Then get posts ordered by event_end_date with their reference counts
-            posts_with_counts = db.session.query(
-                Post.id.label('post_id'),
+            # One page of events with their aggregates, keyset paginated on (event_end_date, post_id)
+            events_query = select(
+                Post.id,
+                Post.user_id,
+                Post.title,
+                Post.type,
+                Post.event_start_date,
                 Post.event_end_date,
-                reference_counts.c.ref_count,
-                func.sum(reference_counts.c.ref_count).over(
-                    order_by=Post.event_end_date.desc()
-                ).label('cumulative_count')
-            ).join(
-                reference_counts,
-                Post.id == reference_counts.c.post_id
-            ).order_by(
-                Post.event_end_date.desc()
-            ).subquery()
-
-            # Get post IDs for the current page
-            post_ids_query = db.session.query(
-                posts_with_counts.c.post_id
-            ).filter(
-                posts_with_counts.c.cumulative_count <= (page * per_page)
-            )
-
-            if page > 1:
-                previous_total = db.session.query(
-                    posts_with_counts.c.cumulative_count
-                ).filter(
-                    posts_with_counts.c.cumulative_count <= ((page - 1) * per_page)
-                ).order_by(
-                    posts_with_counts.c.cumulative_count.desc()
-                ).first()
-
-                if previous_total:
-                    post_ids_query = post_ids_query.filter(
-                        posts_with_counts.c.cumulative_count > previous_total[0]
-                    )
-
-            post_ids = [p[0] for p in post_ids_query.all()]
-
-            # Get total references count
-            total_references = db.session.query(
-                func.count(Reference.post_id)
-            ).filter(
-                Reference.to_user_id == user_id
-            ).scalar()
-
-            # Get the overall average rating
-            overall_avg_rating = db.session.query(
-                func.avg(Reference.rating)
-            ).filter(
-                Reference.to_user_id == user_id
-            ).scalar()
-            overall_avg_rating = float(overall_avg_rating) if overall_avg_rating is not None else 0.0
-
-            # Get event-specific average ratings
-            event_ratings = db.session.query(
-                Reference.post_id,
+                Post.location,
                 func.avg(Reference.rating).label('avg_rating'),
-                func.count(Reference.rating).label('rating_count')
-            ).filter(
-                Reference.to_user_id == user_id,
-                Reference.post_id.in_(post_ids)
-            ).group_by(
-                Reference.post_id
-            ).all()
-
-            # Convert to dictionary for easy lookup
-            event_ratings_dict = {
-                er.post_id: {
-                    'avg_rating': round(float(er.avg_rating), 2) if er.avg_rating is not None else 0.0,
-                    'rating_count': int(er.rating_count)
-                } for er in event_ratings
-            }
-
-            # Get all references and related data for the selected events
-            query = db.session.query(
-                Reference,
-                User,
-                Profile,
-                Post
-            ).join(
-                User, Reference.from_user_id == User.id
-            ).join(
-                Profile, User.id == Profile.id
+                func.count().label('rating_count')
+            ).select_from(
+                Reference
             ).join(
                 Post, Reference.post_id == Post.id
-            ).filter(
-                Reference.to_user_id == user_id,
-                Reference.post_id.in_(post_ids)
+            ).where(
+                Reference.to_user_id == user_id
+            ).group_by(
+                Post.id
             ).order_by(
                 Post.event_end_date.desc(),
-                Reference.post_id
-            )
+                Post.id.desc()
+            ).limit(per_page + 1)
+
+            if cursor:
+                try:
+                    cursor_end_date = to_datetime(cursor['event_end_date'])
+                    cursor_post_id = int(cursor['post_id'])
+                except (KeyError, TypeError, ValueError):
+                    return jsonify_response({'error': 'Invalid cursor'}, 400)
+                events_query = events_query.where(
+                    tuple_(Post.event_end_date, Post.id) < tuple_(cursor_end_date, cursor_post_id)
+                )
 
-            results = query.all()
-
-            # Group results by event
-            events_dict = {}
-            for ref, user, profile, post in results:
-                if post.id not in events_dict:
-                    event_rating_info = event_ratings_dict.get(post.id, {'avg_rating': 0.0, 'rating_count': 0})
-                    events_dict[post.id] = {
-                        'event_info': {
-                            'post_id': post.id,
-                            'title': post.title,
-                            'type': post.type,
-                            'event_start_date': to_iso8601(post.event_start_date),
-                            'event_end_date': to_iso8601(post.event_end_date),
-                            'location': post.location,
-                            'average_rating': event_rating_info['avg_rating'],
-                            'rating_count': event_rating_info['rating_count']
-                        },
-                        'references': []
-                    }
-
-                events_dict[post.id]['references'].append({
-                    'from_user_id': user.id,
-                    'from_user_nickname': profile.nickname,
-                    'rating': int(ref.rating),
-                    'content': ref.content,
-                    'is_host': user.id == post.user_id
+            events = db.session.execute(events_query).all()
+            has_more = len(events) > per_page
+            events = events[:per_page]
+
+            # All references of those events in one query
+            references_by_post = {event.id: [] for event in events}
+            if events:
+                references = db.session.execute(
+                    select(
+                        Reference.post_id,
+                        Reference.from_user_id,
+                        Profile.nickname,
+                        Reference.rating,
+                        Reference.content
+                    ).join(
+                        Profile, Reference.from_user_id == Profile.id
+                    ).where(
+                        Reference.to_user_id == user_id,
+                        Reference.post_id.in_(references_by_post.keys())
+                    )
+                ).all()
+                for ref in references:
+                    references_by_post[ref.post_id].append(ref)
+
+            events_list = []
+            for event in events:
+                events_list.append({
+                    'event': {
+                        'post_id': event.id,
+                        'title': event.title,
+                        'type': event.type,
+                        'event_start_date': to_iso8601(event.event_start_date),
+                        'event_end_date': to_iso8601(event.event_end_date),
+                        'location': event.location,
+                        'average_rating': round(float(event.avg_rating), 2),
+                        'rating_count': int(event.rating_count)
+                    },
+                    # Host reference first
+                    'references': [
+                        {
+                            'from_user_id': ref.from_user_id,
+                            'from_user_nickname': ref.nickname,
+                            'rating': int(ref.rating),
+                            'content': ref.content,
+                            'is_host': ref.from_user_id == event.user_id
+                        }
+                        for ref in sorted(references_by_post[event.id], key=lambda r: r.from_user_id != event.user_id)
+                    ]
                 })
 
-                if events_dict[post.id]['references'][-1]['is_host']:
-                    events_dict[post.id]['references'][0], events_dict[post.id]['references'][-1] = events_dict[post.id]['references'][-1], events_dict[post.id]['references'][0]
+            # Total references and overall average come from the maintained totals
+            stats = get_user_stats([user_id])[user_id]
 
-            # Convert dictionary to list for response, maintaining post_ids order
-            events_list = [
-                {
-                    'event': events_dict[post_id]['event_info'],
-                    'references': events_dict[post_id]['references']
+            next_cursor = None
+            if has_more:
+                # Full precision, to_iso8601 truncates to milliseconds and would repeat the boundary event
+                next_cursor = {
+                    'event_end_date': events[-1].event_end_date.isoformat(),
+                    'post_id': events[-1].id
                 }
-                for post_id in post_ids if post_id in events_dict
-            ]
-
-            # Calculate total pages based on references count
-            total_pages = (total_references + per_page - 1) // per_page
 
             return jsonify_response({
                 'events': events_list,
-                'overall_average_rating': round(overall_avg_rating, 2),
-                'total_references': total_references,
-                'page': page,
-                'pages': total_pages,
+                'overall_average_rating': round(average_rating(stats), 2),
+                'total_references': stats.rating_count,
+                'has_more': has_more,
+                'next_cursor': next_cursor,
                 'per_page': per_page
             }, 200)
 
@@ -320,6 +288,7 @@ class CreateReference(Resource):
     @reference_ns.response(201, 'Reference created successfully')
     @reference_ns.response(400, 'Bad Request')
     @reference_ns.response(404, 'User or Post not found')
+    @token_owner('from_user_id')
     def post(self):
         data = request.get_json()
 
@@ -366,14 +335,6 @@ class CreateReference(Resource):
             if existing_ref:
                 return jsonify_response({'error': 'Reference already exists'}, 400)
 
-            # Calculate new rating
-            rating_stats = db.session.query(
-                func.count(Reference.rating).label('count'),
-                func.avg(Reference.rating).label('avg')
-            ).filter(
-                Reference.to_user_id == data['to_user_id']
-            ).first()
-
             # Create reference
             reference = Reference(
                 from_user_id=data['from_user_id'],
@@ -382,20 +343,23 @@ class CreateReference(Resource):
                 rating=data['rating'],
                 content=data['content']
             )
-
-            # Calculate and update new rating
-            total_ratings = (rating_stats.count or 0)
-            current_avg = (rating_stats.avg or 0)
-            new_rating = ((current_avg * total_ratings) + data['rating']) / (total_ratings + 1)
-
             db.session.add(reference)
 
-            # Update user rating
-            db.session.query(User).filter(
-                User.id == data['to_user_id']
-            ).update({
-                'rating': new_rating
-            })
+            # Remove it from the giver's pending work queue
+            pending = db.session.execute(
+                delete(PendingReference)
+                .where(
+                    PendingReference.from_user_id == data['from_user_id'],
+                    PendingReference.to_user_id == data['to_user_id'],
+                    PendingReference.post_id == data['post_id']
+                )
+                .returning(PendingReference.from_user_id)
+            ).first()
+            if pending is not None:
+                adjust_user_stats([data['from_user_id']], pending_references=-1)
+
+            # Update user rating incrementally
+            add_rating(data['to_user_id'], data['rating'])
 
             db.session.commit()
 
@@ -3,12 +3,18 @@ from collections import OrderedDict
 
 from flask import Blueprint, request, current_app
 from flask_restx import Api, Resource, fields
-from sqlalchemy import exists, select
+from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
-from app.utils import jsonify_response, to_iso8601
+from app.utils import jsonify_response, to_iso8601, page_param
+from app.tokens import token_owner
+from app.replicas import replica_reads
 from app.extensions import db
-from app.models import PostBookmark, PostApplicant, User, Post, ChatRoom, ChatRoomUser, PostLike, PostComment
+from app.stats import get_user_stats
+from app.serializers import (serialize_post_card, serialize_bookmarked_post_card,
+                             serialize_applied_post_card, post_card_counts)
+from app.statements import user_exists
+from app.models import PostBookmark, PostApplicant, User, Post, ChatRoom, ChatRoomUser, PostLike, PostComment, Notification
 
 user_bp = Blueprint('user_bp', __name__)
 user_api = Api(
@@ -34,6 +40,7 @@ class ViewUser(Resource):
     @user_ns.response(200, 'Success')
     @user_ns.response(400, 'Bad Request')
     @user_ns.response(404, 'User or Post Not Found')
+    @replica_reads
     def get(self, user_id):
         user = User.query \
             .options(joinedload(User.profile)) \
@@ -43,22 +50,11 @@ class ViewUser(Resource):
             current_app.logger.error(f'User or Profile not found: {user_id}')
             return jsonify_response({'error': 'User or Profile not found'}, 404)
 
-        participated = user.chat_rooms.count()
-
-        # Calculate level based on participation
-        level = 0
-        if 11 <= participated <= 20:
-            level = 1
-        elif 21 <= participated <= 30:
-            level = 2
-        elif 31 <= participated <= 40:
-            level = 3
-        elif participated >= 41:
-            level = 4
+        stats = get_user_stats([user_id])[user_id]
 
         dict = OrderedDict([
-            ('participated', participated),
-            ('level', level),
+            ('participated', stats.participated),
+            ('level', stats.level),
             ('rating', user.rating if user.rating else 0.0),
             ('profile', user.profile.serialize())
         ])
@@ -72,13 +68,15 @@ class UserBookmarks(Resource):
     @user_ns.response(200, 'Success')
     @user_ns.response(400, 'Bad Request')
     @user_ns.response(404, 'User Not Found')
+    @token_owner('user_id')
+    @replica_reads
     def post(self, user_id):
         data = request.get_json()
         page = data.get('page', 1)
         per_page = data.get('per_page', 20)
 
         try:
-            if not db.session.scalar(select(exists().where(User.id == user_id))):
+            if not user_exists(user_id):
                 current_app.logger.error(f'User not found: {user_id}')
                 return jsonify_response({'error': 'User not found'}, 404)
 
@@ -88,19 +86,7 @@ class UserBookmarks(Resource):
 
             pagination = bookmarks.paginate(page=page, per_page=per_page, error_out=False)
             posts = [
-                OrderedDict([('id', bookmark.post.id),
-                             ('nickname', bookmark.post.user.profile.nickname),
-                             ('type', bookmark.post.type),
-                             ('title', bookmark.post.title),
-                             ('event_start_date', to_iso8601(bookmark.post.event_start_date)),
-                             ('event_end_date', to_iso8601(bookmark.post.event_end_date)),
-                             ('number_of_people_required', bookmark.post.number_of_people_required),
-                             ('likes', len(bookmark.post.likes)),
-                             ('liked', any(like.user_id == user_id for like in bookmark.post.likes)),
-                             ('bookmarks', len(bookmark.post.bookmarks)),
-                             ('bookmarked', any(bookmark.user_id == user_id for bookmark in bookmark.post.bookmarks)),
-                             ('comments', len(bookmark.post.comments)),
-                             ('applicants', len(bookmark.post.applicants))])
+                serialize_bookmarked_post_card(bookmark.post, **post_card_counts(bookmark.post, user_id))
                 for bookmark in pagination.items
             ]
 
@@ -133,6 +119,8 @@ class UserApplied(Resource):
     @user_ns.response(200, 'Success')
     @user_ns.response(400, 'Bad Request')
     @user_ns.response(404, 'User Not Found')
+    @token_owner('user_id')
+    @replica_reads
     def post(self, user_id):
         data = request.get_json()
         page = data.get('page', 1)
@@ -140,7 +128,7 @@ class UserApplied(Resource):
         review_status = data.get('review_status')  # Optional filter
 
         try:
-            if not db.session.scalar(select(exists().where(User.id == user_id))):
+            if not user_exists(user_id):
                 current_app.logger.error(f'User not found: {user_id}')
                 return jsonify_response({'error': 'User not found'}, 404)
 
@@ -162,20 +150,11 @@ class UserApplied(Resource):
 
             pagination = applicants.paginate(page=page, per_page=per_page, error_out=False)
             posts = [
-                OrderedDict([('id', applicant.post.id),
-                             ('nickname', applicant.post.user.profile.nickname),
-                             ('type', applicant.post.type),
-                             ('title', applicant.post.title),
-                             ('event_start_date', to_iso8601(applicant.post.event_start_date)),
-                             ('event_end_date', to_iso8601(applicant.post.event_end_date)),
-                             ('number_of_people_required', applicant.post.number_of_people_required),
-                             ('likes', len(applicant.post.likes)),
-                             ('liked', any(like.user_id == user_id for like in applicant.post.likes)),
-                             ('bookmarks', len(applicant.post.bookmarks)),
-                             ('bookmarked', any(bookmark.user_id == user_id for bookmark in applicant.post.bookmarks)),
-                             ('comments', len(applicant.post.comments)),
-                             ('applicants', len(applicant.post.applicants)),
-                             ('review_status', applicant.review_status)])
+                serialize_applied_post_card(
+                    applicant.post,
+                    review_status=applicant.review_status,
+                    **post_card_counts(applicant.post, user_id)
+                )
                 for applicant in pagination.items
             ]
 
@@ -197,6 +176,7 @@ class UserParticipation(Resource):
     @user_ns.response(200, 'Success')
     @user_ns.response(400, 'Bad Request')
     @user_ns.response(404, 'User Not Found')
+    @replica_reads
     def post(self, user_id):
         data = request.get_json()
         page = data.get('page', 1)
@@ -213,20 +193,7 @@ class UserParticipation(Resource):
             .paginate(page=page, per_page=per_page, error_out=False)
 
         posts = [
-            OrderedDict([
-                ('id', chat_room.post_id),
-                ('type', chat_room.post.type),
-                ('title', chat_room.post.title),
-                ('event_start_date', to_iso8601(chat_room.post.event_start_date)),
-                ('event_end_date', to_iso8601(chat_room.post.event_end_date)),
-                ('number_of_people_required', chat_room.post.number_of_people_required),
-                ('likes', len(chat_room.post.likes)),
-                ('liked', any(like.user_id == user_id for like in chat_room.post.likes)),
-                ('bookmarks', len(chat_room.post.bookmarks)),
-                ('bookmarked', any(bookmark.user_id == user_id for bookmark in chat_room.post.bookmarks)),
-                ('comments', len(chat_room.post.comments)),
-                ('applicants', len(chat_room.post.applicants))
-            ])
+            serialize_post_card(chat_room.post, **post_card_counts(chat_room.post, user_id))
             for chat_room in pagination.items
         ]
 
@@ -235,4 +202,62 @@ class UserParticipation(Resource):
             'page': pagination.page,
             'pages': pagination.pages,
             'per_page': pagination.per_page
-        }, 200)
\ No newline at end of file
+        }, 200)
+
+
+NotificationHistoryModel = user_ns.model(
+    'NotificationHistoryModel',
+    {
+        'before_id': fields.Integer(description='Get notifications before this notification ID (exclusive)', required=False),
+        'limit': fields.Integer(description='Number of notifications to return (at most 100)', default=50),
+    }
+)
+
+
+@user_ns.route('/notifications/<int:user_id>')
+class UserNotifications(Resource):
+    @user_ns.expect(NotificationHistoryModel)
+    @user_ns.response(200, 'Success')
+    @user_ns.response(400, 'Bad Request')
+    @token_owner('user_id')
+    @replica_reads
+    def post(self, user_id):
+        """Notifications sent to the user, newest first, including the ones missed while offline"""
+        data = request.get_json()
+        before_id = data.get('before_id')
+        limit = page_param(data, 'limit', 50)
+        if limit is None:
+            return jsonify_response({'error': 'limit must be a positive integer'}, 400)
+        limit = min(limit, 100)  # Cap at 100 notifications
+
+        query = select(
+            Notification.id,
+            Notification.event,
+            Notification.payload,
+            Notification.created_at,
+            Notification.dispatched_at
+        ).where(
+            Notification.user_id == user_id
+        )
+        if before_id:
+            query = query.where(Notification.id < before_id)
+
+        # Fetch one extra row to know whether there are more
+        rows = db.session.execute(query.order_by(Notification.id.desc()).limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return jsonify_response({
+            'notifications': [
+                OrderedDict([
+                    ('id', row.id),
+                    ('event', row.event),
+                    ('payload', row.payload),
+                    ('created_at', to_iso8601(row.created_at)),
+                    ('dispatched', row.dispatched_at is not None)
+                ])
+                for row in rows
+            ],
+            'has_more': has_more,
+            'oldest_id': rows[-1].id if rows else None
+        }, 200)
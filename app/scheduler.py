@@ -0,0 +1,169 @@
+import heapq
+import logging
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import select, or_, and_
+
+from app.extensions import db, socketio
+from app.models import Post, ChatRoomUser
+from app.jobs import open_references, close_applications
+from app.notifications import notify_many
+
+logger = logging.getLogger(__name__)
+
+START = 'start'
+END = 'end'
+
+# Catch-up work for instants older than this (first run, long downtime) is done silently
+NOTIFY_WINDOW = timedelta(days=1)
+
+
+class LifecycleScheduler:
+    """
+    Fires event lifecycle hooks when posts start and end, as one green thread per process.
+
+    Upcoming event_start_date / event_end_date instants within the horizon are kept in a heap
+    and reloaded every refresh interval, so posts created or rescheduled meanwhile are picked up.
+    Progress is persisted through Post.started / Post.ended, set in the same transaction as
+    each hook's effects and notifications: a restart only reloads unprocessed posts, and
+    instants missed while the process was down are fired immediately on the first tick.
+    """
+
+    def __init__(self, app, refresh_interval=60, horizon=600, batch_size=200):
+        self.app = app
+        self.refresh_interval = refresh_interval
+        self.horizon = timedelta(seconds=horizon)
+        self.batch_size = batch_size
+        self.heap = []
+        self.scheduled = set()
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        socketio.start_background_task(self.run)
+        logger.info('Lifecycle scheduler started')
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        next_refresh = datetime.now(timezone.utc)
+        while self.running:
+            now = datetime.now(timezone.utc)
+            try:
+                with self.app.app_context():
+                    if now >= next_refresh:
+                        self.refresh(now)
+                        next_refresh = now + timedelta(seconds=self.refresh_interval)
+                    self.fire_due(now)
+            except Exception as e:
+                logger.error(f"Lifecycle scheduler tick failed: {e}")
+            finally:
+                with self.app.app_context():
+                    db.session.remove()
+
+            wake = next_refresh
+            if self.heap and self.heap[0][0] < wake:
+                wake = self.heap[0][0]
+            socketio.sleep(max((wake - datetime.now(timezone.utc)).total_seconds(), 1))
+
+    def refresh(self, now):
+        """Load unprocessed instants up to now + horizon, including overdue ones."""
+        until = now + self.horizon
+        until_naive = until.replace(tzinfo=None)
+        rows = db.session.execute(
+            select(Post.id, Post.started, Post.ended, Post.event_start_date, Post.event_end_date)
+            .where(or_(
+                and_(Post.started.is_(False), Post.event_start_date <= until),
+                and_(Post.ended.is_(False), Post.event_end_date <= until)
+            ))
+        ).all()
+        for post_id, started, ended, start_date, end_date in rows:
+            if not started and start_date <= until_naive:
+                self.schedule(start_date, START, post_id)
+            if not ended and end_date <= until_naive:
+                self.schedule(end_date, END, post_id)
+
+    def schedule(self, instant, kind, post_id):
+        # Columns are naive UTC
+        if instant.tzinfo is None:
+            instant = instant.replace(tzinfo=timezone.utc)
+        key = (kind, post_id, instant)
+        if key in self.scheduled:
+            return
+        self.scheduled.add(key)
+        heapq.heappush(self.heap, (instant, kind, post_id))
+
+    def fire_due(self, now):
+        kinds = set()
+        while self.heap and self.heap[0][0] <= now:
+            instant, kind, post_id = heapq.heappop(self.heap)
+            self.scheduled.discard((kind, post_id, instant))
+            kinds.add(kind)
+
+        # Hooks work on everything due rather than on the popped ids, so a batch covers
+        # posts whose instants landed between refreshes as well
+        if START in kinds:
+            self.on_start(now)
+        if END in kinds:
+            self.on_end(now)
+
+    def on_start(self, now):
+        def notify_closed(rejected):
+            titles = dict(db.session.execute(
+                select(Post.id, Post.title).where(
+                    Post.id.in_({post_id for _, post_id in rejected}),
+                    Post.event_start_date >= now - NOTIFY_WINDOW
+                )
+            ).all())
+            notify_many(
+                (user_id, 'application_rejected', {
+                    'post_id': post_id,
+                    'post_title': titles[post_id],
+                    'message': f"Your application for '{titles[post_id]}' was closed because the event has started."
+                })
+                for user_id, post_id in rejected if post_id in titles
+            )
+
+        rejected = close_applications(now, batch_size=self.batch_size, on_batch=notify_closed)
+        if rejected:
+            logger.info(f"Closed {len(rejected)} pending applications")
+
+    def on_end(self, now):
+        def notify_ended(post_ids):
+            members = db.session.execute(
+                select(ChatRoomUser.user_id, Post.id, Post.title)
+                .join(Post, Post.id == ChatRoomUser.post_id)
+                .where(Post.id.in_(post_ids), Post.event_end_date >= now - NOTIFY_WINDOW)
+            ).all()
+            notify_many(
+                (user_id, 'event_ended', {
+                    'post_id': post_id,
+                    'post_title': title,
+                    'message': f"'{title}' has ended, leave a reference for the other participants!"
+                })
+                for user_id, post_id, title in members
+            )
+
+        post_ids = open_references(now, batch_size=self.batch_size, on_batch=notify_ended)
+        if post_ids:
+            logger.info(f"Ended {len(post_ids)} posts")
+
+
+def init_scheduler(app):
+    """
+    Start the lifecycle scheduler for this process when SCHEDULER_ENABLED is set. Never under
+    the flask CLI, where its hooks and notifications would race the command being run.
+    """
+    if not app.config.get('SCHEDULER_ENABLED') or app.config.get('RUN_FROM_CLI'):
+        return None
+    scheduler = LifecycleScheduler(
+        app,
+        refresh_interval=app.config['SCHEDULER_REFRESH_SECONDS'],
+        horizon=app.config['SCHEDULER_HORIZON_SECONDS'],
+        batch_size=app.config['SCHEDULER_BATCH_SIZE'],
+    )
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,337 @@
+import io
+import json
+import random
+import uuid
+from enum import Enum as PyEnum
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import accumulate
+
+from sqlalchemy import Enum as SQLEnum, text
+
+from app.extensions import db
+from app.models import (Profile, EducationLevelEnum, MBTIEnum, ConstellationEnum, BloodTypeEnum, ReligionEnum,
+                        SexualityEnum, EthnicityEnum, DietEnum)
+from app.passwords import hash_password
+from app.stats import reconcile_user_stats, recompute_ratings
+
+SEED_PASSWORD = 'Seed1234'
+
+# Messages are drawn from one RNG per block; chunks are whole blocks so a resumed run writes the same rows
+MESSAGE_BLOCK = 1024
+
+# Relative frequency of profile enum members, by member name. Members not listed weigh 1,
+# so enums and members added to models.py are picked up without touching this table.
+ENUM_WEIGHTS = {
+    EducationLevelEnum: {'UNDERGRAD': 45, 'POSTGRAD': 15, 'SECONDARY_SCHOOL': 12, 'PHD': 3, 'PREFER_NOT_TO_SAY': 20},
+    MBTIEnum: {'INFP': 4, 'ENFP': 4, 'INFJ': 3, 'ISFJ': 3, 'ISTJ': 3, 'PREFER_NOT_TO_SAY': 25},
+    ConstellationEnum: {'PREFER_NOT_TO_SAY': 8},
+    BloodTypeEnum: {'O': 44, 'A': 26, 'B': 23, 'AB': 6, 'PREFER_NOT_TO_SAY': 15},
+    ReligionEnum: {'ATHEIST': 25, 'BUDDHIST': 15, 'TAOIST': 15, 'AGNOSTIC': 10, 'CHRISTIAN': 5, 'PROTESTANT': 3,
+                   'CATHOLIC': 2, 'PREFER_NOT_TO_SAY': 25},
+    SexualityEnum: {'STRAIGHT': 70, 'BISEXUAL': 6, 'GAY': 4, 'LESBIAN': 3, 'PREFER_NOT_TO_SAY': 12},
+    EthnicityEnum: {'EAST_ASIAN': 70, 'SOUTHEAST_ASIAN': 8, 'WHITE_CAUCASIAN': 5, 'SOUTH_ASIAN': 3,
+                    'PREFER_NOT_TO_SAY': 10},
+    DietEnum: {'OMNIVORE': 70, 'VEGETARIAN': 10, 'PESCATARIAN': 4, 'VEGAN': 3, 'KETOGENIC': 2, 'PREFER_NOT_TO_SAY': 8},
+}
+
+POST_TYPES = ['Sports', 'Music', 'Food', 'Travel', 'Study', 'Games', 'Outdoors', 'Art', 'Movies', 'Volunteering']
+SKILLS = ['Python', 'Guitar', 'Cooking', 'Photography', 'Driving', 'Hiking', 'Design', 'Swimming', 'Singing',
+          'Drawing', 'Climbing', 'Baking']
+PERSONALITIES = ['Calm', 'Outgoing', 'Curious', 'Organised', 'Funny', 'Patient', 'Adventurous', 'Thoughtful']
+LANGUAGES = ['Mandarin', 'English', 'Taiwanese', 'Japanese', 'Korean', 'Cantonese', 'Spanish', 'French']
+CITIES = ['Taipei', 'New Taipei', 'Taichung', 'Tainan', 'Kaohsiung', 'Hsinchu', 'Taoyuan', 'Hualien', 'Keelung']
+COLLEGES = ['NTU', 'NTHU', 'NCKU', 'NYCU', 'NCCU', 'NTNU', 'FJU', 'TKU']
+JOBS = ['Engineer', 'Designer', 'Student', 'Teacher', 'Nurse', 'Sales', 'Barista', 'Accountant', 'Researcher']
+SYLLABLES = ['an', 'bo', 'chen', 'da', 'en', 'fei', 'hao', 'jia', 'ke', 'lin', 'mei', 'ning', 'pei', 'qi', 'rui',
+             'shu', 'ting', 'wei', 'xin', 'yu', 'zhi']
+PHRASES = ['See you there!', 'Running 5 minutes late', 'Who is bringing snacks?', 'Count me in', 'Thanks everyone',
+           'Where do we meet?', 'Great time today!', 'Can I bring a friend?', 'It might rain, bring umbrellas']
+
+KINDS = {'user': 1, 'post': 2, 'message': 3}
+
+USER_COLUMNS = ('id', 'email', 'password', 'active', 'fs_uniquifier', 'rating')
+POST_COLUMNS = ('id', 'type', 'user_id', 'post_created_date', 'post_last_updated_date', 'title', 'content',
+                'event_start_date', 'event_end_date', 'number_of_people_required', 'location', 'started', 'ended',
+                'skills', 'personalities', 'languages', 'attributes')
+CHAT_ROOM_COLUMNS = ('post_id', 'name', 'created_at')
+CHAT_ROOM_USER_COLUMNS = ('post_id', 'user_id', 'joined_at')
+APPLICANT_COLUMNS = ('user_id', 'post_id', 'attributes', 'applied_time', 'review_status')
+REFERENCE_COLUMNS = ('from_user_id', 'to_user_id', 'post_id', 'rating', 'content')
+PENDING_REFERENCE_COLUMNS = ('from_user_id', 'to_user_id', 'post_id', 'event_end_date')
+MESSAGE_COLUMNS = ('id', 'post_id', 'sender_id', 'content', 'created_at', 'read_users')
+
+
+def _weighted(enum):
+    weights = ENUM_WEIGHTS.get(enum, {})
+    members = list(enum)
+    return members, list(accumulate(weights.get(member.name, 1) for member in members))
+
+
+# Profile enum columns, read from the model: column name -> (members, cumulative weights)
+PROFILE_ENUMS = {
+    column.name: _weighted(column.type.enum_class)
+    for column in Profile.__table__.columns
+    if isinstance(column.type, SQLEnum) and column.type.enum_class is not None
+}
+PROFILE_COLUMNS = ('id', 'phone', 'nickname', 'dob', 'gender', 'bio', 'current_location', 'hometown', 'college',
+                   'job_title', *PROFILE_ENUMS, 'smoke', 'drinking', 'marijuana', 'drugs',
+                   'skills', 'personalities', 'languages', 'interest_types')
+
+
+def _copy_field(value):
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    elif isinstance(value, datetime):
+        value = value.isoformat(sep=' ')
+    elif isinstance(value, PyEnum):
+        value = value.name  # Enum columns store member names
+    else:
+        value = str(value)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class CopySource(io.TextIOBase):
+    """Rows rendered to COPY text format as psycopg2 reads them, so a table is never held as one string."""
+
+    def __init__(self, rows):
+        self.lines = ('\t'.join(map(_copy_field, row)) + '\n' for row in rows)
+        self.pending = ''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        parts, length = [self.pending], len(self.pending)
+        while size < 0 or length < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            parts.append(line)
+            length += len(line)
+        data = ''.join(parts)
+        if size < 0:
+            self.pending = ''
+            return data
+        self.pending = data[size:]
+        return data[:size]
+
+
+def copy_rows(table, columns, rows):
+    """COPY rows (tuples in `columns` order) into table within the session's transaction."""
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY "{table}" ({", ".join(columns)}) FROM STDIN',
+            CopySource(rows),
+        )
+    finally:
+        cursor.close()
+
+
+class SyntheticDataset:
+    """
+    Every user, post (with its room, applicants and references) and message block is a pure
+    function of (seed, index), so any range can be generated on its own, in any process, and
+    always comes out the same. Ids are id_offset + index + 1.
+    """
+
+    def __init__(self, seed, users, posts, messages, anchor, id_offset=0):
+        self.seed = seed
+        self.users = users
+        self.posts = posts
+        self.messages = messages
+        self.anchor = anchor
+        self.id_offset = id_offset
+        self.members = lru_cache(maxsize=65536)(self._members)
+
+    def rng(self, kind, index):
+        return random.Random((self.seed << 40) | (KINDS[kind] << 36) | index)
+
+    def row_id(self, index):
+        return self.id_offset + index + 1
+
+    def popular_user(self, rng):
+        # Few users host and join most events
+        return int(self.users * rng.random() ** 2)
+
+    # Users
+
+    def user(self, index, password):
+        rng = self.rng('user', index)
+        user_id = self.row_id(index)
+        user = (user_id, f'user{user_id}@seed.sparkup.local', password, True,
+                str(uuid.UUID(int=rng.getrandbits(128), version=4)), 0.0)
+
+        nickname = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        profile = (
+            user_id,
+            f'09{rng.randrange(10 ** 8):08d}',
+            f'{nickname}{rng.randrange(100)}',
+            self.anchor - timedelta(days=rng.randint(18 * 365, 50 * 365)),
+            rng.choices(range(4), cum_weights=(48, 96, 98, 100))[0],
+            rng.choice(['', 'Love meeting new people', 'Coffee and mountains', 'Always up for a game']),
+            rng.choice(CITIES),
+            rng.choice(CITIES),
+            rng.choice(COLLEGES),
+            rng.choice(JOBS),
+            *(rng.choices(members, cum_weights=weights)[0] for members, weights in PROFILE_ENUMS.values()),
+            rng.randrange(4), rng.randrange(4), rng.randrange(4), rng.randrange(4),
+            rng.sample(SKILLS, rng.randrange(5)),
+            rng.sample(PERSONALITIES, rng.randrange(4)),
+            rng.sample(LANGUAGES, 1 + int(rng.random() ** 2 * 3)),
+            rng.sample(POST_TYPES, rng.randrange(5)),
+        )
+        return user, profile
+
+    # Posts
+
+    def post(self, index):
+        """(post, chat room, room users, applicants, references, pending references) rows of one post."""
+        rng = self.rng('post', index)
+        post_id = self.row_id(index)
+        host_id = self.row_id(self.popular_user(rng))
+
+        start = self.anchor + timedelta(seconds=int(rng.uniform(-365, 90) * 86400))
+        end = start + timedelta(hours=rng.choice([1, 2, 2, 3, 3, 4, 6, 8, 24]))
+        created = start - timedelta(seconds=int(rng.uniform(1, 30) * 86400))
+        seats = rng.randint(2, 12)
+        post_type = rng.choice(POST_TYPES)
+        title = f'{post_type} at {rng.choice(CITIES)} #{post_id}'
+
+        applicants, members = [], [(host_id, created)]
+        seen = {host_id}
+        for _ in range(min(self.users - 1, int(rng.expovariate(1 / 6)))):
+            user_id = self.row_id(self.popular_user(rng))
+            if user_id in seen:
+                continue
+            seen.add(user_id)
+            applied = created + (start - created) * rng.random()
+            status = rng.choices((0, 1, 2), cum_weights=(30, 45, 100))[0]
+            if status == 2 and len(members) - 1 >= seats:
+                status = 0
+            if status == 2:
+                members.append((user_id, applied))
+            applicants.append((user_id, post_id, {}, applied, status))
+
+        ended = end < self.anchor
+        references, pending = [], []
+        if ended:
+            for giver, _ in members:
+                for receiver, _ in members:
+                    if giver == receiver:
+                        continue
+                    if rng.random() < 0.6:
+                        rating = rng.choices((1, 2, 3, 4, 5), cum_weights=(2, 5, 15, 50, 100))[0]
+                        references.append((giver, receiver, post_id, rating, rng.choice(PHRASES)))
+                    else:
+                        pending.append((giver, receiver, post_id, end))
+
+        post = (post_id, post_type, host_id, created, created, title, ' '.join(rng.choices(PHRASES, k=3)),
+                start, end, seats - (len(members) - 1), rng.choice(CITIES), start < self.anchor, ended,
+                rng.sample(SKILLS, rng.randrange(3)), rng.sample(PERSONALITIES, rng.randrange(3)),
+                rng.sample(LANGUAGES, rng.randrange(3)), {})
+        room = (post_id, title, created)
+        room_users = [(post_id, user_id, joined) for user_id, joined in members]
+        return post, room, room_users, applicants, references, pending
+
+    def _members(self, index):
+        return [user_id for _, user_id, _ in self.post(index)[2]]
+
+    # Messages
+
+    def message_block(self, block):
+        """Rows of messages block * MESSAGE_BLOCK onwards, ids and timestamps increasing together."""
+        rng = self.rng('message', block)
+        first = block * MESSAGE_BLOCK
+        span = timedelta(days=365) / max(self.messages, 1)
+        base = self.anchor - timedelta(days=365)
+        rows = []
+        for index in range(first, min(first + MESSAGE_BLOCK, self.messages)):
+            # Chat volume is concentrated in a minority of rooms
+            post_index = int(self.posts * rng.random() ** 3)
+            members = self.members(post_index)
+            sender_id = rng.choice(members)
+            read_users = sorted({sender_id, *rng.sample(members, rng.randrange(len(members) + 1))})
+            rows.append((self.row_id(index), self.row_id(post_index), sender_id, rng.choice(PHRASES),
+                         base + span * index, read_users))
+        return rows
+
+
+def _completed(table, first_id, last_id):
+    """Rows already seeded in [first_id, last_id]: chunks commit whole and in id order, so the max id tells."""
+    done = db.session.execute(
+        text(f'SELECT max(id) FROM "{table}" WHERE id BETWEEN :first AND :last'),
+        {'first': first_id, 'last': last_id},
+    ).scalar()
+    return 0 if done is None else done - first_id + 1
+
+
+def seed_users(dataset, chunk_size, on_progress=None):
+    start = _completed('users', dataset.row_id(0), dataset.row_id(dataset.users - 1))
+    password = hash_password(SEED_PASSWORD)
+    for first in range(start, dataset.users, chunk_size):
+        last = min(first + chunk_size, dataset.users)
+        rows = [dataset.user(index, password) for index in range(first, last)]
+        copy_rows('users', USER_COLUMNS, (user for user, _ in rows))
+        copy_rows('profiles', PROFILE_COLUMNS, (profile for _, profile in rows))
+        db.session.commit()
+        if on_progress:
+            on_progress('users', last, dataset.users)
+    return dataset.users - start
+
+
+def seed_posts(dataset, chunk_size, on_progress=None):
+    start = _completed('posts', dataset.row_id(0), dataset.row_id(dataset.posts - 1))
+    for first in range(start, dataset.posts, chunk_size):
+        last = min(first + chunk_size, dataset.posts)
+        rows = [dataset.post(index) for index in range(first, last)]
+        copy_rows('posts', POST_COLUMNS, (row[0] for row in rows))
+        copy_rows('chat_rooms', CHAT_ROOM_COLUMNS, (row[1] for row in rows))
+        copy_rows('chat_room_users', CHAT_ROOM_USER_COLUMNS, (item for row in rows for item in row[2]))
+        copy_rows('post_applicants', APPLICANT_COLUMNS, (item for row in rows for item in row[3]))
+        copy_rows('references', REFERENCE_COLUMNS, (item for row in rows for item in row[4]))
+        copy_rows('pending_references', PENDING_REFERENCE_COLUMNS, (item for row in rows for item in row[5]))
+        db.session.commit()
+        if on_progress:
+            on_progress('posts', last, dataset.posts)
+    return dataset.posts - start
+
+
+def seed_messages(dataset, chunk_size, on_progress=None):
+    if not dataset.posts:
+        return 0
+    first_id, last_id = dataset.row_id(0), dataset.row_id(dataset.messages - 1)
+    done = _completed('messages', first_id, last_id)
+    start_block = done // MESSAGE_BLOCK
+    if done % MESSAGE_BLOCK and done < dataset.messages:
+        # Only a run with hand-edited rows can stop mid-block; rewrite that block
+        db.session.execute(text('DELETE FROM messages WHERE id BETWEEN :first AND :last'),
+                           {'first': dataset.row_id(start_block * MESSAGE_BLOCK), 'last': last_id})
+    blocks = -(-dataset.messages // MESSAGE_BLOCK)
+    blocks_per_chunk = max(1, chunk_size // MESSAGE_BLOCK)
+    for first in range(start_block, blocks, blocks_per_chunk):
+        last = min(first + blocks_per_chunk, blocks)
+        copy_rows('messages', MESSAGE_COLUMNS,
+                  (row for block in range(first, last) for row in dataset.message_block(block)))
+        db.session.commit()
+        if on_progress:
+            on_progress('messages', min(last * MESSAGE_BLOCK, dataset.messages), dataset.messages)
+    return dataset.messages - start_block * MESSAGE_BLOCK
+
+
+def finish_seed():
+    """Move id sequences past the seeded rows and rebuild the derived stats and ratings."""
+    for table in ('users', 'posts', 'messages'):
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT coalesce(max(id), 1) FROM {table}))"
+        ))
+    reconcile_user_stats()
+    recompute_ratings()
+    db.session.commit()
@@ -0,0 +1,189 @@
+from collections import namedtuple, defaultdict
+
+from sqlalchemy import case, func, select, update, cast, Float
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.extensions import db
+from app.models import User, UserStats, ChatRoomUser, Post, Reference, PendingReference
+
+# (minimum participated, level), highest first
+LEVEL_THRESHOLDS = ((41, 4), (31, 3), (21, 2), (11, 1))
+
+Stats = namedtuple('Stats', ['participated', 'hosted', 'level', 'rating_sum', 'rating_count', 'pending_references'])
+EMPTY_STATS = Stats(0, 0, 0, 0, 0, 0)
+
+
+def level_for(participated):
+    for minimum, level in LEVEL_THRESHOLDS:
+        if participated >= minimum:
+            return level
+    return 0
+
+
+def level_expression(participated):
+    """SQL counterpart of level_for()."""
+    return case(*[(participated >= minimum, level) for minimum, level in LEVEL_THRESHOLDS], else_=0)
+
+
+def get_user_stats(user_ids):
+    """Fetch stats for many users in one query. Users without a row get EMPTY_STATS."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    rows = db.session.execute(
+        select(UserStats.user_id, *[getattr(UserStats, field) for field in Stats._fields])
+        .where(UserStats.user_id.in_(user_ids))
+    ).all()
+    stats = {row[0]: Stats(*row[1:]) for row in rows}
+    return {user_id: stats.get(user_id, EMPTY_STATS) for user_id in user_ids}
+
+
+def adjust_user_stats(user_ids, participated=0, hosted=0, pending_references=0):
+    """
+    Apply the same counter deltas to every user in user_ids with a single upsert.
+    Runs inside the caller's transaction so counters commit together with the rows they count.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+
+    stmt = pg_insert(UserStats).values([
+        {
+            'user_id': user_id,
+            'participated': max(participated, 0),
+            'hosted': max(hosted, 0),
+            'level': level_for(max(participated, 0)),
+            'pending_references': max(pending_references, 0),
+        }
+        for user_id in user_ids
+    ])
+    new_participated = func.greatest(UserStats.participated + participated, 0)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={
+            'participated': new_participated,
+            'hosted': func.greatest(UserStats.hosted + hosted, 0),
+            'level': level_expression(new_participated),
+            'pending_references': func.greatest(UserStats.pending_references + pending_references, 0),
+        }
+    ))
+
+
+def adjust_pending_references(counts):
+    """Apply per-user pending reference deltas, e.g. {user_id: 3, other_id: -1}."""
+    # Group users sharing the same delta so each distinct delta is a single upsert
+    by_delta = defaultdict(list)
+    for user_id, delta in counts.items():
+        if delta:
+            by_delta[delta].append(user_id)
+    for delta, users in by_delta.items():
+        adjust_user_stats(users, pending_references=delta)
+
+
+def reconcile_user_stats():
+    """Recompute every user's stats from the source tables. Returns the number of rows written."""
+    participated = select(
+        ChatRoomUser.user_id,
+        func.count().label('count')
+    ).group_by(ChatRoomUser.user_id).subquery()
+
+    hosted = select(
+        Post.user_id,
+        func.count().label('count')
+    ).group_by(Post.user_id).subquery()
+
+    ratings = select(
+        Reference.to_user_id.label('user_id'),
+        func.sum(Reference.rating).label('total'),
+        func.count().label('count')
+    ).group_by(Reference.to_user_id).subquery()
+
+    pending = select(
+        PendingReference.from_user_id.label('user_id'),
+        func.count().label('count')
+    ).group_by(PendingReference.from_user_id).subquery()
+
+    participated_count = func.coalesce(participated.c.count, 0)
+    source = select(
+        User.id,
+        participated_count,
+        func.coalesce(hosted.c.count, 0),
+        level_expression(participated_count),
+        func.coalesce(ratings.c.total, 0),
+        func.coalesce(ratings.c.count, 0),
+        func.coalesce(pending.c.count, 0),
+    ).outerjoin(
+        participated, participated.c.user_id == User.id
+    ).outerjoin(
+        hosted, hosted.c.user_id == User.id
+    ).outerjoin(
+        ratings, ratings.c.user_id == User.id
+    ).outerjoin(
+        pending, pending.c.user_id == User.id
+    )
+
+    stmt = pg_insert(UserStats).from_select(['user_id', *Stats._fields], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={field: getattr(stmt.excluded, field) for field in Stats._fields}
+    )
+    return db.session.execute(stmt).rowcount
+
+
+def average_rating(stats):
+    return stats.rating_sum / stats.rating_count if stats.rating_count else 0.0
+
+
+def add_rating(user_id, rating):
+    """
+    Fold one new reference rating into the recipient's totals with an atomic increment and
+    refresh the derived users.rating. The upsert row lock serializes concurrent references
+    for the same user, so the average written always matches the totals. Returns the new average.
+    """
+    stmt = pg_insert(UserStats).values(user_id=user_id, rating_sum=rating, rating_count=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={
+            'rating_sum': UserStats.rating_sum + rating,
+            'rating_count': UserStats.rating_count + 1,
+        }
+    ).returning(UserStats.rating_sum, UserStats.rating_count)
+    rating_sum, rating_count = db.session.execute(stmt).one()
+
+    average = rating_sum / rating_count
+    db.session.execute(update(User).where(User.id == user_id).values(rating=average))
+    return average
+
+
+def recompute_ratings():
+    """Rebuild rating_sum/rating_count from the references table and re-derive users.rating."""
+    ratings = select(
+        Reference.to_user_id.label('user_id'),
+        func.sum(Reference.rating).label('total'),
+        func.count().label('count')
+    ).group_by(Reference.to_user_id).subquery()
+
+    source = select(
+        User.id,
+        func.coalesce(ratings.c.total, 0),
+        func.coalesce(ratings.c.count, 0),
+    ).outerjoin(ratings, ratings.c.user_id == User.id)
+
+    stmt = pg_insert(UserStats).from_select(['user_id', 'rating_sum', 'rating_count'], source)
+    count = db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={
+            'rating_sum': stmt.excluded.rating_sum,
+            'rating_count': stmt.excluded.rating_count,
+        }
+    )).rowcount
+
+    db.session.execute(
+        update(User)
+        .where(User.id == UserStats.user_id)
+        .values(rating=case(
+            (UserStats.rating_count > 0, cast(UserStats.rating_sum, Float) / cast(UserStats.rating_count, Float)),
+            else_=0.0
+        ))
+    )
+    return count
@@ -0,0 +1,216 @@
+import hmac
+import time
+import base64
+import hashlib
+import logging
+from functools import wraps
+from collections import OrderedDict
+
+from flask import request, g, current_app
+from sqlalchemy import select
+
+from app.utils import jsonify_response
+from app.config import DEFAULT_SECRET_KEY
+from app.extensions import db
+from app.models import User, user_datastore
+
+logger = logging.getLogger(__name__)
+
+# Blueprints that accept requests without an access token
+PUBLIC_BLUEPRINTS = {'auth_bp', 'restx_doc'}
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class UniquifierCache:
+    """
+    Small LRU of user_id -> fs_uniquifier for users whose tokens were recently checked.
+
+    Entries live for at most `ttl` seconds, which bounds how long a rotated uniquifier
+    (revoke_tokens in another process) keeps old tokens valid; rotations in this process
+    evict immediately.
+    """
+
+    def __init__(self, maxsize=4096, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        entry = self.entries.get(user_id)
+        if entry is not None:
+            uniquifier, cached_at = entry
+            if time.monotonic() - cached_at < self.ttl:
+                self.entries.move_to_end(user_id)
+                self.hits += 1
+                return uniquifier
+            del self.entries[user_id]
+        self.misses += 1
+        return None
+
+    def put(self, user_id, uniquifier):
+        self.entries[user_id] = (uniquifier, time.monotonic())
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def discard(self, user_id):
+        self.entries.pop(user_id, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+uniquifier_cache = UniquifierCache()
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def _b64decode(value):
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+def _signature(user_id, expires, uniquifier, secret_key=None):
+    key = (secret_key or current_app.config['SECRET_KEY']).encode()
+    message = f"access:{user_id}:{expires}:{uniquifier}".encode()
+    return hmac.new(key, message, hashlib.sha256).digest()
+
+
+def issue_token(user):
+    """Return (token, expires_in) for a user, bound to its current fs_uniquifier."""
+    expires_in = current_app.config['AUTH_TOKEN_TTL']
+    expires = int(time.time()) + expires_in
+    uniquifier_cache.put(user.id, user.fs_uniquifier)
+    payload = _b64encode(f"{user.id}:{expires}".encode())
+    return f"{payload}.{_b64encode(_signature(user.id, expires, user.fs_uniquifier))}", expires_in
+
+
+def load_uniquifier(user_id):
+    uniquifier = uniquifier_cache.get(user_id)
+    if uniquifier is None:
+        uniquifier = db.session.execute(
+            select(User.fs_uniquifier).where(User.id == user_id, User.active.is_(True))
+        ).scalar()
+        if uniquifier is None:
+            return None
+        uniquifier_cache.put(user_id, uniquifier)
+    return uniquifier
+
+
+def parse_token(token):
+    """Split a token into (user_id, expires, signature), raising InvalidToken if malformed or expired."""
+    try:
+        payload, signature = token.split('.')
+        user_id, expires = (int(part) for part in _b64decode(payload).decode().split(':'))
+        signature = _b64decode(signature)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidToken('Malformed token')
+
+    if expires < time.time():
+        raise InvalidToken('Token expired')
+    return user_id, expires, signature
+
+
+def check_signature(user_id, expires, signature, uniquifier, secret_key=None):
+    """Raise InvalidToken unless the signature matches the user's current fs_uniquifier."""
+    if uniquifier is None or not hmac.compare_digest(signature, _signature(user_id, expires, uniquifier, secret_key)):
+        raise InvalidToken('Invalid token')
+
+
+def verify_token(token):
+    """Return the user id a token was issued to, raising InvalidToken otherwise."""
+    user_id, expires, signature = parse_token(token)
+    check_signature(user_id, expires, signature, load_uniquifier(user_id))
+    return user_id
+
+
+def revoke_tokens(user):
+    """Invalidate every outstanding token of a user by rotating its fs_uniquifier."""
+    user_datastore.set_uniquifier(user)
+    uniquifier_cache.discard(user.id)
+
+
+def bearer_token():
+    header = request.headers.get('Authorization', '')
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() == 'bearer' and token:
+        return token.strip()
+    return None
+
+
+def authenticate_request():
+    """
+    before_request hook: verify the bearer token on every non-public blueprint and expose
+    the caller as g.auth_user_id. Missing tokens are only rejected when AUTH_TOKENS_REQUIRED
+    is set, so clients can roll over before enforcement is switched on.
+    """
+    g.auth_user_id = None
+    if request.method == 'OPTIONS' or request.blueprint in PUBLIC_BLUEPRINTS or request.blueprint is None:
+        return None
+    if request.endpoint and request.endpoint.endswith(('.doc', '.specs', '.root')):
+        return None
+
+    token = bearer_token()
+    if token is None:
+        if current_app.config['AUTH_TOKENS_REQUIRED']:
+            return jsonify_response({'message': 'Authentication required'}, 401)
+        return None
+
+    try:
+        g.auth_user_id = verify_token(token)
+    except InvalidToken as e:
+        return jsonify_response({'message': str(e)}, 401)
+    return None
+
+
+def is_token_owner(user_id):
+    """True unless the request is authenticated as someone other than user_id."""
+    auth_user_id = g.get('auth_user_id')
+    return auth_user_id is None or str(user_id) == str(auth_user_id)
+
+
+def token_owner(field):
+    """
+    Reject requests acting on behalf of another user: the `field` URL argument or JSON body
+    field must match the authenticated user. A no-op for unauthenticated requests, which
+    authenticate_request only lets through while AUTH_TOKENS_REQUIRED is off.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if g.get('auth_user_id') is not None:
+                if field in kwargs:
+                    claimed = kwargs[field]
+                else:
+                    claimed = (request.get_json(silent=True) or {}).get(field)
+                if claimed is not None and not is_token_owner(claimed):
+                    return jsonify_response({'message': 'Not allowed to act for another user'}, 403)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def check_secret_key(config):
+    """
+    Refuse the repository's SECRET_KEY in production: anyone could sign access tokens with it,
+    leaving fs_uniquifier as the only secret. Development only logs an error.
+    """
+    if config['SECRET_KEY'] != DEFAULT_SECRET_KEY:
+        return
+    message = 'SECRET_KEY is the public default, set the SECRET_KEY environment variable'
+    if config['APP_ENV'] == 'production':
+        raise RuntimeError(message)
+    logger.error(message)
+
+
+def init_auth(app):
+    check_secret_key(app.config)
+    uniquifier_cache.maxsize = app.config['AUTH_TOKEN_CACHE_SIZE']
+    uniquifier_cache.ttl = app.config['AUTH_TOKEN_CACHE_TTL']
+    app.before_request(authenticate_request)
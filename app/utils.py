@@ -1,16 +1,46 @@
-import json
-from flask import Response
-from datetime import datetime
+from flask import Response, stream_with_context
+from datetime import datetime, timezone
+
+from app.encoding import dumps, iter_json_array, to_iso8601
 
 
 def jsonify_response(data, status_code=200):
-    response_json = json.dumps(data, ensure_ascii=False)
-    return Response(response_json, status=status_code, mimetype='application/json')
+    """JSON response on the configured encoder, datetimes and enums may be passed as is."""
+    return Response(dumps(data), status=status_code, mimetype='application/json')
+
 
+def stream_response(envelope, key, items, status_code=200):
+    """Like jsonify_response(dict(envelope, key=items)), encoding the items array incrementally."""
+    return Response(
+        stream_with_context(iter_json_array(envelope, key, items)),
+        status=status_code,
+        mimetype='application/json'
+    )
 
-def to_iso8601(date: datetime):
-    return date.strftime('%Y-%m-%dT%H:%M:%S.') + f'{date.microsecond // 1000:03d}' + 'Z'
+
+def page_param(data, key, default, maximum=None):
+    """data[key] (default when absent) as an int from 1 to maximum, None when it is not one."""
+    try:
+        value = int(data.get(key, default))
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 1 and (maximum is None or value <= maximum) else None
 
 
 def to_datetime(iso: str):
-    return datetime.fromisoformat(iso.replace('Z', '+00:00'))
\ No newline at end of file
+    return datetime.fromisoformat(iso.replace('Z', '+00:00'))
+
+
+def to_naive_utc(value: datetime):
+    """value as the naive UTC datetime stored in DateTime columns, naive values are taken as UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def foreign_key_violation(error):
+    """Return the violated foreign key constraint name of an IntegrityError, or None."""
+    orig = getattr(error, 'orig', None)
+    if getattr(orig, 'pgcode', None) != '23503':
+        return None
+    return orig.diag.constraint_name or ''
\ No newline at end of file
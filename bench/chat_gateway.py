@@ -0,0 +1,159 @@
+"""
+Chat on the eventlet server (run.py) against the asyncio chat gateway (run_async.py), side by side.
+
+Against each server in turn: opens --connections authenticated Socket.IO connections (timing
+each handshake, --connect-concurrency at a time), then, with all of them held open, has
+--chat-clients room members send a message every --chat-interval seconds and times the echo
+of their own messages, as bench/load.py does. Uses the bench/load.py dataset (--tag), seeding
+it first if needed.
+
+    DATABASE_URL=postgresql://localhost/sparkup_bench python bench/chat_gateway.py --start-servers \\
+        --connections 1000 --chat-clients 50 --duration 30
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+
+from common import ROOT, summarize
+from load import ChatClient, seed, load_dataset, chat_report
+
+SERVERS = {
+    'eventlet': lambda host, port: ['gunicorn', '-k', 'eventlet', '-w', '1', '-b', f'{host}:{port}', 'run:app'],
+    'asyncio': lambda host, port: ['uvicorn', 'run_async:app', '--host', host, '--port', port,
+                                   '--log-level', 'warning'],
+}
+
+
+def start_server(name, base_url, log):
+    host, _, port = base_url.rpartition('//')[2].partition(':')
+    env = dict(os.environ, LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING'))
+    server = subprocess.Popen(SERVERS[name](host, port or '80'), cwd=ROOT, env=env, stdout=log,
+                              stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'{name} server exited with status {server.returncode}')
+        try:
+            urllib.request.urlopen(f'{base_url}/socket.io/?EIO=4&transport=polling', timeout=2).read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f'{name} server did not come up within 30s')
+
+
+def open_connection(base_url, token):
+    client = socketio.Client(reconnection=False)
+    start = time.perf_counter()
+    try:
+        client.connect(base_url, auth={'token': token}, transports=['websocket'], wait_timeout=10)
+    except socketio.exceptions.ConnectionError:
+        return None, None
+    return client, time.perf_counter() - start
+
+
+def open_connections(base_url, data, count, concurrency):
+    user_ids = [user_id for user_id, _ in data.users]
+    tokens = [data.tokens[user_ids[i % len(user_ids)]] for i in range(count)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda token: open_connection(base_url, token), tokens))
+    elapsed = time.perf_counter() - start
+
+    clients = [client for client, _ in results if client is not None]
+    report = summarize([seconds for _, seconds in results if seconds is not None], elapsed)
+    report['connected'] = report.pop('requests')
+    report['failed'] = count - len(clients)
+    report['wall_s'] = round(elapsed, 2)
+    return clients, report
+
+
+def run_chat(base_url, args, data):
+    members = [(user_id, post_id) for post_id, user_ids in data.rooms.items() if len(user_ids) > 1
+               for user_id in user_ids]
+    rng = random.Random(args.seed)
+    picked = rng.sample(members, min(args.chat_clients, len(members)))
+    clients = [ChatClient(base_url, user_id, data.tokens[user_id], post_id) for user_id, post_id in picked]
+
+    start = time.perf_counter()
+    record_from = start + args.warmup
+    deadline = record_from + args.duration
+    threads = [threading.Thread(target=client.run,
+                                args=(random.Random(args.seed + i), args.chat_interval, record_from, deadline))
+               for i, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Let the last echoes arrive before counting losses
+    time.sleep(2)
+    for client in clients:
+        client.close()
+    return chat_report(clients, args.duration)
+
+
+def bench_server(name, base_url, args, data):
+    log = open(args.server_log, 'a') if args.server_log else subprocess.DEVNULL
+    server = start_server(name, base_url, log) if args.start_servers else None
+    try:
+        idle, connections = open_connections(base_url, data, args.connections, args.connect_concurrency)
+        messages = run_chat(base_url, args, data)
+        for client in idle:
+            client.disconnect()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return {'url': base_url, 'connections': connections, 'messages': messages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--eventlet-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--asyncio-url', default='http://127.0.0.1:5001')
+    parser.add_argument('--servers', default='eventlet,asyncio', help='Which of the two to run, comma separated')
+    parser.add_argument('--start-servers', action='store_true',
+                        help='Run gunicorn -k eventlet (run.py) and uvicorn (run_async.py) on the URLs')
+    parser.add_argument('--server-log', help='Append the started servers output to this file')
+    parser.add_argument('--tag', default='load', help='bench/load.py dataset name')
+    parser.add_argument('--reseed', action='store_true', help='Drop and recreate the --tag dataset')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--posts', type=int, default=250)
+    parser.add_argument('--max-comments', type=int, default=10)
+    parser.add_argument('--messages-per-room', type=int, default=50)
+    parser.add_argument('--connections', type=int, default=500, help='Connections held open during the chat run')
+    parser.add_argument('--connect-concurrency', type=int, default=20)
+    parser.add_argument('--chat-clients', type=int, default=32)
+    parser.add_argument('--chat-interval', type=float, default=1.0, help='Seconds between messages per chat client')
+    parser.add_argument('--warmup', type=float, default=5.0)
+    parser.add_argument('--duration', type=float, default=30.0)
+    args = parser.parse_args()
+
+    seed(args)
+    data = load_dataset(args)
+    urls = {'eventlet': args.eventlet_url, 'asyncio': args.asyncio_url}
+    results = {name: bench_server(name, urls[name], args, data) for name in args.servers.split(',')}
+
+    json.dump({
+        'dataset': dict(data.counts(), tag=args.tag),
+        'connections': args.connections,
+        'chat_clients': args.chat_clients,
+        'chat_interval_s': args.chat_interval,
+        'duration_s': args.duration,
+        'servers': results,
+    }, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
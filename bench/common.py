@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+import time
+import urllib.request
+import urllib.error
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def request_json(base_url, path, payload=None, method='POST', timeout=30, token=None):
+    """Send a JSON request and return (status_code, decoded_body, elapsed_seconds)."""
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    req = urllib.request.Request(
+        f"{base_url}{path}",
+        data=json.dumps(payload).encode() if payload is not None else None,
+        headers=headers,
+        method=method,
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            raw = resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        raw = e.read()
+        status = e.code
+    elapsed = time.perf_counter() - start
+    try:
+        body = json.loads(raw) if raw else None
+    except ValueError:
+        body = raw.decode(errors='replace')
+    return status, body, elapsed
+
+
+def post_json(base_url, path, payload, timeout=30, token=None):
+    """POST a JSON payload and return (status_code, elapsed_seconds)."""
+    status, _, elapsed = request_json(base_url, path, payload, timeout=timeout, token=token)
+    return status, elapsed
+
+
+def post_json_body(base_url, path, payload, timeout=30, token=None):
+    """POST a JSON payload and return (status_code, decoded_body)."""
+    status, body, _ = request_json(base_url, path, payload, timeout=timeout, token=token)
+    return status, body
+
+
+def login(base_url, email, password):
+    """Log in through the API and return (user_id, access_token)."""
+    status, body = post_json_body(base_url, '/auth/login', {'email': email, 'password': password})
+    if status != 200:
+        raise RuntimeError(f"Login failed for {email}: {status} {body}")
+    return body['user_id'], body['access_token']
+
+
+_app = None
+
+
+def bench_app():
+    """
+    An app instance in this process against DATABASE_URL, for seeding and minting tokens.
+    It shares SECRET_KEY with the server under test, so the tokens it signs are accepted there.
+    """
+    global _app
+    if _app is None:
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        sys.path.insert(0, ROOT)
+        from app.main import create_app
+        _app, _ = create_app()
+    return _app
+
+
+def mint_tokens(user_ids, ttl=None):
+    """Access tokens for existing active users, {user_id: token}, without going through /auth/login."""
+    from app.models import User
+    from app.tokens import issue_token
+
+    app = bench_app()
+    with app.app_context():
+        if ttl is not None:
+            app.config['AUTH_TOKEN_TTL'] = ttl
+        users = User.query.filter(User.id.in_(list(user_ids))).all()
+        return {user.id: issue_token(user)[0] for user in users}
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(pct / 100 * len(samples))) - 1))
+    return samples[index]
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'throughput': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
@@ -0,0 +1,93 @@
+"""
+Checks that concurrent greenlets overlap on database waits in green DB mode.
+
+Runs --concurrency greenlets inside the app, each in its own app context issuing
+SELECT pg_sleep(--sleep) through db.session, and compares wall time to the serial sum.
+With the green wait callback the overlap factor approaches --concurrency (bounded by the
+pool size); with --blocking it stays at 1.0 because libpq blocks the whole hub.
+A ticker greenlet also counts how often the hub got to run meanwhile.
+
+    DATABASE_URL=postgresql://localhost/sparkup python bench/db_overlap.py --concurrency 20
+    DATABASE_URL=postgresql://localhost/sparkup python bench/db_overlap.py --concurrency 20 --blocking
+"""
+import eventlet
+eventlet.monkey_patch(all=False, socket=True, thread=True)
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from psycopg2 import extensions
+from sqlalchemy import text
+
+from app.config import Config
+from app.extensions import db
+from app.greendb import is_green
+from app.main import create_app
+
+
+def query(app, seconds, latencies):
+    with app.app_context():
+        start = time.perf_counter()
+        db.session.execute(text('SELECT pg_sleep(:seconds)'), {'seconds': seconds})
+        latencies.append(time.perf_counter() - start)
+        db.session.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--sleep', type=float, default=0.2, help='Seconds each query waits server side')
+    parser.add_argument('--blocking', action='store_true', help='Run without the green wait callback')
+    args = parser.parse_args()
+
+    class BenchConfig(Config):
+        GREEN_DB_ENABLED = not args.blocking
+
+    app, _ = create_app(BenchConfig)
+    if args.blocking:
+        extensions.set_wait_callback(None)
+
+    # Open the pool connections up front so connect time does not skew the comparison
+    with app.app_context():
+        connections = [db.engine.connect() for _ in range(min(args.concurrency, Config.SQLALCHEMY_ENGINE_OPTIONS['pool_size']))]
+        for connection in connections:
+            connection.close()
+
+    ticks = [0]
+    running = [True]
+
+    def ticker():
+        while running[0]:
+            ticks[0] += 1
+            eventlet.sleep(0.01)
+
+    eventlet.spawn(ticker)
+    latencies = []
+    pool = eventlet.GreenPool(args.concurrency)
+    start = time.perf_counter()
+    for _ in range(args.concurrency):
+        pool.spawn(query, app, args.sleep, latencies)
+    pool.waitall()
+    elapsed = time.perf_counter() - start
+    running[0] = False
+
+    json.dump({
+        'green': is_green(),
+        'concurrency': args.concurrency,
+        'sleep_s': args.sleep,
+        'wall_s': round(elapsed, 3),
+        'serial_s': round(sum(latencies), 3),
+        'overlap': round(sum(latencies) / elapsed, 2) if elapsed else 0.0,
+        'hub_ticks': ticks[0],
+        'expected_hub_ticks': int(elapsed / 0.01),
+    }, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
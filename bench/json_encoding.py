@@ -0,0 +1,150 @@
+"""
+Micro-benchmark of response encoding on payloads shaped like ListPost and ChatMessages.
+
+Compares the previous path (strftime-based to_iso8601 on every datetime, then json.dumps(ensure_ascii=False))
+with the app.encoding backends, which take datetimes and enums as is. A --large array of
+chat messages is also encoded whole and streamed through iter_json_array, as is the
+ChatMessages page (app.utils.stream_response).
+Runs offline, no server or database needed.
+
+    python bench/json_encoding.py --repeat 200 --large 10000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.encoding import StdlibBackend, OrjsonBackend, orjson, iter_json_array
+
+BASE = datetime(2026, 1, 1, 12, 0, 0, 123456)
+
+
+def legacy_to_iso8601(date: datetime):
+    """app.utils.to_iso8601 before app.encoding"""
+    return date.strftime('%Y-%m-%dT%H:%M:%S.') + f'{date.microsecond // 1000:03d}' + 'Z'
+
+
+def post_cards(count, stringify):
+    convert = legacy_to_iso8601 if stringify else (lambda value: value)
+    return {
+        'posts': [
+            OrderedDict([('id', i),
+                         ('type', random.choice(['Sports', 'Music', 'Food', 'Travel'])),
+                         ('title', f'Weekend meetup #{i} at the café'),
+                         ('event_start_date', convert(BASE + timedelta(days=i))),
+                         ('event_end_date', convert(BASE + timedelta(days=i, hours=3))),
+                         ('number_of_people_required', random.randint(1, 10)),
+                         ('likes', random.randint(0, 500)),
+                         ('liked', random.random() < 0.3),
+                         ('bookmarks', random.randint(0, 100)),
+                         ('bookmarked', random.random() < 0.1),
+                         ('comments', random.randint(0, 50)),
+                         ('applicants', random.randint(0, 30))])
+            for i in range(count)
+        ],
+        'page': 1,
+        'pages': 50,
+        'per_page': count,
+    }
+
+
+def chat_messages(count, stringify):
+    convert = legacy_to_iso8601 if stringify else (lambda value: value)
+    return [
+        {
+            'id': i,
+            'sender_id': i % 7,
+            'sender_name': f'user{i % 7}',
+            'content': 'See you there! 見てね ' * random.randint(1, 4),
+            'created_at': convert(BASE + timedelta(seconds=i)),
+            'read_users': list(range(i % 5)),
+        }
+        for i in range(count)
+    ]
+
+
+def chat_page(count, stringify):
+    return {'messages': chat_messages(count, stringify), 'has_more': True, 'oldest_id': 1}
+
+
+def json_values(data):
+    if isinstance(data, dict):
+        for value in data.values():
+            yield from json_values(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from json_values(value)
+    else:
+        yield data
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--large', type=int, default=10000, help='Messages in the large array case')
+    args = parser.parse_args()
+    random.seed(0)
+
+    backends = [StdlibBackend()] + ([OrjsonBackend()] if orjson else [])
+    cases = {
+        'list_post_20': (lambda s: post_cards(20, s)),
+        'chat_messages_100': (lambda s: chat_page(100, s)),
+    }
+
+    results = {}
+    for name, build in cases.items():
+        random.seed(0)
+        stringified = build(True)
+        random.seed(0)
+        native = build(False)
+        datetimes = [value for value in json_values(native) if isinstance(value, datetime)]
+        # The previous path paid for to_iso8601 while building the payload, count it in the baseline
+        stringify = timed(lambda: [legacy_to_iso8601(value) for value in datetimes], args.repeat)
+        encode = timed(lambda: json.dumps(stringified, ensure_ascii=False), args.repeat)
+        result = {
+            'baseline_us': round((stringify + encode) * 1e6, 1),
+            'baseline_to_iso8601_us': round(stringify * 1e6, 1),
+        }
+        for backend in backends:
+            result[f'{backend.name}_encode_us'] = round(timed(lambda: backend.dumps(native), args.repeat) * 1e6, 1)
+        if 'messages' in native:
+            # ChatMessages sends its page through stream_response
+            envelope = {key: value for key, value in native.items() if key != 'messages'}
+            result['stream_us'] = round(timed(lambda: b''.join(iter_json_array(envelope, 'messages', native['messages'])),
+                                              args.repeat) * 1e6, 1)
+        results[name] = result
+
+    large = chat_messages(args.large, False)
+    large_repeat = max(1, args.repeat // 20)
+    large_result = {'items': args.large}
+    for backend in backends:
+        large_result[f'{backend.name}_whole_ms'] = round(
+            timed(lambda: backend.dumps({'messages': large}), large_repeat) * 1e3, 2)
+    chunks = list(iter_json_array({'has_more': False}, 'messages', large))
+    large_result['stream_ms'] = round(
+        timed(lambda: sum(len(chunk) for chunk in iter_json_array({'has_more': False}, 'messages', large)),
+              large_repeat) * 1e3, 2)
+    large_result['stream_chunks'] = len(chunks)
+    large_result['stream_max_chunk_kb'] = round(max(len(chunk) for chunk in chunks) / 1024, 1)
+    large_result['whole_kb'] = round(sum(len(chunk) for chunk in chunks) / 1024, 1)
+    results['chat_messages_large'] = large_result
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Concurrency check for applicant approval: many greenlets race for the last seat of a post.
+
+Creates a host, a post with --seats seats and --applicants applicants through the HTTP API,
+then approves every applicant at once. Exactly --seats approvals must succeed, the rest
+must get 409, and the post must end with zero seats left.
+
+With --bulk N, N /applicant/review_bulk requests approving every applicant (each in its own
+shuffled order) race the single approvals. Approvals across both endpoints must still add
+up to --seats, with no server errors (a lock order deadlock surfaces as a 500).
+
+    python bench/last_seat.py --base-url http://localhost:5000 --applicants 50
+    python bench/last_seat.py --applicants 50 --seats 5 --bulk 5
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import sys
+import json
+import time
+import random
+import uuid
+import argparse
+from collections import Counter
+
+from common import post_json_body
+
+
+def create_user(base_url, tag):
+    email = f"seat-{tag}-{uuid.uuid4().hex[:8]}@bench.local"
+    _, body = post_json_body(base_url, '/auth/register', {'email': email, 'password': 'Bench1234'})
+    user_id, token = body['user_id'], body['access_token']
+    post_json_body(base_url, f'/profile/update/{user_id}', {
+        'phone': '0000000000',
+        'nickname': f'seat-{tag}',
+        'dob': '2000-01-01T00:00:00.000Z',
+        'gender': 3,
+    }, token=token)
+    return user_id, token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--applicants', type=int, default=50)
+    parser.add_argument('--seats', type=int, default=1)
+    parser.add_argument('--bulk', type=int, default=0, help='Bulk reviews racing the single approvals')
+    args = parser.parse_args()
+
+    host_id, host_token = create_user(args.base_url, 'host')
+    _, body = post_json_body(args.base_url, '/post/create', {
+        'user_id': host_id,
+        'type': 'Bench',
+        'title': 'Last seat',
+        'content': 'Concurrency check',
+        'event_start_date': '2999-01-01T00:00:00.000Z',
+        'event_end_date': '2999-01-02T00:00:00.000Z',
+        'number_of_people_required': args.seats,
+        'location': 'Nowhere',
+    }, token=host_token)
+    post_id = body['post_id']
+
+    applicants = [create_user(args.base_url, i) for i in range(args.applicants)]
+    for user_id, token in applicants:
+        post_json_body(args.base_url, '/applicant/create', {'user_id': user_id, 'post_id': post_id}, token=token)
+    applicant_ids = [user_id for user_id, _ in applicants]
+
+    def approve(user_id):
+        status, _ = post_json_body(args.base_url, '/applicant/review', {
+            'user_id': user_id,
+            'post_id': post_id,
+            'approve': True,
+        }, token=host_token)
+        return '', status, 1 if status == 200 else 0
+
+    def approve_bulk(seed):
+        user_ids = list(applicant_ids)
+        random.Random(seed).shuffle(user_ids)
+        status, body = post_json_body(args.base_url, '/applicant/review_bulk', {
+            'post_id': post_id,
+            'reviews': [{'user_id': user_id, 'approve': True} for user_id in user_ids],
+        }, token=host_token)
+        return 'bulk_', status, body.get('approved', 0) if status == 200 else 0
+
+    tasks = [(approve, user_id) for user_id in applicant_ids] + [(approve_bulk, seed) for seed in range(args.bulk)]
+    random.Random(0).shuffle(tasks)
+    pool = eventlet.GreenPool(len(tasks))
+    start = time.perf_counter()
+    outcomes = list(pool.imap(lambda task: task[0](task[1]), tasks))
+    elapsed = time.perf_counter() - start
+    statuses = Counter(f'{kind}{status}' for kind, status, _ in outcomes)
+    approved = sum(count for _, _, count in outcomes)
+    errors = sum(1 for _, status, _ in outcomes if status >= 500)
+
+    _, post = post_json_body(args.base_url, '/post/view', {'user_id': host_id, 'post_id': post_id},
+                             token=host_token)
+    result = {
+        'post_id': post_id,
+        'applicants': args.applicants,
+        'seats': args.seats,
+        'bulk': args.bulk,
+        'statuses': dict(sorted(statuses.items())),
+        'approved': approved,
+        'seats_left': post['number_of_people_required'],
+        'elapsed_s': round(elapsed, 3),
+        'ok': approved == args.seats and not errors and post['number_of_people_required'] == 0
+              and (args.bulk or statuses['409'] == args.applicants - args.seats),
+    }
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    sys.exit(0 if result['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
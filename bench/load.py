@@ -0,0 +1,696 @@
+"""
+End-to-end load benchmark: a seeded dataset, mixed HTTP traffic over all eight blueprints and
+concurrent Socket.IO chat clients, reported as per-endpoint latency percentiles and throughput.
+
+The dataset (users with profiles, posts with chat rooms, applicants, likes, bookmarks, comments
+and chat messages) is inserted straight into DATABASE_URL and tagged with --tag, so later runs
+reuse it instead of seeding again (--reseed drops and recreates it). Access tokens are signed
+in-process with the app's SECRET_KEY. With --start-server the app is started under gunicorn
+against the same database, the way it runs in production.
+
+    DATABASE_URL=postgresql://localhost/sparkup_bench python bench/load.py --start-server \\
+        --users 500 --duration 60 --output load-$(git rev-parse --short HEAD).json
+
+Two reports can then be compared, e.g. in CI. The exit status is 1 when any endpoint's p95
+regressed by more than --tolerance (and --min-delta-ms), or its error rate went up:
+
+    python bench/load.py --compare load-base.json load-head.json --tolerance 0.25
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import platform
+import threading
+import subprocess
+from datetime import datetime, timedelta, timezone
+from collections import Counter, defaultdict
+
+import socketio
+
+from common import ROOT, request_json, summarize, bench_app, mint_tokens
+
+PASSWORD = 'Bench1234'
+TYPES = ['Sports', 'Music', 'Food', 'Travel', 'Study', 'Games', 'Outdoors', 'Art']
+SKILLS = ['Python', 'Guitar', 'Cooking', 'Photography', 'Driving', 'Hiking', 'Design', 'Swimming']
+PERSONALITIES = ['Calm', 'Outgoing', 'Curious', 'Organised', 'Funny', 'Patient']
+LANGUAGES = ['English', 'Mandarin', 'Taiwanese', 'Japanese', 'Korean', 'Spanish']
+CITIES = ['Taipei', 'Tainan', 'Taichung', 'Kaohsiung', 'Hsinchu', 'Hualien']
+CHUNK = 1000
+
+
+# Seeding
+
+def email_for(tag, index):
+    return f"{tag}-{index}@bench.local"
+
+
+def insert_rows(model, rows, returning=None):
+    """Multi-row INSERTs of CHUNK rows; returns the `returning` column in row order."""
+    from sqlalchemy import insert
+    from app.extensions import db
+
+    values = []
+    for start in range(0, len(rows), CHUNK):
+        chunk = rows[start:start + CHUNK]
+        if returning is None:
+            db.session.execute(insert(model), chunk)
+        else:
+            stmt = insert(model).returning(returning, sort_by_parameter_order=True)
+            values.extend(db.session.execute(stmt, chunk).scalars())
+    return values
+
+
+def enum_choice(rng, enum):
+    return rng.choice(list(enum))
+
+
+def profile_row(rng, user_id, index):
+    from app.models import (EducationLevelEnum, MBTIEnum, ConstellationEnum, BloodTypeEnum, ReligionEnum,
+                            SexualityEnum, EthnicityEnum, DietEnum)
+    return {
+        'id': user_id,
+        'phone': f'09{rng.randrange(10 ** 8):08d}',
+        'nickname': f'bench{index}',
+        'dob': datetime(1970, 1, 1) + timedelta(days=rng.randrange(9000, 16000)),
+        'gender': rng.randrange(4),
+        'bio': 'Here for the load test',
+        'current_location': rng.choice(CITIES),
+        'hometown': rng.choice(CITIES),
+        'college': 'NTU',
+        'job_title': 'Engineer',
+        'education_level': enum_choice(rng, EducationLevelEnum),
+        'mbti': enum_choice(rng, MBTIEnum),
+        'constellation': enum_choice(rng, ConstellationEnum),
+        'blood_type': enum_choice(rng, BloodTypeEnum),
+        'religion': enum_choice(rng, ReligionEnum),
+        'sexuality': enum_choice(rng, SexualityEnum),
+        'ethnicity': enum_choice(rng, EthnicityEnum),
+        'diet': enum_choice(rng, DietEnum),
+        'smoke': rng.randrange(4),
+        'drinking': rng.randrange(4),
+        'marijuana': rng.randrange(4),
+        'drugs': rng.randrange(4),
+        'skills': rng.sample(SKILLS, rng.randrange(4)),
+        'personalities': rng.sample(PERSONALITIES, rng.randrange(3)),
+        'languages': rng.sample(LANGUAGES, 1 + rng.randrange(2)),
+        'interest_types': rng.sample(TYPES, rng.randrange(4)),
+    }
+
+
+def seed(args):
+    """Insert the --tag dataset unless it already exists. Returns True when rows were written."""
+    from sqlalchemy import select, delete
+    from app.extensions import db
+    from app.models import (User, Profile, Post, PostLike, PostBookmark, PostApplicant, PostComment,
+                            PostCommentLike, ChatRoom, ChatRoomUser, Message)
+    from app.passwords import hash_password
+    from app.stats import reconcile_user_stats
+
+    app = bench_app()
+    with app.app_context():
+        db.create_all()
+        pattern = email_for(args.tag, '%')
+        if args.reseed:
+            # Everything else hangs off users with ON DELETE CASCADE
+            db.session.execute(delete(User).where(User.email.like(pattern)))
+            db.session.commit()
+        elif db.session.execute(select(User.id).where(User.email.like(pattern)).limit(1)).first():
+            return False
+
+        rng = random.Random(args.seed)
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        password = hash_password(PASSWORD)
+
+        user_ids = insert_rows(User, [
+            {'email': email_for(args.tag, i), 'password': password, 'active': True,
+             'fs_uniquifier': str(uuid.UUID(int=rng.getrandbits(128)))}
+            for i in range(args.users)
+        ], returning=User.id)
+        insert_rows(Profile, [profile_row(rng, user_id, i) for i, user_id in enumerate(user_ids)])
+
+        posts = []
+        for i in range(args.posts):
+            start = now + timedelta(days=rng.randrange(-30, 60), hours=rng.randrange(24))
+            end = start + timedelta(hours=rng.randrange(1, 6))
+            posts.append({
+                'type': rng.choice(TYPES),
+                'user_id': rng.choice(user_ids),
+                'title': f'{rng.choice(TYPES)} meetup #{i}',
+                'content': 'Join us! ' * rng.randrange(1, 20),
+                'event_start_date': start,
+                'event_end_date': end,
+                'number_of_people_required': rng.randrange(2, 12),
+                'location': rng.choice(CITIES),
+                # Past lifecycle hooks count as done, so the scheduler doesn't replay a month of them
+                'started': start < now,
+                'ended': end < now,
+                'skills': rng.sample(SKILLS, rng.randrange(3)),
+                'personalities': rng.sample(PERSONALITIES, rng.randrange(2)),
+                'languages': rng.sample(LANGUAGES, rng.randrange(2)),
+                'attributes': {},
+            })
+        post_ids = insert_rows(Post, posts, returning=Post.id)
+        insert_rows(ChatRoom, [{'post_id': post_id, 'name': post['title']} for post_id, post in zip(post_ids, posts)])
+
+        members, applicants, likes, bookmarks, comments = [], [], [], [], []
+        room_members = {}
+        for post_id, post in zip(post_ids, posts):
+            host_id = post['user_id']
+            room = [host_id]
+            for user_id in rng.sample(user_ids, min(len(user_ids), rng.randrange(12))):
+                if user_id == host_id:
+                    continue
+                status = rng.choices([0, 1, 2], weights=[5, 1, 4])[0]
+                applicants.append({'user_id': user_id, 'post_id': post_id, 'review_status': status, 'attributes': {}})
+                if status == 2:
+                    room.append(user_id)
+            room_members[post_id] = room
+            members.extend({'post_id': post_id, 'user_id': user_id} for user_id in room)
+            likes.extend({'user_id': user_id, 'post_id': post_id}
+                         for user_id in rng.sample(user_ids, min(len(user_ids), int(rng.expovariate(1 / 8)))))
+            bookmarks.extend({'user_id': user_id, 'post_id': post_id}
+                             for user_id in rng.sample(user_ids, min(len(user_ids), int(rng.expovariate(1 / 3)))))
+            for floor in range(1, rng.randrange(args.max_comments + 1) + 1):
+                created = now - timedelta(minutes=rng.randrange(60 * 24 * 30))
+                comments.append({'user_id': rng.choice(user_ids), 'post_id': post_id, 'floor': floor,
+                                  'content': 'Count me in!', 'deleted': False,
+                                  'comment_created_date': created, 'comment_last_updated_date': created})
+
+        insert_rows(ChatRoomUser, members)
+        insert_rows(PostApplicant, applicants)
+        insert_rows(PostLike, likes)
+        insert_rows(PostBookmark, bookmarks)
+        comment_ids = insert_rows(PostComment, comments, returning=PostComment.id)
+        insert_rows(PostCommentLike, [
+            {'user_id': user_id, 'comment_id': comment_id}
+            for comment_id in comment_ids
+            for user_id in rng.sample(user_ids, min(len(user_ids), int(rng.expovariate(1 / 2))))
+        ])
+
+        messages = []
+        for post_id, room in room_members.items():
+            created = now - timedelta(days=7)
+            for _ in range(args.messages_per_room):
+                created += timedelta(seconds=rng.randrange(1, 600))
+                sender_id = rng.choice(room)
+                messages.append({'post_id': post_id, 'sender_id': sender_id, 'created_at': created,
+                                 'content': 'See you there! ' * rng.randrange(1, 4),
+                                 'read_users': sorted({sender_id, *rng.sample(room, rng.randrange(len(room) + 1))})})
+            if len(messages) >= CHUNK * 10:
+                insert_rows(Message, messages)
+                messages = []
+        insert_rows(Message, messages)
+
+        reconcile_user_stats()
+        db.session.commit()
+    return True
+
+
+class Dataset:
+    """Ids of the seeded rows the traffic mix picks from, with an access token per user."""
+
+    def __init__(self, users, tokens, posts, rooms, comments):
+        self.users = users  # [(user_id, email)]
+        self.tokens = tokens  # user_id -> token
+        self.posts = posts  # [(post_id, host_id)]
+        self.rooms = rooms  # post_id -> [member user_id]
+        self.comments = comments  # [(comment_id, post_id)]
+        self.rooms_of = defaultdict(list)
+        for post_id, user_ids in rooms.items():
+            for user_id in user_ids:
+                self.rooms_of[user_id].append(post_id)
+
+    def counts(self):
+        return {'users': len(self.users), 'posts': len(self.posts), 'rooms': len(self.rooms),
+                'comments': len(self.comments)}
+
+
+def load_dataset(args):
+    from sqlalchemy import select
+    from app.extensions import db
+    from app.models import User, Post, PostComment, ChatRoomUser
+
+    app = bench_app()
+    with app.app_context():
+        users = db.session.execute(
+            select(User.id, User.email).where(User.email.like(email_for(args.tag, '%'))).order_by(User.id)
+        ).all()
+        user_ids = [user_id for user_id, _ in users]
+        posts = db.session.execute(
+            select(Post.id, Post.user_id).where(Post.user_id.in_(user_ids)).order_by(Post.id)
+        ).all()
+        post_ids = [post_id for post_id, _ in posts]
+        rooms = defaultdict(list)
+        for post_id, user_id in db.session.execute(
+                select(ChatRoomUser.post_id, ChatRoomUser.user_id).where(ChatRoomUser.post_id.in_(post_ids))):
+            rooms[post_id].append(user_id)
+        comments = db.session.execute(
+            select(PostComment.id, PostComment.post_id).where(PostComment.post_id.in_(post_ids))
+        ).all()
+
+    # Tokens must outlive the run, warmup included
+    tokens = mint_tokens(user_ids, ttl=max(3600, int(args.warmup + args.duration) + 600))
+    return Dataset([tuple(user) for user in users], tokens, [tuple(post) for post in posts], dict(rooms),
+                   [tuple(comment) for comment in comments])
+
+
+# Traffic
+
+def op_login(rng, data):
+    _, email = rng.choice(data.users)
+    return 'POST /auth/login', 'POST', '/auth/login', {'email': email, 'password': PASSWORD}, None
+
+
+def op_profile_view(rng, data, user_id):
+    other, _ = rng.choice(data.users)
+    return 'GET /profile/view/<user_id>', 'GET', f'/profile/view/{other}', None, data.tokens[user_id]
+
+
+def op_profile_update(rng, data, user_id):
+    return 'POST /profile/update/<user_id>', 'POST', f'/profile/update/{user_id}', {
+        'phone': '0912345678', 'nickname': f'bench-{user_id}', 'dob': '1995-05-05T00:00:00.000Z',
+        'gender': rng.randrange(4), 'bio': f'Updated {rng.randrange(10 ** 6)}',
+        'skills': rng.sample(SKILLS, 2), 'languages': ['English'],
+    }, data.tokens[user_id]
+
+
+def op_post_list(rng, data, user_id):
+    payload = {'page': rng.randrange(1, 6), 'per_page': 20}
+    roll = rng.random()
+    if roll < 0.2:
+        payload['type'] = rng.sample(TYPES, 2)
+    elif roll < 0.3:
+        payload['skills'] = [rng.choice(SKILLS)]
+    elif roll < 0.35:
+        payload['keyword'] = 'meetup #1'
+    return 'POST /post/list/<user_id>', 'POST', f'/post/list/{user_id}', payload, data.tokens[user_id]
+
+
+def op_post_view(rng, data, user_id):
+    post_id, _ = rng.choice(data.posts)
+    return 'POST /post/view', 'POST', '/post/view', {'post_id': post_id, 'user_id': user_id}, data.tokens[user_id]
+
+
+def op_post_like(rng, data, user_id):
+    post_id, _ = rng.choice(data.posts)
+    return 'POST /post/like', 'POST', '/post/like', {
+        'post_id': post_id, 'user_id': user_id, 'retrieve': rng.random() < 0.5}, data.tokens[user_id]
+
+
+def op_post_bookmark(rng, data, user_id):
+    post_id, _ = rng.choice(data.posts)
+    return 'POST /post/bookmark', 'POST', '/post/bookmark', {
+        'post_id': post_id, 'user_id': user_id, 'retrieve': rng.random() < 0.5}, data.tokens[user_id]
+
+
+def op_post_create(rng, data, user_id):
+    start = datetime.now(timezone.utc) + timedelta(days=rng.randrange(1, 60))
+    return 'POST /post/create', 'POST', '/post/create', {
+        'user_id': user_id, 'type': rng.choice(TYPES), 'title': 'Load test meetup', 'content': 'Join us!',
+        'event_start_date': start.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'event_end_date': (start + timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'number_of_people_required': rng.randrange(2, 12), 'location': rng.choice(CITIES),
+    }, data.tokens[user_id]
+
+
+def op_post_update(rng, data, user_id):
+    post_id, host_id = rng.choice(data.posts)
+    return 'POST /post/update/<post_id>', 'POST', f'/post/update/{post_id}', {
+        'user_id': host_id, 'content': f'Updated {rng.randrange(10 ** 6)}'}, data.tokens[host_id]
+
+
+def op_comment_list(rng, data, user_id):
+    post_id, _ = rng.choice(data.posts)
+    return 'POST /comment/list', 'POST', '/comment/list', {'post_id': post_id, 'user_id': user_id}, data.tokens[user_id]
+
+
+def op_comment_create(rng, data, user_id):
+    post_id, _ = rng.choice(data.posts)
+    return 'POST /comment/create', 'POST', '/comment/create', {
+        'post_id': post_id, 'user_id': user_id, 'content': 'Sounds fun'}, data.tokens[user_id]
+
+
+def op_comment_like(rng, data, user_id):
+    comment_id, _ = rng.choice(data.comments)
+    return 'POST /comment/like', 'POST', '/comment/like', {
+        'comment_id': comment_id, 'user_id': user_id, 'retrieve': rng.random() < 0.5}, data.tokens[user_id]
+
+
+def op_applicant_list(rng, data, user_id):
+    _, host_id = rng.choice(data.posts)
+    query = '?summary=true' if rng.random() < 0.5 else ''
+    return 'GET /applicant/list/<user_id>', 'GET', f'/applicant/list/{host_id}{query}', None, data.tokens[host_id]
+
+
+def op_applicant_create(rng, data, user_id):
+    post_id, _ = rng.choice(data.posts)
+    return 'POST /applicant/create', 'POST', '/applicant/create', {
+        'post_id': post_id, 'user_id': user_id}, data.tokens[user_id]
+
+
+def op_user_view(rng, data, user_id):
+    other, _ = rng.choice(data.users)
+    return 'GET /user/view/<user_id>', 'GET', f'/user/view/{other}', None, data.tokens[user_id]
+
+
+def op_user_list(kind):
+    def op(rng, data, user_id):
+        return (f'POST /user/{kind}/<user_id>', 'POST', f'/user/{kind}/{user_id}', {'page': 1, 'per_page': 20},
+                data.tokens[user_id])
+    return op
+
+
+def op_reference_referenceable(rng, data, user_id):
+    return ('POST /reference/list_referenceable/<user_id>', 'POST', f'/reference/list_referenceable/{user_id}', {},
+            data.tokens[user_id])
+
+
+def op_reference_pending(rng, data, user_id):
+    return ('GET /reference/pending_count/<user_id>', 'GET', f'/reference/pending_count/{user_id}', None,
+            data.tokens[user_id])
+
+
+def op_reference_list(rng, data, user_id):
+    other, _ = rng.choice(data.users)
+    return 'POST /reference/list/<user_id>', 'POST', f'/reference/list/{other}', {}, data.tokens[user_id]
+
+
+def op_chat_rooms(rng, data, user_id):
+    return 'POST /chat/rooms/<user_id>', 'POST', f'/chat/rooms/{user_id}', {'page': 1, 'per_page': 20}, \
+        data.tokens[user_id]
+
+
+def op_chat_messages(rng, data, user_id):
+    rooms = data.rooms_of.get(user_id)
+    if not rooms:
+        return op_chat_rooms(rng, data, user_id)
+    return 'POST /chat/messages', 'POST', '/chat/messages', {
+        'post_id': rng.choice(rooms), 'user_id': user_id, 'limit': 50}, data.tokens[user_id]
+
+
+def op_chat_room_users(rng, data, user_id):
+    post_id, _ = rng.choice(data.posts)
+    return 'GET /chat/room_users/<post_id>', 'GET', f'/chat/room_users/{post_id}', None, data.tokens[user_id]
+
+
+# (weight, op): reads dominate, as they do in the app's traffic
+MIX = [
+    (1, op_login),
+    (8, op_profile_view),
+    (1, op_profile_update),
+    (12, op_post_list),
+    (10, op_post_view),
+    (4, op_post_like),
+    (2, op_post_bookmark),
+    (0.5, op_post_create),
+    (0.5, op_post_update),
+    (6, op_comment_list),
+    (2, op_comment_create),
+    (2, op_comment_like),
+    (2, op_applicant_list),
+    (1, op_applicant_create),
+    (4, op_user_view),
+    (2, op_user_list('bookmarks')),
+    (2, op_user_list('applied')),
+    (2, op_user_list('participation')),
+    (3, op_user_list('notifications')),
+    (1, op_reference_referenceable),
+    (2, op_reference_pending),
+    (1, op_reference_list),
+    (6, op_chat_rooms),
+    (6, op_chat_messages),
+    (2, op_chat_room_users),
+]
+
+
+class Recorder:
+    """Latencies and statuses per endpoint label, merged from every client."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def merge(self, latencies, statuses):
+        with self.lock:
+            for label, samples in latencies.items():
+                self.latencies[label].extend(samples)
+            for label, counts in statuses.items():
+                self.statuses[label].update(counts)
+
+
+def http_client(index, args, data, recorder, record_from, deadline):
+    rng = random.Random(args.seed * 1000 + index)
+    weights = [weight for weight, _ in MIX]
+    ops = [op for _, op in MIX]
+    latencies, statuses = defaultdict(list), defaultdict(Counter)
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        op = rng.choices(ops, weights)[0]
+        user_id, _ = rng.choice(data.users)
+        label, method, path, payload, token = op(rng, data) if op is op_login else op(rng, data, user_id)
+        try:
+            status, _, elapsed = request_json(args.base_url, path, payload, method=method, token=token)
+        except OSError:
+            status, elapsed = 'error', time.perf_counter() - now
+        if now >= record_from:
+            latencies[label].append(elapsed)
+            statuses[label][status] += 1
+    recorder.merge(latencies, statuses)
+
+
+class ChatClient:
+    """A room member sending messages and timing the echo of its own ones."""
+
+    def __init__(self, base_url, user_id, token, post_id):
+        self.user_id = user_id
+        self.post_id = post_id
+        self.pending = {}
+        self.latencies = []
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.sio = socketio.Client()
+        self.sio.on('new_message', self.on_message)
+        self.sio.on('error', self.on_error)
+        self.sio.connect(base_url, auth={'token': token}, transports=['websocket'])
+
+    def on_message(self, data):
+        received = time.perf_counter()
+        with self.lock:
+            self.received += 1
+            sent = self.pending.pop(data.get('content'), None)
+            if sent is not None and sent[1]:
+                self.latencies.append(received - sent[0])
+
+    def on_error(self, data):
+        with self.lock:
+            self.errors += 1
+
+    def run(self, rng, interval, record_from, deadline):
+        sequence = 0
+        while time.perf_counter() < deadline:
+            content = f"load-{self.user_id}-{time.time_ns()}-{sequence}"
+            now = time.perf_counter()
+            with self.lock:
+                self.pending[content] = (now, now >= record_from)
+                if now >= record_from:
+                    self.sent += 1
+            self.sio.emit('send_message', {'post_id': self.post_id, 'sender_id': self.user_id, 'content': content})
+            sequence += 1
+            # Jitter keeps the clients from sending in lockstep
+            time.sleep(interval * rng.uniform(0.5, 1.5))
+
+    def close(self):
+        self.sio.disconnect()
+
+
+def start_chat_clients(args, data):
+    members = [(user_id, post_id) for post_id, user_ids in data.rooms.items() if len(user_ids) > 1
+               for user_id in user_ids]
+    rng = random.Random(args.seed)
+    picked = rng.sample(members, min(args.chat_clients, len(members)))
+    return [ChatClient(args.base_url, user_id, data.tokens[user_id], post_id) for user_id, post_id in picked]
+
+
+def chat_report(clients, elapsed):
+    latencies = [latency for client in clients for latency in client.latencies]
+    result = summarize(latencies, elapsed)
+    result['clients'] = len(clients)
+    result['sent'] = sum(client.sent for client in clients)
+    result['lost'] = sum(len(client.pending) for client in clients)
+    result['received'] = sum(client.received for client in clients)
+    result['errors'] = sum(client.errors for client in clients)
+    return result
+
+
+def endpoint_report(recorder, elapsed):
+    endpoints = {}
+    for label in sorted(recorder.latencies):
+        statuses = recorder.statuses[label]
+        result = summarize(recorder.latencies[label], elapsed)
+        result['errors'] = sum(count for status, count in statuses.items()
+                               if status == 'error' or status >= 500)
+        result['statuses'] = {str(status): count for status, count in sorted(statuses.items(), key=str)}
+        endpoints[label] = result
+    return endpoints
+
+
+def run_load(args, data):
+    recorder = Recorder()
+    chat_clients = start_chat_clients(args, data) if args.chat_clients else []
+    start = time.perf_counter()
+    record_from = start + args.warmup
+    deadline = record_from + args.duration
+
+    threads = [threading.Thread(target=http_client, args=(i, args, data, recorder, record_from, deadline))
+               for i in range(args.http_clients)]
+    threads += [threading.Thread(target=client.run,
+                                 args=(random.Random(args.seed + i), args.chat_interval, record_from, deadline))
+                for i, client in enumerate(chat_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Let the last echoes arrive before counting losses
+    time.sleep(2)
+    for client in chat_clients:
+        client.close()
+
+    endpoints = endpoint_report(recorder, args.duration)
+    total = summarize([latency for samples in recorder.latencies.values() for latency in samples], args.duration)
+    total['errors'] = sum(result['errors'] for result in endpoints.values())
+    return {'total': total, 'endpoints': endpoints, 'socket': chat_report(chat_clients, args.duration)}
+
+
+# Server and report
+
+def start_server(args):
+    env = dict(os.environ, LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING'))
+    host, _, port = args.base_url.rpartition('//')[2].partition(':')
+    log = open(args.server_log, 'a') if args.server_log else subprocess.DEVNULL
+    server = subprocess.Popen(['gunicorn', '-k', 'eventlet', '-w', '1', '-b', f'{host}:{port or 80}', 'run:app'],
+                              cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'Server exited with status {server.returncode}')
+        try:
+            request_json(args.base_url, '/health', method='GET', timeout=2)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('Server did not come up within 30s')
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(base_path, head_path, tolerance, min_delta_ms):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+
+    rows, regressions = {}, []
+    for label, new in sorted(head['endpoints'].items()):
+        old = base['endpoints'].get(label)
+        if old is None:
+            continue
+        delta = new['p95_ms'] - old['p95_ms']
+        old_error_rate = old['errors'] / old['requests'] if old['requests'] else 0.0
+        new_error_rate = new['errors'] / new['requests'] if new['requests'] else 0.0
+        row = {
+            'p95_ms': [old['p95_ms'], new['p95_ms']],
+            'p99_ms': [old['p99_ms'], new['p99_ms']],
+            'throughput': [old['throughput'], new['throughput']],
+            'p95_change': round(delta / old['p95_ms'], 3) if old['p95_ms'] else 0.0,
+        }
+        if (delta > min_delta_ms and new['p95_ms'] > old['p95_ms'] * (1 + tolerance)) \
+                or new_error_rate > old_error_rate + 0.01:
+            row['regressed'] = True
+            regressions.append(label)
+        rows[label] = row
+
+    json.dump({'base': base['meta'].get('commit'), 'head': head['meta'].get('commit'),
+               'endpoints': rows, 'regressions': regressions}, sys.stdout, indent=2)
+    print()
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--start-server', action='store_true', help='Run gunicorn -k eventlet on --base-url')
+    parser.add_argument('--server-log', help='Append the started server output to this file')
+    parser.add_argument('--tag', default='load', help='Dataset name, seeded users are <tag>-<n>@bench.local')
+    parser.add_argument('--reseed', action='store_true', help='Drop and recreate the --tag dataset')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the dataset and the traffic mix')
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--posts', type=int, default=250)
+    parser.add_argument('--max-comments', type=int, default=10, help='Comments per post, at most')
+    parser.add_argument('--messages-per-room', type=int, default=50)
+    parser.add_argument('--http-clients', type=int, default=16)
+    parser.add_argument('--chat-clients', type=int, default=32)
+    parser.add_argument('--chat-interval', type=float, default=1.0, help='Seconds between messages per chat client')
+    parser.add_argument('--warmup', type=float, default=5.0, help='Seconds of traffic before recording')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of recorded traffic')
+    parser.add_argument('--output', help='Write the JSON report here as well as to stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help='Compare two reports and exit')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 increase, as a fraction')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help='Ignore p95 increases smaller than this')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.tolerance, args.min_delta_ms))
+
+    started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    seed_start = time.perf_counter()
+    seeded = seed(args)
+    seed_seconds = time.perf_counter() - seed_start
+    data = load_dataset(args)
+
+    server = start_server(args) if args.start_server else None
+    try:
+        results = run_load(args, data)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': started_at,
+            'python': platform.python_version(),
+            'dataset': dict(data.counts(), tag=args.tag, seeded=seeded, seed_s=round(seed_seconds, 2)),
+            'http_clients': args.http_clients,
+            'chat_clients': args.chat_clients,
+            'warmup_s': args.warmup,
+            'duration_s': args.duration,
+            'seed': args.seed,
+        },
+        **results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Chat latency while the server is busy hashing passwords.
+
+One socket client, logged in as --email and a member of chat room --post-id, sends a message every --interval
+seconds and times the round trip until its own new_message echo arrives. The first phase
+measures an idle server; in the second, --logins threads hammer /auth/login with valid
+credentials, each one a bcrypt verification. With hashing offloaded (PASSWORD_POOL_ENABLED)
+the chat percentiles should stay flat across both phases; run the server once with
+PASSWORD_POOL_ENABLED=false to see the hub stall for comparison.
+
+    python bench/login_burst.py --base-url http://localhost:5000 --post-id 1 \
+        --email bench@bench.local --password Bench1234 --logins 16
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+
+import socketio
+
+from common import post_json, summarize, login
+
+
+class ChatProbe:
+    def __init__(self, base_url, post_id, sender_id, token):
+        self.post_id = post_id
+        self.sender_id = sender_id
+        self.sio = socketio.Client()
+        self.pending = {}
+        self.latencies = []
+        self.lock = threading.Lock()
+        self.sio.on('new_message', self.on_message)
+        self.sio.connect(f"{base_url}?user_id={sender_id}", auth={'token': token}, transports=['websocket'])
+
+    def on_message(self, data):
+        received = time.perf_counter()
+        with self.lock:
+            sent = self.pending.pop(data.get('content'), None)
+            if sent is not None:
+                self.latencies.append(received - sent)
+
+    def run(self, duration, interval):
+        with self.lock:
+            self.latencies = []
+        deadline = time.perf_counter() + duration
+        sequence = 0
+        while time.perf_counter() < deadline:
+            content = f"probe-{self.sender_id}-{time.time_ns()}-{sequence}"
+            with self.lock:
+                self.pending[content] = time.perf_counter()
+            self.sio.emit('send_message', {
+                'post_id': self.post_id,
+                'sender_id': self.sender_id,
+                'content': content,
+            })
+            sequence += 1
+            time.sleep(interval)
+        # Give the last messages a moment to come back
+        time.sleep(min(2.0, interval * 10))
+        with self.lock:
+            lost = len(self.pending)
+            self.pending.clear()
+            return list(self.latencies), sequence, lost
+
+    def close(self):
+        self.sio.disconnect()
+
+
+def login_worker(base_url, email, password, stop, latencies, statuses, lock):
+    local_latencies = []
+    local_statuses = Counter()
+    while not stop.is_set():
+        status, elapsed = post_json(base_url, '/auth/login', {'email': email, 'password': password})
+        local_latencies.append(elapsed)
+        local_statuses[status] += 1
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def measure(probe, args):
+    latencies, sent, lost = probe.run(args.duration, args.interval)
+    result = summarize(latencies, args.duration)
+    result['sent'] = sent
+    result['lost'] = lost
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--post-id', type=int, required=True, help='Chat room the sender belongs to')
+    parser.add_argument('--email', required=True, help='Existing account, the chat sender and the login burst target')
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--logins', type=int, default=16, help='Concurrent login clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per phase')
+    parser.add_argument('--interval', type=float, default=0.05, help='Seconds between chat probes')
+    args = parser.parse_args()
+
+    sender_id, token = login(args.base_url, args.email, args.password)
+    probe = ChatProbe(args.base_url, args.post_id, sender_id, token)
+    try:
+        idle = measure(probe, args)
+
+        stop, lock = threading.Event(), threading.Lock()
+        login_latencies, login_statuses = [], Counter()
+        threads = [
+            threading.Thread(target=login_worker, args=(args.base_url, args.email, args.password,
+                                                        stop, login_latencies, login_statuses, lock))
+            for _ in range(args.logins)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        burst = measure(probe, args)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        logins = summarize(login_latencies, time.perf_counter() - start)
+        logins['clients'] = args.logins
+        logins['statuses'] = {str(k): v for k, v in sorted(login_statuses.items())}
+    finally:
+        probe.close()
+
+    json.dump({'chat_idle': idle, 'chat_during_burst': burst, 'logins': logins}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Connection pool profiles (app.pool) under the eventlet server's concurrency model.
+
+For every --profiles entry the app is built with that DB_POOL_PROFILE, then --concurrency
+greenlets run short transactions for --duration seconds, each checking a connection out of
+db.session and returning it like a request does. Reports throughput, transaction latency
+percentiles and the pool telemetry (checkout wait, connects, peak overflow) per profile.
+
+Point DATABASE_URL at the PgBouncer the server uses (bin/start-pgbouncer) to compare like for
+like; against PostgreSQL directly the pgbouncer profile pays a full backend start per connect.
+
+    DATABASE_URL=postgresql://localhost:6432/sparkup python bench/pool.py --concurrency 50
+    python bench/pool.py --profiles default,pgbouncer:0,pgbouncer:5 --query "SELECT count(*) FROM posts"
+"""
+import eventlet
+eventlet.monkey_patch(all=False, socket=True, thread=True)
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import text
+
+from app.config import Config
+from app.extensions import db
+from app.greendb import is_green
+from app.main import create_app
+from app.pool import pool_telemetry
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def worker(app, statement, deadline, latencies, errors):
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                db.session.execute(statement)
+                db.session.commit()
+            except Exception:
+                errors.append(1)
+                db.session.rollback()
+            finally:
+                # Give the connection back as the request teardown does
+                db.session.remove()
+            latencies.append(time.perf_counter() - start)
+
+
+def run_profile(entry, args):
+    profile, _, size = entry.partition(':')
+
+    class BenchConfig(Config):
+        DB_POOL_PROFILE = profile
+        DB_POOL_SIZE = int(size) if size else Config.DB_POOL_SIZE
+        LOG_LEVEL = 'WARNING'
+        METRICS_ENABLED = False
+
+    pool_telemetry.clear()
+    app, _ = create_app(BenchConfig)
+    statement = text(args.query)
+    latencies, errors = [], []
+
+    # Warm up so the default profile starts with its pool open, as a long running server does
+    warmup_until = time.perf_counter() + args.warmup
+    pool = eventlet.GreenPool(args.concurrency)
+    for _ in range(args.concurrency):
+        pool.spawn(worker, app, statement, warmup_until, [], [])
+    pool.waitall()
+    stats = pool_telemetry['primary']
+    before = (stats.checkouts, stats.wait_seconds, stats.connects)
+    stats.max_wait = 0.0
+
+    peak = [0]
+    running = [True]
+
+    def sampler():
+        while running[0]:
+            peak[0] = max(peak[0], stats.in_use)
+            eventlet.sleep(0.005)
+
+    eventlet.spawn(sampler)
+    start = time.perf_counter()
+    for _ in range(args.concurrency):
+        pool.spawn(worker, app, statement, start + args.duration, latencies, errors)
+    pool.waitall()
+    elapsed = time.perf_counter() - start
+    running[0] = False
+
+    checkouts = stats.checkouts - before[0]
+    result = {
+        'profile': entry,
+        'pool': stats.pool.kind,
+        'transactions': len(latencies),
+        'errors': len(errors),
+        'tps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'avg_checkout_ms': round((stats.wait_seconds - before[1]) / checkouts * 1000, 3) if checkouts else 0.0,
+        'max_checkout_ms': round(stats.max_wait * 1000, 3),
+        'connects': stats.connects - before[2],
+        'peak_in_use': peak[0],
+        'timeouts': stats.timeouts,
+    }
+    with app.app_context():
+        db.engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default='default,pgbouncer:0,pgbouncer:10',
+                        help='Comma separated DB_POOL_PROFILE[:DB_POOL_SIZE] entries')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--query', default='SELECT 1', help='Statement each transaction runs')
+    args = parser.parse_args()
+
+    results = [run_profile(entry, args) for entry in args.profiles.split(',')]
+    json.dump({
+        'green': is_green(),
+        'concurrency': args.concurrency,
+        'duration_s': args.duration,
+        'query': args.query,
+        'profiles': results,
+    }, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
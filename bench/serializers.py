@@ -0,0 +1,183 @@
+"""
+Compiled serializers (app.serializers) against the hand-built OrderedDict versions they replaced.
+
+Builds --rows transient Profile, PostComment, Post and Message instances (no database needed),
+checks that both implementations produce the same JSON, then times each over all rows.
+
+    python bench/serializers.py --rows 10000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/unused')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.encoding import dumps
+from app.models import (Profile, Post, PostComment, Message, EducationLevelEnum, MBTIEnum, ConstellationEnum,
+                        BloodTypeEnum, ReligionEnum, SexualityEnum, EthnicityEnum, DietEnum)
+from app.serializers import (serialize_profile, serialize_comment, serialize_post_card, serialize_message,
+                             post_card_counts)
+
+BASE = datetime(2026, 1, 1, 12, 0, 0, 123456)
+
+
+def legacy_to_iso8601(date):
+    return date.strftime('%Y-%m-%dT%H:%M:%S.') + f'{date.microsecond // 1000:03d}' + 'Z'
+
+
+def legacy_profile(self):
+    return OrderedDict([
+        ('id', self.id),
+        ('phone', self.phone),
+        ('nickname', self.nickname),
+        ('dob', legacy_to_iso8601(self.dob) if self.dob else None),
+        ('gender', self.gender),
+        ('bio', self.bio),
+        ('current_location', self.current_location),
+        ('hometown', self.hometown),
+        ('college', self.college),
+        ('job_title', self.job_title),
+        ('education_level', self.education_level.value if self.education_level else None),
+        ('mbti', self.mbti.value if self.mbti else None),
+        ('constellation', self.constellation.value if self.constellation else None),
+        ('blood_type', self.blood_type.value if self.blood_type else None),
+        ('religion', self.religion.value if self.religion else None),
+        ('sexuality', self.sexuality.value if self.sexuality else None),
+        ('ethnicity', self.ethnicity.value if self.ethnicity else None),
+        ('diet', self.diet.value if self.diet else None),
+        ('smoke', self.smoke),
+        ('drinking', self.drinking),
+        ('marijuana', self.marijuana),
+        ('drugs', self.drugs),
+        ('skills', self.skills),
+        ('personalities', self.personalities),
+        ('languages', self.languages),
+        ('interest_types', self.interest_types)
+    ])
+
+
+def legacy_comment(self):
+    return OrderedDict([
+        ('id', self.id),
+        ('post_id', self.post_id),
+        ('user_id', self.user_id),
+        ('content', self.content),
+        ('deleted', self.deleted),
+        ('comment_created_date', legacy_to_iso8601(self.comment_created_date)),
+        ('comment_last_updated_date', legacy_to_iso8601(self.comment_last_updated_date)),
+        ('floor', self.floor),
+        ('likes', len(self.likes)),
+    ])
+
+
+def legacy_post_card(post, user_id):
+    return OrderedDict([('id', post.id),
+                        ('type', post.type),
+                        ('title', post.title),
+                        ('event_start_date', legacy_to_iso8601(post.event_start_date)),
+                        ('event_end_date', legacy_to_iso8601(post.event_end_date)),
+                        ('number_of_people_required', post.number_of_people_required),
+                        ('likes', len(post.likes)),
+                        ('liked', any(like.user_id == user_id for like in post.likes)),
+                        ('bookmarks', len(post.bookmarks)),
+                        ('bookmarked', any(bookmark.user_id == user_id for bookmark in post.bookmarks)),
+                        ('comments', len(post.comments)),
+                        ('applicants', len(post.applicants))])
+
+
+def legacy_message(message, sender_name):
+    return {
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'sender_name': sender_name,
+        'content': message.content,
+        'created_at': legacy_to_iso8601(message.created_at),
+        'read_users': message.read_users
+    }
+
+
+def maybe(choices):
+    return random.choice(list(choices) + [None])
+
+
+def make_rows(count):
+    profiles, comments, posts, messages = [], [], [], []
+    for i in range(count):
+        profiles.append(Profile(
+            id=i, phone='0912345678', nickname=f'user{i}', dob=BASE - timedelta(days=9000 + i), gender=i % 4,
+            bio='Hello there', current_location='Taipei', hometown='Tainan', college='NTU', job_title='Engineer',
+            education_level=maybe(EducationLevelEnum), mbti=maybe(MBTIEnum), constellation=maybe(ConstellationEnum),
+            blood_type=maybe(BloodTypeEnum), religion=maybe(ReligionEnum), sexuality=maybe(SexualityEnum),
+            ethnicity=maybe(EthnicityEnum), diet=maybe(DietEnum), smoke=0, drinking=1, marijuana=0, drugs=0,
+            skills=['Python', 'Guitar'], personalities=['Calm'], languages=['English', 'Mandarin'],
+            interest_types=['Sports'],
+        ))
+        comments.append(PostComment(
+            id=i, post_id=i % 100, user_id=i % 50, content='Count me in!', deleted=False,
+            comment_created_date=BASE + timedelta(minutes=i), comment_last_updated_date=BASE + timedelta(minutes=i),
+            floor=i,
+        ))
+        posts.append(Post(
+            id=i, type='Sports', title=f'Weekend meetup #{i}', user_id=i % 50,
+            event_start_date=BASE + timedelta(days=i), event_end_date=BASE + timedelta(days=i, hours=3),
+            number_of_people_required=i % 10, content='', location='Taipei',
+        ))
+        messages.append(Message(
+            id=i, post_id=i % 100, sender_id=i % 7, content='See you there!',
+            created_at=BASE + timedelta(seconds=i), read_users=[1, 2, 3],
+        ))
+    return profiles, comments, posts, messages
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+    random.seed(0)
+
+    profiles, comments, posts, messages = make_rows(args.rows)
+    cases = {
+        'profile': (profiles,
+                    lambda row: legacy_profile(row),
+                    lambda row: serialize_profile(row)),
+        'comment': (comments,
+                    lambda row: legacy_comment(row),
+                    lambda row: serialize_comment(row, likes=len(row.likes))),
+        'post_card': (posts,
+                      lambda row: legacy_post_card(row, 1),
+                      lambda row: serialize_post_card(row, **post_card_counts(row, 1))),
+        'message': (messages,
+                    lambda row: legacy_message(row, 'user1'),
+                    lambda row: serialize_message(row, sender_name='user1')),
+    }
+
+    results = {'rows': args.rows}
+    for name, (rows, legacy, compiled) in cases.items():
+        for row in rows[:100]:
+            assert dumps(legacy(row)) == dumps(compiled(row)), (name, legacy(row), compiled(row))
+        legacy_s = timed(lambda: [legacy(row) for row in rows])
+        compiled_s = timed(lambda: [compiled(row) for row in rows])
+        results[name] = {
+            'ordereddict_ms': round(legacy_s * 1000, 2),
+            'compiled_ms': round(compiled_s * 1000, 2),
+            'speedup': round(legacy_s / compiled_s, 2) if compiled_s else 0.0,
+        }
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Cold start profile: where the import time of app.main goes, and how long a fresh process takes
+to import, build the app, serve its first request and its first Swagger spec.
+
+Each run is a separate interpreter so nothing is cached between them; timings are medians over
+--runs. The import profile comes from `python -X importtime` and is grouped by top-level package.
+
+    python bench/startup.py --runs 5 --top 15
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Runs in the child; prints one JSON line of phase timings in seconds
+PHASES = '''
+import json, time
+start = time.perf_counter()
+from app.config import Config
+from app.main import create_app
+imported = time.perf_counter()
+
+class StartupConfig(Config):
+    LOG_LEVEL = 'WARNING'
+    METRICS_ENABLED = False
+
+app, socketio = create_app(StartupConfig)
+created = time.perf_counter()
+client = app.test_client()
+client.get('/nonexistent')
+first_request = time.perf_counter()
+client.get('/post/swagger.json')
+first_docs = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'create_app': created - imported,
+    'first_request': first_request - created,
+    'first_docs': first_docs - first_request,
+    'total': first_docs - start,
+}))
+'''
+
+
+def child_env():
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'postgresql://localhost/unused')
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return env
+
+
+def measure_phases(runs):
+    samples = defaultdict(list)
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PHASES], cwd=ROOT, env=child_env(),
+                                capture_output=True, text=True, check=True).stdout
+        for phase, seconds in json.loads(output.strip().splitlines()[-1]).items():
+            samples[phase].append(seconds)
+    return {phase: round(statistics.median(values) * 1000, 1) for phase, values in samples.items()}
+
+
+def import_profile(top):
+    """Parse `-X importtime` lines: 'import time: self [us] | cumulative | imported package'."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app.main'], cwd=ROOT,
+                            env=child_env(), capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    packages = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.split('.')[0]] += self_us
+    total = sum(packages.values())
+
+    by_cumulative = sorted(modules, key=lambda module: module[2], reverse=True)[:top]
+    return {
+        'total_ms': round(total / 1000, 1),
+        'packages_ms': {name: round(us / 1000, 1)
+                        for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]},
+        'modules_cumulative_ms': {name: round(cumulative / 1000, 1) for name, _, cumulative in by_cumulative},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    results = {
+        'runs': args.runs,
+        'phases_ms': measure_phases(args.runs),
+        'imports': import_profile(args.top),
+    }
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
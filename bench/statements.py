@@ -0,0 +1,159 @@
+"""
+Prebuilt statements (app.statements) against building the same query inline on every call,
+as the routes did before.
+
+build: constructing each statement and generating its cache key, which SQLAlchemy does on
+every execution to look up the compiled form. No database needed.
+
+execute (--execute): --iterations ORM executions of each variant against DATABASE_URL, with
+the schema in place (`flask db upgrade`), counting the compiled cache outcome of every
+statement. Once warm both variants hit the compiled cache, the prebuilt ones skip building
+and keying the statement. --query-cache-size 0 shows the cost of compiling each time.
+
+    python bench/statements.py --iterations 20000
+    DATABASE_URL=postgresql://localhost/sparkup_bench python bench/statements.py --execute
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from datetime import datetime
+
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/unused')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import create_engine, event, select, exists, tuple_
+from sqlalchemy.orm import Session
+
+from app.config import Config
+from app.models import User, Post, Profile, PostApplicant, ChatRoomUser, PendingReference
+from app.statements import USER_EXISTS, APPLICATION_STATUS, ROOM_MEMBER, REFERENCEABLE, REFERENCEABLE_AFTER
+
+CURSOR = (datetime(2026, 1, 1, 12, 0, 0, 123456), 10, 2)
+
+
+def inline_referenceable(user_id, limit, after=None):
+    query = select(
+        PendingReference.post_id,
+        PendingReference.to_user_id,
+        PendingReference.event_end_date,
+        Post.user_id.label('host_id'),
+        Post.title,
+        Post.type,
+        Post.event_start_date,
+        Post.location,
+        Profile.nickname
+    ).select_from(
+        PendingReference
+    ).join(
+        Post, Post.id == PendingReference.post_id
+    ).join(
+        Profile, Profile.id == PendingReference.to_user_id
+    ).where(
+        PendingReference.from_user_id == user_id
+    ).order_by(
+        PendingReference.event_end_date.desc(),
+        PendingReference.post_id.desc(),
+        PendingReference.to_user_id.desc()
+    ).limit(limit)
+    if after is not None:
+        query = query.where(
+            tuple_(
+                PendingReference.event_end_date,
+                PendingReference.post_id,
+                PendingReference.to_user_id
+            ) < tuple_(*after)
+        )
+    return query
+
+
+# name: (inline statement, (prebuilt statement, parameters))
+CASES = {
+    'user_exists': (
+        lambda: select(exists().where(User.id == 1)),
+        (USER_EXISTS, {'user_id': 1})),
+    'application_status': (
+        lambda: select(PostApplicant.review_status).where(PostApplicant.user_id == 1, PostApplicant.post_id == 1),
+        (APPLICATION_STATUS, {'user_id': 1, 'post_id': 1})),
+    'room_member': (
+        lambda: select(exists().where(ChatRoomUser.post_id == 1, ChatRoomUser.user_id == 1)),
+        (ROOM_MEMBER, {'post_id': 1, 'user_id': 1})),
+    'referenceable': (
+        lambda: inline_referenceable(1, 21),
+        (REFERENCEABLE, {'user_id': 1, 'limit': 21})),
+    'referenceable_after': (
+        lambda: inline_referenceable(1, 21, CURSOR),
+        (REFERENCEABLE_AFTER, dict(zip(('event_end_date', 'post_id', 'to_user_id'), CURSOR),
+                                   user_id=1, limit=21))),
+}
+
+
+def per_call_us(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def bench_build(iterations):
+    results = {}
+    for name, (inline, (prebuilt, _)) in CASES.items():
+        inline_us = per_call_us(lambda: inline()._generate_cache_key(), iterations)
+        prebuilt_us = per_call_us(lambda: prebuilt._generate_cache_key(), iterations)
+        results[name] = {
+            'inline_us': round(inline_us, 2),
+            'prebuilt_us': round(prebuilt_us, 2),
+            'saved_us': round(inline_us - prebuilt_us, 2),
+        }
+    return results
+
+
+def bench_execute(url, iterations, query_cache_size):
+    engine = create_engine(url, query_cache_size=query_cache_size)
+    outcomes = Counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        outcomes[context.cache_hit.name.lower()] += 1
+
+    results = {}
+    with Session(engine) as session:
+        for name, (inline, (prebuilt, params)) in CASES.items():
+            variants = {
+                'inline': lambda: session.execute(inline()).all(),
+                'prebuilt': lambda: session.execute(prebuilt, params).all(),
+            }
+            result = {}
+            for variant, run in variants.items():
+                # The first call compiles, time what a warm server sees
+                run()
+                outcomes.clear()
+                result[f'{variant}_us'] = round(per_call_us(run, iterations), 2)
+                result[f'{variant}_cache_hit_rate'] = round(outcomes['cache_hit'] / sum(outcomes.values()), 4)
+            result['saved_us'] = round(result['inline_us'] - result['prebuilt_us'], 2)
+            results[name] = result
+            session.rollback()
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=10000)
+    parser.add_argument('--execute', action='store_true', help='Also execute the statements against DATABASE_URL')
+    parser.add_argument('--query-cache-size', type=int, default=Config.DB_QUERY_CACHE_SIZE)
+    args = parser.parse_args()
+
+    results = {'iterations': args.iterations, 'build': bench_build(args.iterations)}
+    if args.execute:
+        results['query_cache_size'] = args.query_cache_size
+        results['execute'] = bench_execute(Config.SQLALCHEMY_DATABASE_URI, args.iterations, args.query_cache_size)
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Like/bookmark toggle throughput under concurrent clients.
+
+Each client owns one user id and flips a like (or bookmark) on the same post
+as fast as it can, so every request contends on the same post row. Access tokens for
+the users are signed in-process, so DATABASE_URL must point at the server's database.
+
+    DATABASE_URL=postgresql://localhost/sparkup python bench/toggles.py --base-url http://localhost:5000 --post-id 1 --users 1-32
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+
+from common import post_json, summarize, mint_tokens
+
+
+def parse_range(value):
+    first, _, last = value.partition('-')
+    return list(range(int(first), int(last or first) + 1))
+
+
+def client(base_url, path, user_id, token, post_id, deadline, latencies, statuses, lock):
+    retrieve = False
+    local_latencies = []
+    local_statuses = Counter()
+    while time.perf_counter() < deadline:
+        status, elapsed = post_json(base_url, path, {
+            'user_id': user_id,
+            'post_id': post_id,
+            'retrieve': retrieve,
+        }, token=token)
+        local_latencies.append(elapsed)
+        local_statuses[status] += 1
+        retrieve = not retrieve
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--kind', choices=['like', 'bookmark'], default='like')
+    parser.add_argument('--post-id', type=int, required=True)
+    parser.add_argument('--users', type=parse_range, default=parse_range('1-16'),
+                        help='Inclusive range of existing user ids, one client per user')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+    args = parser.parse_args()
+
+    tokens = mint_tokens(args.users)
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    start = time.perf_counter()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(target=client, args=(args.base_url, f'/post/{args.kind}', user_id, tokens[user_id],
+                                              args.post_id, deadline, latencies, statuses, lock))
+        for user_id in args.users
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = summarize(latencies, time.perf_counter() - start)
+    result['clients'] = len(args.users)
+    result['statuses'] = {str(k): v for k, v in sorted(statuses.items())}
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""add user_stats
+
+Revision ID: 3f9a1c7e2b10
+Revises: d1c05a8d0595
+Create Date: 2026-10-19 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c7e2b10'
+down_revision = 'd1c05a8d0595'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('participated', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('hosted', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('level', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Backfill, same computation as `flask stats reconcile`
+    op.execute("""
+        INSERT INTO user_stats (user_id, participated, hosted, level, rating_sum, rating_count)
+        SELECT u.id,
+               COALESCE(p.count, 0),
+               COALESCE(h.count, 0),
+               CASE WHEN COALESCE(p.count, 0) >= 41 THEN 4
+                    WHEN COALESCE(p.count, 0) >= 31 THEN 3
+                    WHEN COALESCE(p.count, 0) >= 21 THEN 2
+                    WHEN COALESCE(p.count, 0) >= 11 THEN 1
+                    ELSE 0 END,
+               COALESCE(r.total, 0),
+               COALESCE(r.count, 0)
+        FROM users u
+        LEFT JOIN (SELECT user_id, COUNT(*) AS count FROM chat_room_users GROUP BY user_id) p ON p.user_id = u.id
+        LEFT JOIN (SELECT user_id, COUNT(*) AS count FROM posts GROUP BY user_id) h ON h.user_id = u.id
+        LEFT JOIN (SELECT to_user_id, SUM(rating) AS total, COUNT(*) AS count
+                   FROM "references" GROUP BY to_user_id) r ON r.to_user_id = u.id
+    """)
+
+
+def downgrade():
+    op.drop_table('user_stats')
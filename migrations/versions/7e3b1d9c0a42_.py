@@ -0,0 +1,114 @@
+"""pickled list and dict columns to jsonb
+
+Revision ID: 7e3b1d9c0a42
+Revises: 4a7c9e2d5f63
+Create Date: 2026-10-19 18:42:10.381524
+
+"""
+import json
+import pickle
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '7e3b1d9c0a42'
+down_revision = '4a7c9e2d5f63'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# table -> (primary key columns, {column: empty value})
+COLUMNS = {
+    'profiles': (('id',), {'skills': [], 'personalities': [], 'languages': [], 'interest_types': []}),
+    'posts': (('id',), {'skills': [], 'personalities': [], 'languages': [], 'attributes': {}}),
+    'post_applicants': (('user_id', 'post_id'), {'attributes': {}}),
+    'messages': (('id',), {'read_users': []}),
+}
+
+GIN_INDEXES = {
+    'profiles': ('skills', 'personalities', 'languages'),
+    'posts': ('skills', 'personalities', 'languages', 'attributes'),
+}
+
+
+def to_json(raw, empty):
+    if raw is None:
+        return empty
+    value = pickle.loads(raw)
+    if value is None:
+        return empty
+    # Plain containers of JSON values, anything exotic is stringified
+    return json.loads(json.dumps(list(value) if isinstance(value, list) else dict(value), default=str))
+
+
+def from_json(value, empty):
+    return pickle.dumps(type(empty)(value) if value is not None else None)
+
+
+def copy_columns(table_name, pk, columns, source_type, target_type, convert):
+    """Copy every <column> into <column>_new in keyset batches, converting each value."""
+    conn = op.get_bind()
+    table = sa.table(
+        table_name,
+        *[sa.column(name, sa.Integer) for name in pk],
+        *[sa.column(name, source_type) for name in columns],
+        *[sa.column(f'{name}_new', target_type) for name in columns],
+    )
+    pk_cols = [table.c[name] for name in pk]
+    update = table.update().where(
+        *[table.c[name] == sa.bindparam(f'b_{name}') for name in pk]
+    ).values({f'{name}_new': sa.bindparam(f'v_{name}') for name in columns})
+
+    last = None
+    while True:
+        query = sa.select(*pk_cols, *[table.c[name] for name in columns]).order_by(*pk_cols).limit(BATCH_SIZE)
+        if last is not None:
+            query = query.where(sa.tuple_(*pk_cols) > sa.tuple_(*last))
+        rows = conn.execute(query).all()
+        if not rows:
+            break
+        conn.execute(update, [
+            {
+                **{f'b_{name}': row[i] for i, name in enumerate(pk)},
+                **{f'v_{name}': convert(row[len(pk) + i], empty) for i, (name, empty) in enumerate(columns.items())},
+            }
+            for row in rows
+        ])
+        last = tuple(rows[-1][:len(pk)])
+
+
+def swap_columns(table_name, pk, columns, source_type, target_type, convert):
+    with op.batch_alter_table(table_name, schema=None) as batch_op:
+        for name in columns:
+            batch_op.add_column(sa.Column(f'{name}_new', target_type, nullable=True))
+
+    copy_columns(table_name, pk, columns, source_type, target_type, convert)
+
+    with op.batch_alter_table(table_name, schema=None) as batch_op:
+        for name in columns:
+            batch_op.drop_column(name)
+            batch_op.alter_column(f'{name}_new', new_column_name=name)
+
+
+def upgrade():
+    for table_name, (pk, columns) in COLUMNS.items():
+        swap_columns(table_name, pk, columns, sa.LargeBinary(), postgresql.JSONB(), to_json)
+
+    for table_name, columns in GIN_INDEXES.items():
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for name in columns:
+                batch_op.create_index(f'idx_{table_name}_{name}', [name], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    for table_name, columns in GIN_INDEXES.items():
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for name in columns:
+                batch_op.drop_index(f'idx_{table_name}_{name}', postgresql_using='gin')
+
+    for table_name, (pk, columns) in COLUMNS.items():
+        swap_columns(table_name, pk, columns, postgresql.JSONB(), sa.LargeBinary(), from_json)
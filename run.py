@@ -1,10 +1,15 @@
 import eventlet
-eventlet.monkey_patch(all=False, socket=True)
+# thread: the SQLAlchemy pool must wait on green locks once psycopg2 runs in green mode
+eventlet.monkey_patch(all=False, socket=True, thread=True)
 
 from app.extensions import db
 from app.main import create_app
+from app.scheduler import init_scheduler
+from app.notifications import init_dispatcher
 
 app, socketio = create_app()
+init_scheduler(app)
+init_dispatcher(app)
 
 if __name__ == '__main__':
     with app.app_context():
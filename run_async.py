@@ -0,0 +1,12 @@
+# Chat gateway: the Socket.IO chat events on asyncio, see app/chat_gateway.py. The REST API stays on run.py
+#   uvicorn run_async:app --host 0.0.0.0 --port 5001
+import os
+
+from app.chat_gateway import create_gateway
+
+app = create_gateway()
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host=os.environ.get('CHAT_GATEWAY_HOST', '127.0.0.1'),
+                port=int(os.environ.get('CHAT_GATEWAY_PORT', 5001)), log_level='warning')